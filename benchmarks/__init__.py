@@ -0,0 +1,9 @@
+"""
+Benchmarks for django-recurring's hot paths.
+
+Run them from the repository root with e.g.::
+
+    python -m benchmarks --sizes 1000 10000 --output benchmarks/baselines/local.json
+
+See ``python -m benchmarks --help`` and the "Benchmarks" section of CONTRIBUTING.rst.
+"""
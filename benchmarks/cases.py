@@ -0,0 +1,225 @@
+"""
+The benchmarked operations.
+
+Each benchmark prepares its inputs in ``setup()``, which isn't timed, and does the
+work being measured in ``run()``. Per-entry operations work through a fixed sample of
+calendar entries, so their cost only changes with the size of the table if the
+operation itself depends on it. Table-wide operations (the admin changelist, bulk
+recalculation and window queries) run against every entry.
+"""
+
+from __future__ import annotations
+
+import json
+from datetime import timedelta
+from io import StringIO
+from typing import Any
+
+from django.contrib import admin
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import RequestFactory
+from django.utils import timezone as django_timezone
+
+from recurring import deferred_recalculation
+from recurring.cache import ruleset_cache
+from recurring.forms import CalendarEntryForm
+from recurring.models import CalendarEntry, Timezone
+
+from . import schedules
+
+
+class Benchmark:
+    """
+    A benchmarked operation.
+
+    :param sample_pks: The primary keys of the calendar entries per-entry operations work through
+    :type sample_pks: list[int]
+    """
+
+    #: The name results are reported and stored under
+    name = ""
+    #: Caps the number of timed runs of slow benchmarks
+    max_repeat: int | None = None
+
+    def __init__(self, sample_pks: list[int]) -> None:
+        self.sample_pks = sample_pks
+
+    def sample(self) -> list[CalendarEntry]:
+        """
+        Loads the sample entries with their whole schedule.
+
+        :return: The sample calendar entries
+        :rtype: list[CalendarEntry]
+        """
+        return list(
+            CalendarEntry.objects.filter(pk__in=self.sample_pks)
+            .order_by("pk")
+            .with_schedule()
+        )
+
+    def setup(self) -> None:
+        """
+        Prepares the inputs of :meth:`run`. Not timed.
+        """
+
+    def run(self) -> Any:
+        """
+        Does the work being measured.
+        """
+        raise NotImplementedError
+
+    def teardown(self) -> None:
+        """
+        Undoes any changes :meth:`run` made to the database. Not timed.
+        """
+
+
+class ToRruleset(Benchmark):
+    name = "to_rruleset"
+
+    def setup(self) -> None:
+        self.entries = self.sample()
+        ruleset_cache.clear()
+
+    def run(self) -> Any:
+        for entry in self.entries:
+            entry.to_rruleset()
+
+
+class CalculateOccurrences(Benchmark):
+    name = "calculate_occurrences"
+
+    def setup(self) -> None:
+        self.entries = self.sample()
+        ruleset_cache.clear()
+
+    def run(self) -> Any:
+        for entry in self.entries:
+            entry.calculate_occurrences(commit=False)
+
+
+class ToIcal(Benchmark):
+    name = "to_ical"
+
+    def setup(self) -> None:
+        self.entries = self.sample()
+
+    def run(self) -> Any:
+        for entry in self.entries:
+            entry.to_ical()
+
+
+class ToDict(Benchmark):
+    name = "to_dict"
+
+    def setup(self) -> None:
+        self.entries = self.sample()
+
+    def run(self) -> Any:
+        for entry in self.entries:
+            entry.to_dict()
+
+
+class FromDict(Benchmark):
+    name = "from_dict"
+
+    def setup(self) -> None:
+        self.schedules = [
+            schedules.localise(data)
+            for data in schedules.generate(len(self.sample_pks), seed=1)
+        ]
+        self.timezones = {tz.name: tz for tz in Timezone.objects.all()}
+        self.created: list[CalendarEntry] = []
+
+    def run(self) -> Any:
+        for data in self.schedules:
+            entry = CalendarEntry.objects.create(
+                name=data["name"], timezone=self.timezones[data["timezone"]]
+            )
+            entry.from_dict(data)
+            self.created.append(entry)
+
+    def teardown(self) -> None:
+        with deferred_recalculation():
+            for entry in self.created:
+                entry.delete()
+
+
+class FormSave(Benchmark):
+    name = "form_save"
+
+    def setup(self) -> None:
+        timezones = {tz.name: tz.pk for tz in Timezone.objects.all()}
+        self.forms = []
+        for data in schedules.generate(len(self.sample_pks), seed=2):
+            form = CalendarEntryForm(
+                data={
+                    "name": data["name"],
+                    "description": data["description"],
+                    "timezone": timezones[data["timezone"]],
+                    "calendar_entry": json.dumps({"events": data["events"]}),
+                }
+            )
+            if not form.is_valid():
+                raise ValueError(form.errors.as_text())
+            self.forms.append(form)
+        self.created: list[CalendarEntry] = []
+
+    def run(self) -> Any:
+        for form in self.forms:
+            self.created.append(form.save())
+
+    def teardown(self) -> None:
+        with deferred_recalculation():
+            for entry in self.created:
+                entry.delete()
+
+
+class AdminChangelist(Benchmark):
+    name = "admin_changelist"
+
+    def setup(self) -> None:
+        user, _ = get_user_model().objects.get_or_create(
+            username="benchmark", defaults={"is_staff": True, "is_superuser": True}
+        )
+        self.request = RequestFactory().get("/admin/recurring/calendarentry/")
+        self.request.user = user
+        self.model_admin = admin.site._registry[CalendarEntry]
+
+    def run(self) -> Any:
+        self.model_admin.changelist_view(self.request).render()
+
+
+class RecalculateAll(Benchmark):
+    name = "calculate_occurrences_command"
+    max_repeat = 1
+
+    def run(self) -> Any:
+        call_command("calculate_occurrences", stdout=StringIO())
+
+
+class OccurringBetween(Benchmark):
+    name = "occurring_between"
+
+    def setup(self) -> None:
+        self.start = django_timezone.now()
+        self.end = self.start + timedelta(days=7)
+
+    def run(self) -> Any:
+        return sum(
+            1 for _ in CalendarEntry.objects.occurring_between(self.start, self.end)
+        )
+
+
+BENCHMARKS: list[type[Benchmark]] = [
+    ToRruleset,
+    CalculateOccurrences,
+    ToIcal,
+    ToDict,
+    FromDict,
+    FormSave,
+    AdminChangelist,
+    OccurringBetween,
+    RecalculateAll,
+]
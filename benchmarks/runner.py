@@ -0,0 +1,243 @@
+"""
+Runs the benchmarks against growing datasets and stores or compares the results.
+
+Each benchmark is timed ``--repeat`` times and the fastest run is reported, as it's
+the least disturbed by other processes. It's then run once more with queries captured
+and ``tracemalloc`` tracing, to count queries and measure peak memory, which would
+otherwise skew the timings. The metrics emitted by ``recurring.instrumentation``
+during that run are stored with the results too.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "benchmarks.settings")
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000]
+
+#: Results slower than the baseline by more than this fraction are regressions
+DEFAULT_TOLERANCE = 0.2
+
+
+def measure(benchmark: Any, repeat: int) -> dict[str, Any]:
+    """
+    Measures the wall time, query count and peak memory of a benchmark.
+
+    :param benchmark: The benchmark to measure
+    :type benchmark: Benchmark
+    :param repeat: How many times to time it
+    :type repeat: int
+    :return: The fastest time in seconds, the number of queries, the peak memory in KiB and a summary of the metrics emitted
+    :rtype: dict[str, Any]
+    """
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    from recurring.instrumentation import collect_metrics
+
+    if benchmark.max_repeat is not None:
+        repeat = min(repeat, benchmark.max_repeat)
+
+    timings = []
+    for _ in range(repeat):
+        benchmark.setup()
+        try:
+            started = time.perf_counter()
+            benchmark.run()
+            timings.append(time.perf_counter() - started)
+        finally:
+            benchmark.teardown()
+
+    benchmark.setup()
+    try:
+        tracemalloc.start()
+        with CaptureQueriesContext(connection) as queries, collect_metrics() as metrics:
+            benchmark.run()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+        benchmark.teardown()
+
+    return {
+        "seconds": round(min(timings), 6),
+        "queries": len(queries),
+        "peak_memory_kib": round(peak / 1024, 1),
+        "metrics": metrics.summary(),
+    }
+
+
+def populate(size: int, batch_size: int = 1000) -> None:
+    """
+    Tops the database up to ``size`` calendar entries.
+
+    :param size: The number of calendar entries wanted
+    :type size: int
+    :param batch_size: How many entries are created at a time
+    :type batch_size: int
+    """
+    from recurring.models import CalendarEntry
+
+    from . import schedules
+
+    existing = CalendarEntry.objects.count()
+    for start in range(existing, size, batch_size):
+        count = min(batch_size, size - start)
+        CalendarEntry.objects.bulk_create_from_dicts(
+            schedules.generate(count, start=start)
+        )
+
+
+def compare(
+    results: list[dict[str, Any]],
+    baseline: list[dict[str, Any]],
+    tolerance: float,
+) -> list[str]:
+    """
+    Compares results with a baseline.
+
+    :param results: The results of this run
+    :type results: list[dict[str, Any]]
+    :param baseline: The results of the baseline run
+    :type baseline: list[dict[str, Any]]
+    :param tolerance: How much slower than the baseline results may be, as a fraction
+    :type tolerance: float
+    :return: A description of every regression
+    :rtype: list[str]
+    """
+    previous = {(result["benchmark"], result["size"]): result for result in baseline}
+    regressions = []
+    for result in results:
+        before = previous.get((result["benchmark"], result["size"]))
+        if before is None:
+            continue
+        label = f"{result['benchmark']} [{result['size']}]"
+        ratio = result["seconds"] / before["seconds"] if before["seconds"] else 1
+        if ratio > 1 + tolerance:
+            regressions.append(
+                f"{label}: {before['seconds']:.4f}s -> {result['seconds']:.4f}s "
+                f"({ratio:.2f}x)"
+            )
+        if result["queries"] > before["queries"]:
+            regressions.append(
+                f"{label}: {before['queries']} -> {result['queries']} queries"
+            )
+    return regressions
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks", description="Benchmarks django-recurring"
+    )
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=DEFAULT_SIZES,
+        help="Numbers of calendar entries to benchmark against",
+    )
+    parser.add_argument(
+        "--sample",
+        type=int,
+        default=100,
+        help="Number of entries per-entry benchmarks work through",
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=3, help="Number of timed runs per benchmark"
+    )
+    parser.add_argument(
+        "--only", nargs="+", metavar="NAME", help="Only run these benchmarks"
+    )
+    parser.add_argument("--output", type=Path, help="Write the results to this file")
+    parser.add_argument(
+        "--compare", type=Path, help="Compare the results with this baseline file"
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=DEFAULT_TOLERANCE,
+        help="How much slower than the baseline is a regression, as a fraction",
+    )
+    args = parser.parse_args(argv)
+
+    django.setup()
+
+    from django.core.management import call_command
+
+    from recurring.models import CalendarEntry
+
+    from .cases import BENCHMARKS
+
+    benchmarks = [
+        benchmark
+        for benchmark in BENCHMARKS
+        if not args.only or benchmark.name in args.only
+    ]
+
+    call_command("migrate", verbosity=0)
+
+    results = []
+    for size in sorted(args.sizes):
+        started = time.perf_counter()
+        populate(size)
+        print(
+            f"Populated {size} calendar entries in "
+            f"{time.perf_counter() - started:.1f}s",
+            file=sys.stderr,
+        )
+        sample_pks = list(
+            CalendarEntry.objects.order_by("pk").values_list("pk", flat=True)[
+                : args.sample
+            ]
+        )
+
+        for benchmark in benchmarks:
+            result = {
+                "benchmark": benchmark.name,
+                "size": size,
+                **measure(benchmark(sample_pks), args.repeat),
+            }
+            results.append(result)
+            print(
+                f"{benchmark.name:<30} {size:>8} {result['seconds']:>10.4f}s "
+                f"{result['queries']:>7} queries {result['peak_memory_kib']:>10.1f} KiB"
+            )
+
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(
+            json.dumps(
+                {
+                    "environment": {
+                        "python": platform.python_version(),
+                        "django": django.get_version(),
+                        "platform": platform.platform(),
+                        "sample": args.sample,
+                        "repeat": args.repeat,
+                    },
+                    "results": results,
+                },
+                indent=2,
+            )
+            + "\n"
+        )
+
+    if args.compare:
+        baseline = json.loads(args.compare.read_text())["results"]
+        regressions = compare(results, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        if regressions:
+            return 1
+
+    return 0
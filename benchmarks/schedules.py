@@ -0,0 +1,207 @@
+"""
+Synthetic schedules of the shapes seen in production.
+
+Schedules are dictionaries in the format taken by ``CalendarEntry.from_dict()`` and
+``CalendarEntry.objects.bulk_create_from_dicts()``, with naive ISO 8601 times local
+to the entry's timezone. They're generated relative to the current time so that the
+number of past and future occurrences stays the same from one run to the next, and
+from a seeded random number generator so that every run creates the same mix.
+"""
+
+from __future__ import annotations
+
+import random
+from collections.abc import Callable, Iterator
+from datetime import datetime, timedelta
+from typing import Any
+from zoneinfo import ZoneInfo
+
+Schedule = dict[str, Any]
+
+
+def weekly_with_exclusions(rng: random.Random, now: datetime, i: int) -> Schedule:
+    """
+    A weekly meeting on a few weekdays that started a few years ago, with a week off
+    now and again.
+    """
+    start = now.replace(hour=rng.randrange(8, 18), minute=0) - timedelta(
+        days=rng.randrange(365, 5 * 365)
+    )
+    exclusions = []
+    for _ in range(5):
+        excluded = start + timedelta(weeks=rng.randrange(1, 250))
+        exclusions.append(
+            {
+                "start_date": excluded.isoformat(),
+                "end_date": (excluded + timedelta(weeks=1)).isoformat(),
+            }
+        )
+
+    return {
+        "name": f"Weekly {i}",
+        "description": "Weekly meeting with exclusions",
+        "timezone": "Europe/London",
+        "events": [
+            {
+                "start_time": start.isoformat(),
+                "end_time": (start + timedelta(hours=1)).isoformat(),
+                "is_full_day": False,
+                "recurrence_rule": {
+                    "frequency": "WEEKLY",
+                    "interval": 1,
+                    "byweekday": sorted(rng.sample(["MO", "TU", "WE", "TH", "FR"], 3)),
+                },
+                "exclusions": exclusions,
+            }
+        ],
+    }
+
+
+def minutely_with_long_exclusions(
+    rng: random.Random, now: datetime, i: int
+) -> Schedule:
+    """
+    A polling job every few minutes, paused for months at a time.
+    """
+    start = now.replace(minute=0) - timedelta(days=rng.randrange(30, 180))
+    exclusions = []
+    for months in (1, 4):
+        excluded = start + timedelta(days=30 * months)
+        exclusions.append(
+            {
+                "start_date": excluded.isoformat(),
+                "end_date": (excluded + timedelta(days=60)).isoformat(),
+            }
+        )
+
+    return {
+        "name": f"Minutely {i}",
+        "description": "Polling job with long pauses",
+        "timezone": "UTC",
+        "events": [
+            {
+                "start_time": start.isoformat(),
+                "end_time": (start + timedelta(minutes=1)).isoformat(),
+                "is_full_day": False,
+                "recurrence_rule": {
+                    "frequency": "MINUTELY",
+                    "interval": rng.choice([5, 15, 30]),
+                    "until": (now + timedelta(days=180)).isoformat(),
+                },
+                "exclusions": exclusions,
+            }
+        ],
+    }
+
+
+def multi_event(rng: random.Random, now: datetime, i: int) -> Schedule:
+    """
+    A daily stand-up on weekdays, a monthly review and a one-off full day event.
+    """
+    start = now.replace(hour=9, minute=30) - timedelta(days=rng.randrange(30, 3 * 365))
+    review = start.replace(day=1, hour=14, minute=0)
+    off_site = (now + timedelta(days=rng.randrange(1, 365))).replace(hour=0, minute=0)
+
+    return {
+        "name": f"Team {i}",
+        "description": "Team rituals",
+        "timezone": "America/New_York",
+        "events": [
+            {
+                "start_time": start.isoformat(),
+                "end_time": (start + timedelta(minutes=15)).isoformat(),
+                "is_full_day": False,
+                "recurrence_rule": {
+                    "frequency": "DAILY",
+                    "interval": 1,
+                    "byweekday": ["MO", "TU", "WE", "TH", "FR"],
+                },
+                "exclusions": [],
+            },
+            {
+                "start_time": review.isoformat(),
+                "end_time": (review + timedelta(hours=1)).isoformat(),
+                "is_full_day": False,
+                "recurrence_rule": {
+                    "frequency": "MONTHLY",
+                    "interval": 1,
+                    "bymonthday": [1],
+                },
+                "exclusions": [],
+            },
+            {
+                "start_time": off_site.isoformat(),
+                "end_time": None,
+                "is_full_day": True,
+                "exclusions": [],
+            },
+        ],
+    }
+
+
+#: How often each shape occurs, out of the total weight
+SHAPES: list[tuple[Callable[[random.Random, datetime, int], Schedule], int]] = [
+    (weekly_with_exclusions, 12),
+    (multi_event, 6),
+    (minutely_with_long_exclusions, 2),
+]
+
+
+def generate(count: int, start: int = 0, seed: int = 0) -> Iterator[Schedule]:
+    """
+    Generates synthetic schedules in a fixed mix of shapes.
+
+    :param count: How many schedules to generate
+    :type count: int
+    :param start: The index of the first schedule, so larger datasets can be built by
+        topping up smaller ones
+    :type start: int
+    :param seed: Seeds the random number generator
+    :type seed: int
+    :return: An iterator of schedule dictionaries
+    :rtype: Iterator[Schedule]
+    """
+    now = datetime.now().replace(second=0, microsecond=0)
+    shapes = [shape for shape, weight in SHAPES for _ in range(weight)]
+    for i in range(start, start + count):
+        rng = random.Random(f"{seed}-{i}")
+        yield shapes[i % len(shapes)](rng, now, i)
+
+
+def localise(data: Schedule) -> Schedule:
+    """
+    Converts a schedule's times to aware datetimes in its timezone, as
+    ``CalendarEntry.from_dict()`` expects.
+
+    :param data: A schedule with naive ISO 8601 times
+    :type data: Schedule
+    :return: A copy of the schedule with aware datetimes
+    :rtype: Schedule
+    """
+    tz = ZoneInfo(data["timezone"])
+
+    def parse(value: str | None) -> datetime | None:
+        if value is None:
+            return None
+        return datetime.fromisoformat(value).replace(tzinfo=tz)
+
+    events = []
+    for event in data["events"]:
+        event = {
+            **event,
+            "start_time": parse(event["start_time"]),
+            "end_time": parse(event["end_time"]),
+            "exclusions": [
+                {
+                    "start_date": parse(exclusion["start_date"]),
+                    "end_date": parse(exclusion["end_date"]),
+                }
+                for exclusion in event["exclusions"]
+            ],
+        }
+        rule = event.get("recurrence_rule")
+        if rule and rule.get("until"):
+            event["recurrence_rule"] = {**rule, "until": parse(rule["until"])}
+        events.append(event)
+
+    return {**data, "events": events}
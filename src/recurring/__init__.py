@@ -1,5 +1,9 @@
 """Top-level package for django-recurring."""
 
+from .recalculation import deferred_recalculation
+
 __author__ = """Boosh"""
 __email__ = "boosh@example.com"
 __version__ = "1.3.3"
+
+__all__ = ["deferred_recalculation"]
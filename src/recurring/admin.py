@@ -1,19 +1,27 @@
+import json
+
 from django import forms
-from django.contrib import admin
-from django.contrib import messages
-from django.http import HttpResponse
-from django.urls import reverse, path
+from django.conf import settings
+from django.contrib import admin, messages
+from django.core.exceptions import PermissionDenied, ValidationError
+from django.http import HttpResponse, HttpResponseNotAllowed, JsonResponse
+from django.urls import path, reverse
+from django.utils.cache import get_conditional_response
 from django.utils.html import format_html
+from django.utils.http import http_date, urlencode
 from django.utils.text import slugify
 
 from .forms import (
     CalendarEntryForm,
 )
+from .ical import streaming_ical_response
 from .models import (
-    Timezone,
     CalendarEntry,
+    Event,
+    Timezone,
 )
-
+from .preview import DEFAULT_PREVIEW_COUNT, preview_occurrences
+from .widgets import DEFAULT_PAGE_SIZE
 
 # Uncomment these if you're debugging things, otherwise they'll
 # probably just confuse admins
@@ -34,29 +42,35 @@ from .models import (
 
 @admin.action(description="Recalculate occurrences for selected")
 def recalculate_occurrences(modeladmin, request, queryset):
-    count = 0
-    for entry in queryset:
-        entry.calculate_occurrences()
-        count += 1
+    count = len(queryset.recalculate_occurrences())
 
     messages.success(
         request, f"Successfully recalculated occurrences for {count} calendar entries."
     )
 
 
+@admin.action(description="Export selected as .ics")
+def export_ical(modeladmin, request, queryset):
+    return streaming_ical_response(queryset)
+
+
 class CalendarEntryAdmin(admin.ModelAdmin):
     form = CalendarEntryForm
     list_display = (
         "name",
-        "timezone",
+        "summary_text",
+        "timezone_name",
         "first_occurrence",
         "previous_occurrence",
         "next_occurrence",
         "last_occurrence",
     )
-    actions = [recalculate_occurrences]
+    # the summary is denormalised, so a page of entries is a constant number of
+    # queries; the timezone is joined for anything still falling back to __str__
+    list_select_related = ("timezone",)
+    actions = [recalculate_occurrences, export_ical]
     search_fields = ("name",)
-    list_filter = ("timezone",)
+    list_filter = ("timezone", "is_infinite")
     readonly_fields = ("updated_at", "ical_string", "ical_download_link")
 
     def get_form(self, request, obj=None, **kwargs):
@@ -70,19 +84,29 @@ class CalendarEntryAdmin(admin.ModelAdmin):
 
     def get_urls(self):
         urls = super().get_urls()
+        app_label, model_name = self.model._meta.app_label, self.model._meta.model_name
         custom_urls = [
+            path(
+                "preview-occurrences/",
+                self.admin_site.admin_view(self.preview_occurrences),
+                name=f"{app_label}_{model_name}_preview_occurrences",
+            ),
+            path(
+                "<path:object_id>/schedule/",
+                self.admin_site.admin_view(self.schedule),
+                name=f"{app_label}_{model_name}_schedule",
+            ),
             path(
                 "<path:object_id>/download-ical/",
                 self.admin_site.admin_view(self.download_ical),
-                name="%s_%s_download_ical"
-                % (self.model._meta.app_label, self.model._meta.model_name),
+                name=f"{app_label}_{model_name}_download_ical",
             ),
         ]
         return custom_urls + urls
 
     def ical_download_link(self, obj):
         url = reverse(
-            "admin:%s_%s_download_ical" % (obj._meta.app_label, obj._meta.model_name),
+            f"admin:{obj._meta.app_label}_{obj._meta.model_name}_download_ical",
             args=[obj.pk],
         )
         return format_html('<a href="{}">Download iCal</a>', url)
@@ -94,13 +118,106 @@ class CalendarEntryAdmin(admin.ModelAdmin):
         if obj is None:
             return HttpResponse("Object not found", status=404)
 
+        # the etag and updated_at change whenever the rendered iCal does, so a
+        # client's copy can be confirmed without rendering it
+        etag = obj.ical_etag()
+        etag = f'"{etag}"' if etag else None
+        # HTTP dates have a resolution of a second
+        last_modified = int(obj.updated_at.timestamp())
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is not None:
+            return response
+
         ical_string = obj.to_ical()
         response = HttpResponse(ical_string, content_type="text/calendar")
+        if etag:
+            response["ETag"] = etag
+        response["Last-Modified"] = http_date(last_modified)
         response[
             "Content-Disposition"
         ] = f'attachment; filename="{slugify(obj.name)}.ics"'
         return response
 
+    def preview_occurrences(self, request):
+        """
+        Returns the next occurrences of the widget's unsaved schedule as JSON, without
+        saving anything. See :mod:`recurring.preview`.
+        """
+        if request.method != "POST":
+            return HttpResponseNotAllowed(["POST"])
+        if not (
+            self.has_add_permission(request) or self.has_change_permission(request)
+        ):
+            raise PermissionDenied
+
+        try:
+            data = json.loads(request.body)
+            schedule = data["calendar_entry"]
+            if isinstance(schedule, str):
+                schedule = json.loads(schedule)
+            if not isinstance(schedule, dict):
+                raise TypeError("Calendar entry data must be a dictionary")
+            timezone = Timezone.objects.get(pk=data["timezone"])
+            count = int(data.get("count", DEFAULT_PREVIEW_COUNT))
+            preview = preview_occurrences(schedule, timezone, count=count)
+        except (KeyError, Timezone.DoesNotExist):
+            return JsonResponse(
+                {"error": "A calendar entry and timezone are required."}, status=400
+            )
+        except ValidationError as e:
+            return JsonResponse({"error": " ".join(e.messages)}, status=400)
+        except (TypeError, ValueError) as e:
+            return JsonResponse({"error": str(e)}, status=400)
+
+        return JsonResponse(preview)
+
+    def schedule(self, request, object_id):
+        """
+        Returns a page of a calendar entry's events, with their recurrence rules and
+        exclusions, as JSON. The widget loads schedules too large to inline in the
+        change page this way (see ``RECURRING_WIDGET_INLINE_LIMIT``).
+
+        Events are ordered by primary key, and ``next`` is the URL of the following
+        page, or null on the last one.
+        """
+        if request.method != "GET":
+            return HttpResponseNotAllowed(["GET"])
+        obj = self.get_object(request, object_id)
+        if obj is None:
+            return JsonResponse({"error": "Calendar entry not found."}, status=404)
+        if not self.has_view_or_change_permission(request, obj):
+            raise PermissionDenied
+
+        try:
+            after = int(request.GET.get("after", 0))
+        except ValueError:
+            return JsonResponse({"error": "after must be an event ID."}, status=400)
+        page_size = getattr(settings, "RECURRING_WIDGET_PAGE_SIZE", DEFAULT_PAGE_SIZE)
+
+        events = list(
+            Event.objects.filter(calendar_entry=obj, pk__gt=after)
+            .select_related("recurrence_rule")
+            .prefetch_related("exclusions")
+            .order_by("pk")[: page_size + 1]
+        )
+        next_url = None
+        if len(events) > page_size:
+            events = events[:page_size]
+            next_url = f"{request.path}?{urlencode({'after': events[-1].pk})}"
+        for event in events:
+            # so the timezone is only fetched once
+            event.calendar_entry = obj
+
+        return JsonResponse(
+            {
+                "timezone": obj.timezone.name,
+                "events": [event.to_dict() for event in events],
+                "next": next_url,
+            }
+        )
+
     def save_model(self, request, obj, form, change):
         try:
             form.save()
@@ -0,0 +1,145 @@
+"""
+Closed-form bounds of recurrence rules.
+
+dateutil can only find the last occurrence of a rule by generating every occurrence
+before it. For the simple rules most schedules use (a frequency, an interval and
+optionally a set of weekdays, ending after a COUNT or at an UNTIL) the last occurrence
+is a matter of arithmetic from the start instead.
+
+Like dateutil, the arithmetic is done on wall-clock times in the start's timezone, so
+occurrences keep their local time across daylight saving changes.
+"""
+
+from __future__ import annotations
+
+import calendar
+from collections.abc import Iterable
+from datetime import date, datetime, timedelta
+
+from dateutil.relativedelta import relativedelta
+from dateutil.rrule import DAILY, HOURLY, MINUTELY, MONTHLY, SECONDLY, WEEKLY, YEARLY
+
+STEPS = {
+    WEEKLY: timedelta(weeks=1),
+    DAILY: timedelta(days=1),
+    HOURLY: timedelta(hours=1),
+    MINUTELY: timedelta(minutes=1),
+    SECONDLY: timedelta(seconds=1),
+}
+
+
+def last_occurrence(
+    freq: int,
+    interval: int,
+    dtstart: datetime,
+    count: int | None = None,
+    until: datetime | None = None,
+    byweekday: Iterable[int] | None = None,
+    wkst: int | None = None,
+) -> datetime | None:
+    """
+    Calculates the last occurrence of a finite rule without iterating over it.
+
+    Only rules without any BY* parts other than BYDAY are supported, and BYDAY only for
+    weekly rules and daily rules with an interval of one. Monthly and yearly rules are
+    only supported if every period has the start's day, i.e. up to the 28th.
+
+    :param freq: The dateutil frequency of the rule
+    :type freq: int
+    :param interval: The interval between each period
+    :type interval: int
+    :param dtstart: The start of the rule, in the timezone of the calendar entry
+    :type dtstart: datetime
+    :param count: The number of occurrences of the rule
+    :type count: int | None
+    :param until: The time until which occurrences are generated, in the same timezone as ``dtstart``
+    :type until: datetime | None
+    :param byweekday: The weekdays the rule occurs on (0 for Monday)
+    :type byweekday: Iterable[int] | None
+    :param wkst: The week start day (0 for Monday). Defaults to the same as dateutil.
+    :type wkst: int | None
+    :return: The last occurrence, or None if it can't be calculated (because the rule is infinite, unsupported or has no occurrences)
+    :rtype: datetime | None
+    """
+    if (count is None) == (until is None) or interval < 1:
+        return None
+    if count is not None and count < 1:
+        return None
+
+    tz = dtstart.tzinfo
+    start = dtstart.replace(tzinfo=None)
+    end = until.astimezone(tz).replace(tzinfo=None) if until is not None else None
+    if end is not None and end < start:
+        return None
+
+    weekdays = sorted(set(byweekday)) if byweekday else None
+    if weekdays:
+        if freq == WEEKLY:
+            last = _last_weekday(start, interval, weekdays, wkst, count, end)
+        elif freq == DAILY and interval == 1:
+            last = _last_weekday(start, 1, weekdays, wkst, count, end)
+        else:
+            return None
+    elif freq in STEPS:
+        step = STEPS[freq] * interval
+        periods = count - 1 if count is not None else (end - start) // step
+        last = start + step * periods
+    elif freq in (MONTHLY, YEARLY):
+        if start.day > 28:
+            return None
+        months = interval * (12 if freq == YEARLY else 1)
+        if count is not None:
+            periods = count - 1
+        else:
+            periods = ((end.year - start.year) * 12 + end.month - start.month) // months
+            if start + relativedelta(months=periods * months) > end:
+                periods -= 1
+        last = start + relativedelta(months=periods * months)
+    else:
+        return None
+
+    return last.replace(tzinfo=tz) if last is not None else None
+
+
+def _last_weekday(
+    start: datetime,
+    interval: int,
+    weekdays: list[int],
+    wkst: int | None,
+    count: int | None,
+    end: datetime | None,
+) -> datetime | None:
+    """
+    Calculates the last occurrence of a rule occurring on some weekdays of every
+    ``interval`` weeks. Periods start on the week start day of the week holding
+    ``start``, and the first one only includes the days from ``start`` onwards.
+    """
+    if wkst is None:
+        wkst = calendar.firstweekday()
+    offsets = sorted((weekday - wkst) % 7 for weekday in weekdays)
+    week_start = start.date() - timedelta(days=(start.weekday() - wkst) % 7)
+    period = timedelta(weeks=interval)
+
+    def days(k: int) -> list[date]:
+        period_start = week_start + period * k
+        return [
+            day
+            for day in (period_start + timedelta(days=offset) for offset in offsets)
+            if day >= start.date()
+        ]
+
+    def at(day: date) -> datetime:
+        return datetime.combine(day, start.time())
+
+    first_days = days(0)
+    if count is not None:
+        if count <= len(first_days):
+            return at(first_days[count - 1])
+        full, index = divmod(count - len(first_days) - 1, len(offsets))
+        return at(days(full + 1)[index])
+
+    for k in range((end.date() - week_start) // period, -1, -1):
+        for day in reversed(days(k)):
+            if at(day) <= end:
+                return at(day)
+    return None
@@ -0,0 +1,458 @@
+"""
+Helpers for creating many calendar entries at once.
+
+Schedules are given as dictionaries in the format produced by
+``CalendarEntry.to_dict()``. They're validated in memory, then all entries, recurrence
+rules, events and exclusions are inserted with one ``bulk_create`` per model, and the
+occurrence fields are recalculated with a single ``bulk_update``.
+
+``bulk_create`` bypasses the models' ``save()`` methods, so the same validation
+(``full_clean()``) and exclusion time syncing are applied here instead. Creating rows
+this way needs a database that returns primary keys from ``bulk_create`` (e.g.
+PostgreSQL, SQLite or MariaDB).
+
+:func:`merge_schedule` updates a saved entry's events the same way, writing only the
+rows that changed.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Iterable
+from datetime import date, datetime
+from typing import Any, Optional
+from zoneinfo import ZoneInfo
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+
+from .cache import ruleset_cache
+from .models import (
+    CalendarEntry,
+    Event,
+    ExclusionDateRange,
+    RecurrenceRule,
+    Timezone,
+    _schedule_changed,
+)
+
+EVENT_FIELDS = ["start_time", "end_time", "is_full_day"]
+EXCLUSION_FIELDS = ["start_date", "end_date"]
+RULE_FIELDS = [
+    "frequency",
+    "interval",
+    "wkst",
+    "count",
+    "until",
+    "bysetpos",
+    "bymonth",
+    "bymonthday",
+    "byyearday",
+    "byweekno",
+    "byweekday",
+    "byhour",
+    "byminute",
+    "bysecond",
+]
+
+#: An unsaved calendar entry with its events, each with its rule and exclusions
+ScheduleGraph = tuple[
+    CalendarEntry,
+    list[tuple[Event, Optional[RecurrenceRule], list[ExclusionDateRange]]],
+]
+
+
+def get_timezones(names: Iterable[str]) -> dict[str, Timezone]:
+    """
+    Fetches the Timezone rows with the given names, creating any valid ones that
+    don't exist yet. Invalid names are left out of the result.
+
+    :param names: The timezone names
+    :type names: Iterable[str]
+    :return: The timezones keyed by name
+    :rtype: dict[str, Timezone]
+    """
+    names = set(names)
+    timezones = {tz.name: tz for tz in Timezone.objects.filter(name__in=names)}
+
+    missing = []
+    for name in names - timezones.keys():
+        tz = Timezone(name=name)
+        try:
+            tz.full_clean()
+        except ValidationError:
+            continue
+        missing.append(tz)
+
+    for tz in Timezone.objects.bulk_create(missing):
+        timezones[tz.name] = tz
+
+    return timezones
+
+
+def build_schedule(
+    data: dict[str, Any], timezones: dict[str, Timezone]
+) -> ScheduleGraph:
+    """
+    Builds and validates the unsaved objects for a schedule dictionary.
+
+    :param data: A dictionary in the format of ``CalendarEntry.to_dict()``
+    :type data: dict[str, Any]
+    :param timezones: The timezones to use, keyed by name (see :func:`get_timezones`)
+    :type timezones: dict[str, Timezone]
+    :return: The unsaved calendar entry and its events, rules and exclusions
+    :rtype: ScheduleGraph
+    :raises ValidationError: If any part of the schedule is invalid
+    """
+    tz_name = data.get("timezone", "UTC")
+    if tz_name not in timezones:
+        raise ValidationError(f"Invalid timezone: {tz_name}")
+
+    entry = CalendarEntry(
+        name=data.get("name", ""),
+        description=data.get("description", ""),
+        timezone=timezones[tz_name],
+    )
+    entry.full_clean(
+        exclude=["timezone"], validate_unique=False, validate_constraints=False
+    )
+    return entry, build_events(entry, data.get("events", []))
+
+
+def build_events(
+    calendar_entry: CalendarEntry, events_data: Iterable[dict[str, Any]]
+) -> list[tuple[Event, RecurrenceRule | None, list[ExclusionDateRange]]]:
+    """
+    Builds and validates the unsaved events of a calendar entry, with their rules and
+    exclusions.
+
+    :param calendar_entry: The calendar entry the events belong to, which needn't be saved
+    :type calendar_entry: CalendarEntry
+    :param events_data: Event dictionaries in the format of ``CalendarEntry.to_dict()``
+    :type events_data: Iterable[dict[str, Any]]
+    :return: Each event with its rule and exclusions, in the order given
+    :rtype: list[tuple[Event, RecurrenceRule | None, list[ExclusionDateRange]]]
+    :raises ValidationError: If any event is invalid
+    """
+    tz = calendar_entry.timezone.as_tz
+
+    events = []
+    for event_data in events_data:
+        event = Event(
+            calendar_entry=calendar_entry,
+            start_time=_to_datetime(event_data.get("start_time"), tz),
+            end_time=_to_datetime(event_data.get("end_time"), tz),
+            is_full_day=event_data.get("is_full_day", False),
+        )
+        event.full_clean(
+            exclude=["calendar_entry", "recurrence_rule"],
+            validate_unique=False,
+            validate_constraints=False,
+        )
+
+        rule = None
+        rule_data = event_data.get("recurrence_rule")
+        if rule_data:
+            try:
+                frequency = RecurrenceRule.Frequency[rule_data["frequency"]]
+            except KeyError:
+                raise ValidationError(
+                    f"Invalid frequency: {rule_data.get('frequency')}"
+                )
+            rule = RecurrenceRule(
+                frequency=frequency.value,
+                interval=rule_data.get("interval", 1),
+                wkst=rule_data.get("wkst"),
+                count=rule_data.get("count"),
+                until=_to_datetime(rule_data.get("until"), tz),
+                bysetpos=rule_data.get("bysetpos"),
+                bymonth=rule_data.get("bymonth"),
+                bymonthday=rule_data.get("bymonthday"),
+                byyearday=rule_data.get("byyearday"),
+                byweekno=rule_data.get("byweekno"),
+                byweekday=rule_data.get("byweekday"),
+                byhour=rule_data.get("byhour"),
+                byminute=rule_data.get("byminute"),
+                bysecond=rule_data.get("bysecond"),
+            )
+            rule.full_clean(validate_unique=False, validate_constraints=False)
+            event.recurrence_rule = rule
+
+        exclusions = []
+        for exclusion_data in event_data.get("exclusions", []):
+            exclusion = ExclusionDateRange(
+                event=event,
+                start_date=_to_datetime(exclusion_data.get("start_date"), tz),
+                end_date=_to_datetime(exclusion_data.get("end_date"), tz),
+            )
+            if exclusion.start_date is None or exclusion.end_date is None:
+                raise ValidationError(
+                    "Each exclusion must have 'start_date' and 'end_date'"
+                )
+            exclusion.sync_time_component()
+            if exclusion.start_date >= exclusion.end_date:
+                raise ValidationError("Start date must be less than the end date.")
+            exclusions.append(exclusion)
+
+        events.append((event, rule, exclusions))
+
+    return events
+
+
+def create_schedules(graphs: list[ScheduleGraph]) -> list[CalendarEntry]:
+    """
+    Inserts validated schedules with one ``bulk_create`` per model inside a single
+    transaction, then recalculates their occurrence fields.
+
+    :param graphs: Schedules built by :func:`build_schedule`
+    :type graphs: list[ScheduleGraph]
+    :return: The created calendar entries, with their occurrence fields populated
+    :rtype: list[CalendarEntry]
+    """
+    with transaction.atomic():
+        entries = CalendarEntry.objects.bulk_create([entry for entry, _ in graphs])
+        RecurrenceRule.objects.bulk_create(
+            [rule for _, events in graphs for _, rule, _ in events if rule is not None]
+        )
+        # the related objects now have primary keys, so their foreign keys are filled
+        # in by bulk_create
+        Event.objects.bulk_create(
+            [event for _, events in graphs for event, _, _ in events]
+        )
+        ExclusionDateRange.objects.bulk_create(
+            [
+                exclusion
+                for _, events in graphs
+                for _, _, exclusions in events
+                for exclusion in exclusions
+            ]
+        )
+
+        for entry in entries:
+            # primary keys of deleted entries may be reused
+            ruleset_cache.invalidate(entry.pk)
+
+        recalculated = {
+            entry.pk: entry
+            for entry in CalendarEntry.objects.filter(
+                pk__in=[entry.pk for entry in entries]
+            ).recalculate_occurrences()
+        }
+
+    return [recalculated[entry.pk] for entry in entries]
+
+
+def bulk_create_schedules(schedules: Iterable[dict[str, Any]]) -> list[CalendarEntry]:
+    """
+    Validates schedule dictionaries in memory, then creates them all at once.
+
+    Nothing is created if any schedule is invalid.
+
+    :param schedules: Dictionaries in the format of ``CalendarEntry.to_dict()``
+    :type schedules: Iterable[dict[str, Any]]
+    :return: The created calendar entries, with their occurrence fields populated
+    :rtype: list[CalendarEntry]
+    :raises ValidationError: Listing the errors of every invalid schedule by index
+    """
+    schedules = list(schedules)
+    timezones = get_timezones(data.get("timezone", "UTC") for data in schedules)
+
+    graphs = []
+    errors = {}
+    for i, data in enumerate(schedules):
+        try:
+            graphs.append(build_schedule(data, timezones))
+        except ValidationError as e:
+            errors[str(i)] = e.messages
+    if errors:
+        raise ValidationError(errors)
+
+    return create_schedules(graphs)
+
+
+def merge_schedule(
+    calendar_entry: CalendarEntry, events_data: Iterable[dict[str, Any]]
+) -> bool:
+    """
+    Updates the saved events of a calendar entry in place to match event
+    dictionaries, writing only what changed.
+
+    Events are matched by ``id``, and anything without a matching ``id`` (such as
+    the temporary ids of the admin widget) is created. Each matched event keeps its
+    recurrence rule, which is updated, created or deleted as needed. Exclusions are
+    matched by ``id`` too, or failing that by their dates in the calendar entry's
+    timezone. Saved events and exclusions that aren't matched are deleted.
+
+    Everything is validated in memory first, then written with at most one bulk
+    insert, update or delete per model inside a single transaction. Like
+    :func:`create_schedules`, this bypasses the models' ``save()`` and ``delete()``
+    methods, so the calendar entry's schedule is marked changed once at the end
+    instead.
+
+    :param calendar_entry: The saved calendar entry
+    :type calendar_entry: CalendarEntry
+    :param events_data: Event dictionaries in the format of ``CalendarEntry.to_dict()``
+    :type events_data: Iterable[dict[str, Any]]
+    :return: Whether anything changed
+    :rtype: bool
+    :raises ValidationError: If any event is invalid, in which case nothing is written
+    """
+    events_data = list(events_data)
+    built = build_events(calendar_entry, events_data)
+    tz = calendar_entry.timezone.as_tz
+
+    existing = {
+        event.pk: event
+        for event in Event.objects.filter(calendar_entry=calendar_entry)
+        .select_related("recurrence_rule")
+        .prefetch_related("exclusions")
+    }
+    kept = set()
+    new_rules, changed_rules, removed_rules = [], [], []
+    new_events, changed_events = [], []
+    new_exclusions, changed_exclusions, removed_exclusions = [], [], []
+
+    for event_data, (event, rule, exclusions) in zip(events_data, built):
+        current = existing.get(_to_pk(event_data.get("id")))
+        if current is None or current.pk in kept:
+            if rule is not None:
+                new_rules.append(rule)
+            new_events.append(event)
+            new_exclusions.extend(exclusions)
+            continue
+        kept.add(current.pk)
+
+        changed = _copy_fields(event, current, EVENT_FIELDS)
+        if rule is None:
+            if current.recurrence_rule is not None:
+                removed_rules.append(current.recurrence_rule.pk)
+                current.recurrence_rule = None
+                changed = True
+        elif current.recurrence_rule is None:
+            new_rules.append(rule)
+            current.recurrence_rule = rule
+            changed = True
+        elif _copy_fields(rule, current.recurrence_rule, RULE_FIELDS):
+            changed_rules.append(current.recurrence_rule)
+        if changed:
+            changed_events.append(current)
+
+        # exclusions were synced to the incoming event's start time when they were
+        # built, so matching ones only need updating if that moved
+        remaining = {exclusion.pk: exclusion for exclusion in current.exclusions.all()}
+        unmatched = []
+        for exclusion_data, exclusion in zip(
+            event_data.get("exclusions", []), exclusions
+        ):
+            exclusion.event = current
+            match = remaining.pop(_to_pk(exclusion_data.get("id")), None)
+            if match is None:
+                unmatched.append(exclusion)
+            elif _copy_fields(exclusion, match, EXCLUSION_FIELDS):
+                changed_exclusions.append(match)
+        by_dates = {}
+        for match in remaining.values():
+            by_dates.setdefault(_local_dates(match, tz), []).append(match)
+        for exclusion in unmatched:
+            matches = by_dates.get(_local_dates(exclusion, tz))
+            if not matches:
+                new_exclusions.append(exclusion)
+                continue
+            match = matches.pop(0)
+            del remaining[match.pk]
+            if _copy_fields(exclusion, match, EXCLUSION_FIELDS):
+                changed_exclusions.append(match)
+        removed_exclusions.extend(remaining)
+
+    removed_events = []
+    for pk, event in existing.items():
+        if pk not in kept:
+            removed_events.append(pk)
+            if event.recurrence_rule is not None:
+                removed_rules.append(event.recurrence_rule.pk)
+
+    changes = [
+        new_rules,
+        changed_rules,
+        removed_rules,
+        new_events,
+        changed_events,
+        removed_events,
+        new_exclusions,
+        changed_exclusions,
+        removed_exclusions,
+    ]
+    if not any(changes):
+        return False
+
+    with transaction.atomic():
+        # rules first, so that new and changed events can point at them
+        RecurrenceRule.objects.bulk_create(new_rules)
+        RecurrenceRule.objects.bulk_update(changed_rules, RULE_FIELDS)
+        Event.objects.bulk_update(changed_events, [*EVENT_FIELDS, "recurrence_rule"])
+        Event.objects.bulk_create(new_events)
+        if removed_exclusions:
+            ExclusionDateRange.objects.filter(pk__in=removed_exclusions).delete()
+        ExclusionDateRange.objects.bulk_update(changed_exclusions, EXCLUSION_FIELDS)
+        ExclusionDateRange.objects.bulk_create(new_exclusions)
+        # deleting an event's rule would delete the event too, so events go first
+        if removed_events:
+            Event.objects.filter(pk__in=removed_events).delete()
+        if removed_rules:
+            RecurrenceRule.objects.filter(pk__in=removed_rules).delete()
+
+        _schedule_changed(calendar_entry.pk, calendar_entry)
+
+    return True
+
+
+def _copy_fields(source: Any, target: Any, fields: list[str]) -> bool:
+    """
+    Copies the fields that differ from one model instance to another, returning
+    whether any did.
+    """
+    changed = False
+    for field in fields:
+        value = getattr(source, field)
+        if getattr(target, field) != value:
+            setattr(target, field, value)
+            changed = True
+    return changed
+
+
+def _local_dates(exclusion: ExclusionDateRange, tz: ZoneInfo) -> tuple[date, date]:
+    """
+    Returns the start and end dates of an exclusion in the given timezone.
+    """
+    start = exclusion.start_date.astimezone(tz)
+    end = exclusion.end_date.astimezone(tz)
+    return start.date(), end.date()
+
+
+def _to_pk(value: Any) -> int | None:
+    """
+    Returns an id from a dictionary as a primary key, or None if it isn't one (e.g.
+    the admin widget's temporary ids).
+    """
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, int):
+        return value
+    if isinstance(value, str) and value.isdigit():
+        return int(value)
+    return None
+
+
+def _to_datetime(value: datetime | str | None, tz: ZoneInfo) -> datetime | None:
+    """
+    Parses ISO 8601 strings, and makes naive datetimes aware in the given timezone.
+    """
+    if value is None or value == "":
+        return None
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value)
+        except ValueError:
+            raise ValidationError(f"Invalid date/time: {value}")
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=tz)
+    return value
@@ -0,0 +1,134 @@
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from collections.abc import Hashable
+from typing import Any
+
+from django.conf import settings
+
+DEFAULT_RULESET_CACHE_SIZE = 1024
+
+
+class RulesetCache:
+    """
+    A thread-safe, process-local LRU cache of compiled rulesets.
+
+    Entries are stored per calendar entry primary key together with a version stamp
+    (e.g. the schedule version and timezone). A lookup with a different stamp is
+    treated as a miss, so stale rulesets are never returned once the stamp changes.
+
+    The maximum size is read from the ``RECURRING_RULESET_CACHE_SIZE`` setting
+    (defaulting to 1024) unless given explicitly. A size of 0 disables the cache.
+    """
+
+    def __init__(self, maxsize: int | None = None) -> None:
+        self._maxsize = maxsize
+        self._data: OrderedDict[Any, tuple[Hashable, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @property
+    def maxsize(self) -> int:
+        """
+        The maximum number of rulesets held before the least recently used is evicted.
+
+        :return: The maximum cache size
+        :rtype: int
+        """
+        if self._maxsize is not None:
+            return self._maxsize
+        return getattr(
+            settings, "RECURRING_RULESET_CACHE_SIZE", DEFAULT_RULESET_CACHE_SIZE
+        )
+
+    def get(self, key: Any, stamp: Hashable) -> Any | None:
+        """
+        Returns the cached ruleset for ``key`` if it was stored with the same stamp.
+
+        :param key: Usually the calendar entry's primary key
+        :type key: Any
+        :param stamp: The version stamp the ruleset must have been stored with
+        :type stamp: Hashable
+        :return: The cached ruleset or None on a miss
+        :rtype: Any | None
+        """
+        with self._lock:
+            cached = self._data.get(key)
+            if cached is None or cached[0] != stamp:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return cached[1]
+
+    def set(self, key: Any, stamp: Hashable, value: Any) -> None:
+        """
+        Stores a ruleset, evicting the least recently used ones if the cache is full.
+
+        :param key: Usually the calendar entry's primary key
+        :type key: Any
+        :param stamp: The version stamp to store the ruleset with
+        :type stamp: Hashable
+        :param value: The compiled ruleset
+        :type value: Any
+        """
+        maxsize = self.maxsize
+        if maxsize <= 0:
+            return
+
+        with self._lock:
+            self._data[key] = (stamp, value)
+            self._data.move_to_end(key)
+            while len(self._data) > maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key: Any) -> None:
+        """
+        Removes any ruleset cached for ``key``.
+
+        :param key: Usually the calendar entry's primary key
+        :type key: Any
+        """
+        with self._lock:
+            if self._data.pop(key, None) is not None:
+                self.invalidations += 1
+
+    def clear(self) -> None:
+        """
+        Empties the cache and resets its counters.
+        """
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+            self.invalidations = 0
+
+    def stats(self) -> dict[str, int]:
+        """
+        Returns the cache's counters.
+
+        :return: Hits, misses, evictions, invalidations, current size and maximum size
+        :rtype: dict[str, int]
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+            }
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+#: The cache used by :meth:`recurring.models.CalendarEntry.to_rruleset`
+ruleset_cache = RulesetCache()
@@ -0,0 +1,165 @@
+"""
+A compact, serialised form of a calendar entry's whole schedule.
+
+Rebuilding a schedule normally means joining the calendar entry's timezone, events,
+recurrence rules and exclusions. Instead, whenever occurrences are calculated (which
+happens whenever the schedule changes, see :mod:`recurring.recalculation`), the
+schedule is also compiled into the ``CalendarEntry.compiled_schedule`` JSON field::
+
+    {
+        "version": 1,
+        "schedule_version": 3,
+        "timezone_id": 2,
+        "timezone": "Europe/London",
+        "events": [
+            {
+                "id": 7,
+                "start": "2024-01-01T09:00:00+00:00",
+                "end": "2024-01-01T10:00:00+00:00",
+                "full_day": false,
+                "rrule": "FREQ=WEEKLY;INTERVAL=1;BYDAY=MO,FR",
+                "exclusions": [["2024-02-05T09:00:00+00:00", "2024-02-09T09:00:00+00:00"]]
+            }
+        ]
+    }
+
+Rules are stored as RRULE values with the until in UTC, and exclusions as their
+inclusive ``[start, end]`` ranges. Ranges aren't merged, as each one is expanded into
+its own EXDATEs in iCal; rulesets merge them into intervals when they're built.
+
+A compiled schedule is only used while it's current, i.e. while its
+``schedule_version`` and ``timezone_id`` match the calendar entry's and its
+``version`` is :data:`SCHEDULE_FORMAT_VERSION`. Older formats are ignored until the
+entry is recalculated, so the format can change without a data migration.
+
+Models are imported lazily, as :mod:`recurring.models` imports this module.
+"""
+
+import copy
+from datetime import datetime
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from .models import CalendarEntry
+
+#: The version of the format written by :func:`compile_schedule`
+SCHEDULE_FORMAT_VERSION = 1
+
+
+def compile_schedule(calendar_entry: "CalendarEntry") -> dict[str, Any]:
+    """
+    Serialises the timezone, events, recurrence rules and exclusions of a calendar
+    entry. Use ``with_schedule()`` when compiling many entries.
+
+    :param calendar_entry: The calendar entry to compile
+    :type calendar_entry: CalendarEntry
+    :return: The compiled schedule
+    :rtype: dict[str, Any]
+    """
+    return {
+        "version": SCHEDULE_FORMAT_VERSION,
+        "schedule_version": calendar_entry.schedule_version,
+        "timezone_id": calendar_entry.timezone_id,
+        "timezone": calendar_entry.timezone.name,
+        "events": [
+            {
+                "id": event.pk,
+                "start": event.start_time.isoformat(),
+                "end": event.end_time.isoformat() if event.end_time else None,
+                "full_day": event.is_full_day,
+                "rrule": event.recurrence_rule.to_rrule_string()
+                if event.recurrence_rule
+                else None,
+                "exclusions": [
+                    [exclusion.start_date.isoformat(), exclusion.end_date.isoformat()]
+                    for exclusion in event.exclusions.all()
+                ],
+            }
+            for event in calendar_entry.events.all()
+        ],
+    }
+
+
+def is_current(calendar_entry: "CalendarEntry") -> bool:
+    """
+    Returns whether a calendar entry's compiled schedule can be used in place of its
+    events, recurrence rules and exclusions.
+
+    :param calendar_entry: The calendar entry
+    :type calendar_entry: CalendarEntry
+    :return: True if the compiled schedule matches the entry's schedule version and timezone
+    :rtype: bool
+    """
+    schedule = calendar_entry.compiled_schedule
+    return (
+        calendar_entry.pk is not None
+        and isinstance(schedule, dict)
+        and schedule.get("version") == SCHEDULE_FORMAT_VERSION
+        and schedule.get("schedule_version") == calendar_entry.schedule_version
+        and schedule.get("timezone_id") == calendar_entry.timezone_id
+    )
+
+
+def load_schedule(calendar_entry: "CalendarEntry") -> "CalendarEntry":
+    """
+    Returns a copy of a calendar entry with its timezone, events, recurrence rules and
+    exclusions loaded from its compiled schedule, as if fetched with
+    ``with_schedule()``, so they can be read without any queries.
+
+    The loaded objects are only for reading: recurrence rules and exclusions have no
+    primary keys, so they can't be saved or deleted. The calendar entry itself is left
+    untouched.
+
+    :param calendar_entry: A calendar entry whose compiled schedule is current (see :func:`is_current`)
+    :type calendar_entry: CalendarEntry
+    :return: The copy of the calendar entry
+    :rtype: CalendarEntry
+    """
+    from .models import Event, ExclusionDateRange, RecurrenceRule, Timezone
+
+    schedule = calendar_entry.compiled_schedule
+    entry = copy.copy(calendar_entry)
+    entry._prefetched_objects_cache = {}
+    entry.timezone = Timezone(pk=schedule["timezone_id"], name=schedule["timezone"])
+
+    events = []
+    for data in schedule["events"]:
+        event = Event(
+            pk=data["id"],
+            calendar_entry=entry,
+            start_time=datetime.fromisoformat(data["start"]),
+            end_time=datetime.fromisoformat(data["end"]) if data["end"] else None,
+            is_full_day=data["full_day"],
+            recurrence_rule=RecurrenceRule.from_rrule_string(data["rrule"])
+            if data["rrule"]
+            else None,
+        )
+        _set_prefetched(
+            event,
+            "exclusions",
+            [
+                ExclusionDateRange(
+                    event=event,
+                    start_date=datetime.fromisoformat(start),
+                    end_date=datetime.fromisoformat(end),
+                )
+                for start, end in data["exclusions"]
+            ],
+        )
+        events.append(event)
+    _set_prefetched(entry, "events", events)
+
+    return entry
+
+
+def _set_prefetched(instance: Any, name: str, objects: list[Any]) -> None:
+    """
+    Stores objects as the prefetched contents of a related manager, the same way
+    ``prefetch_related()`` does.
+    """
+    queryset = getattr(instance, name).get_queryset()
+    queryset._result_cache = objects
+    queryset._prefetch_done = True
+    if not hasattr(instance, "_prefetched_objects_cache"):
+        instance._prefetched_objects_cache = {}
+    instance._prefetched_objects_cache[name] = queryset
@@ -0,0 +1,117 @@
+"""
+A bounded thread pool for the CPU-bound parts of the async model methods.
+
+The async methods of :class:`~recurring.models.CalendarEntry` load the schedule with
+Django's async ORM and then hand expanding it (compiling rulesets, iterating over
+occurrences, rendering iCal) to this pool, so the event loop stays free to serve other
+requests. The pool is shared by the whole process and holds at most
+``RECURRING_ASYNC_WORKERS`` threads (4 by default), so a burst of requests queues up
+rather than starting a thread each.
+
+Previews of unsaved schedules (see :mod:`recurring.preview`) run in a separate pool of
+at most ``RECURRING_PREVIEW_WORKERS`` threads (2 by default), as an expansion that
+outlives its time budget keeps its thread until dateutil gives up. A few slow previews
+can therefore only hold up other previews.
+
+Functions run in the pools must not query the database, as the threads have no
+connection management.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import functools
+import threading
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, TypeVar
+
+from django.conf import settings
+from django.core.signals import setting_changed
+
+DEFAULT_ASYNC_WORKERS = 4
+DEFAULT_PREVIEW_WORKERS = 2
+
+T = TypeVar("T")
+
+#: The thread name prefix and default size of each pool, keyed by the setting that
+#: sizes it
+_POOLS = {
+    "RECURRING_ASYNC_WORKERS": ("recurring", DEFAULT_ASYNC_WORKERS),
+    "RECURRING_PREVIEW_WORKERS": ("recurring-preview", DEFAULT_PREVIEW_WORKERS),
+}
+
+_executors: dict[str, ThreadPoolExecutor] = {}
+_lock = threading.Lock()
+
+
+def _get_pool(setting: str) -> ThreadPoolExecutor:
+    with _lock:
+        if setting not in _executors:
+            prefix, default = _POOLS[setting]
+            _executors[setting] = ThreadPoolExecutor(
+                max_workers=getattr(settings, setting, default),
+                thread_name_prefix=prefix,
+            )
+        return _executors[setting]
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """
+    Returns the shared executor, creating it the first time it's needed.
+
+    :return: The executor
+    :rtype: ThreadPoolExecutor
+    """
+    return _get_pool("RECURRING_ASYNC_WORKERS")
+
+
+def get_preview_executor() -> ThreadPoolExecutor:
+    """
+    Returns the executor for previews, creating it the first time it's needed.
+
+    :return: The executor
+    :rtype: ThreadPoolExecutor
+    """
+    return _get_pool("RECURRING_PREVIEW_WORKERS")
+
+
+def shutdown_executor(setting: str | None = None) -> None:
+    """
+    Shuts down the executors once their queued work is done. The next call to
+    :func:`run_in_executor` or :func:`get_preview_executor` starts a new one.
+
+    :param setting: Only shut down the executor sized by this setting
+    :type setting: str | None
+    """
+    with _lock:
+        names = [setting] if setting is not None else list(_executors)
+        executors = [_executors.pop(name, None) for name in names]
+    for executor in executors:
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+
+def _reset_executor(*, setting: str, **kwargs: Any) -> None:
+    if setting in _POOLS:
+        shutdown_executor(setting)
+
+
+setting_changed.connect(_reset_executor)
+
+
+async def run_in_executor(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """
+    Runs a function in the shared executor and waits for its result without blocking
+    the event loop.
+
+    :param func: The function to run. It must not query the database.
+    :type func: Callable
+    :param args: Positional arguments for the function
+    :param kwargs: Keyword arguments for the function
+    :return: The function's return value
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        get_executor(), functools.partial(func, *args, **kwargs)
+    )
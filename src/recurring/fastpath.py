@@ -0,0 +1,154 @@
+"""
+Arithmetic evaluation of fixed-interval recurrence rules.
+
+dateutil answers ``after()``, ``before()`` and ``between()`` by generating every
+occurrence from the start of the rule, so their cost grows with the time elapsed since
+then. Rules without any BY* parts whose frequency is a fixed length of time (weekly or
+shorter, e.g. every 15 minutes or every 2 days) occur at ``dtstart + k * interval``
+in local wall-clock time instead, so the occurrence nearest to any datetime can be
+found by division.
+
+Occurrences are generated on wall-clock times and only converted to instants when
+they're compared, exactly like dateutil, so they keep their local time across daylight
+saving changes. Near a change, wall-clock order and instant order can disagree, so the
+index found by division is checked against the neighbouring occurrences.
+"""
+
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+from typing import Any
+
+from dateutil.rrule import rrule
+
+from .bounds import STEPS
+
+#: The parts of an rrule that stop it being a fixed interval
+BY_PARTS = (
+    "bysetpos",
+    "bymonth",
+    "bymonthday",
+    "byyearday",
+    "byeaster",
+    "byweekno",
+    "byweekday",
+    "byhour",
+    "byminute",
+    "bysecond",
+)
+
+
+class FixedIntervalRule(rrule):
+    """
+    An rrule occurring every ``interval`` weeks, days, hours, minutes or seconds,
+    whose ``after()``, ``before()`` and ``between()`` are calculated rather than
+    iterated. Iterating over it is left to dateutil.
+
+    Create one with :meth:`supports` checked first, e.g.::
+
+        if FixedIntervalRule.supports(**kwargs):
+            rule = FixedIntervalRule(**kwargs)
+    """
+
+    def __init__(self, freq: int, **kwargs: Any) -> None:
+        super().__init__(freq, **kwargs)
+        self._step = STEPS[freq] * self._interval
+        self._tz = self._dtstart.tzinfo
+        self._start = self._dtstart.replace(tzinfo=None)
+        self._last_index: int | None = None
+        if self._count is not None:
+            self._last_index = self._count - 1
+        elif self._until is not None:
+            # dateutil stops at the first occurrence after until
+            self._last_index = self._index_after(self._until, inc=False) - 1
+
+    @classmethod
+    def supports(
+        cls, freq: int, dtstart: datetime | None = None, **kwargs: Any
+    ) -> bool:
+        """
+        Returns whether a rule with these rrule arguments can be evaluated with
+        arithmetic.
+
+        :param freq: The dateutil frequency of the rule
+        :type freq: int
+        :param dtstart: The start of the rule
+        :type dtstart: datetime | None
+        :param kwargs: The other rrule arguments
+        :return: True if the rule has a fixed interval
+        :rtype: bool
+        """
+        return (
+            freq in STEPS
+            and dtstart is not None
+            # dateutil drops microseconds from occurrences, but not from dtstart
+            and dtstart.microsecond == 0
+            and not any(kwargs.get(part) for part in BY_PARTS)
+        )
+
+    def _occurrence(self, index: int) -> datetime:
+        return (self._start + self._step * index).replace(tzinfo=self._tz)
+
+    def _offset_spread(self, local: datetime) -> timedelta:
+        """
+        Returns how much the UTC offset of the rule's timezone varies within two days of
+        a local time, which bounds how far wall-clock order and instant order disagree.
+        """
+        if self._tz is None:
+            return timedelta(0)
+        offsets = [
+            (local + timedelta(days=days))
+            .replace(tzinfo=self._tz, fold=fold)
+            .utcoffset()
+            for days in (-2, -1, 0, 1, 2)
+            for fold in (0, 1)
+        ]
+        return max(offsets) - min(offsets)
+
+    def _index_after(self, dt: datetime, inc: bool) -> int:
+        """
+        Returns the index of the first occurrence after ``dt`` (or at it, if ``inc``),
+        in the order dateutil generates them, ignoring the count and until.
+        """
+        if self._tz is not None and dt.tzinfo is not None:
+            local = dt.astimezone(self._tz).replace(tzinfo=None)
+        else:
+            local = dt.replace(tzinfo=None)
+
+        # every occurrence before this one is at least the offset spread before dt in
+        # wall-clock time, so it can't be after dt as an instant either
+        index = max(0, (local - self._offset_spread(local) - self._start) // self._step)
+        while True:
+            occurrence = self._occurrence(index)
+            # not ``occurrence == dt``, which is never true across timezones for
+            # times that are ambiguous or don't exist
+            if occurrence >= dt if inc else occurrence > dt:
+                return index
+            index += 1
+
+    def _end_index(self, index: int) -> int:
+        """
+        Caps an index to one past the last occurrence.
+        """
+        if self._last_index is None:
+            return index
+        return min(index, self._last_index + 1)
+
+    def after(self, dt: datetime, inc: bool = False) -> datetime | None:
+        index = self._index_after(dt, inc)
+        if self._last_index is not None and index > self._last_index:
+            return None
+        return self._occurrence(index)
+
+    def before(self, dt: datetime, inc: bool = False) -> datetime | None:
+        index = self._end_index(self._index_after(dt, not inc)) - 1
+        if index < 0:
+            return None
+        return self._occurrence(index)
+
+    def between(
+        self, after: datetime, before: datetime, inc: bool = False, count: int = 1
+    ) -> list[datetime]:
+        start = self._index_after(after, inc)
+        end = self._end_index(self._index_after(before, not inc))
+        return [self._occurrence(index) for index in range(start, end)]
@@ -1,16 +1,35 @@
 import json
 import logging
 from datetime import datetime
-from typing import Any, Dict
+from typing import Any
 
 from django import forms
+from django.conf import settings
+from django.db.models import Count
 
-from .models import CalendarEntry
-from .widgets import CalendarEntryWidget
+from . import instrumentation
+from .models import CalendarEntry, Event
+from .recalculation import deferred_recalculation
+from .widgets import DEFAULT_INLINE_LIMIT, CalendarEntryWidget
 
 logger = logging.getLogger(__name__)
 
 
+def schedule_size(calendar_entry: CalendarEntry) -> int:
+    """
+    Returns how many events and exclusions a calendar entry has, with one query.
+
+    :param calendar_entry: The saved calendar entry
+    :type calendar_entry: CalendarEntry
+    :return: The number of events plus the number of exclusions
+    :rtype: int
+    """
+    counts = Event.objects.filter(calendar_entry=calendar_entry).aggregate(
+        events=Count("pk", distinct=True), exclusions=Count("exclusions")
+    )
+    return counts["events"] + counts["exclusions"]
+
+
 class CalendarEntryForm(forms.ModelForm):
     calendar_entry = forms.CharField(required=False, widget=CalendarEntryWidget)
 
@@ -25,37 +44,42 @@ class CalendarEntryForm(forms.ModelForm):
         self.fields["calendar_entry"].widget.attrs["style"] = "display: none;"
 
         if self.instance.pk:
-            calendar_entry_data = self.instance.to_dict()
-            self.initial["calendar_entry"] = json.dumps(calendar_entry_data)
-            self.fields["calendar_entry"].widget.attrs["data-initial"] = json.dumps(
-                calendar_entry_data
+            widget = self.fields["calendar_entry"].widget
+            schedule_url = widget.get_schedule_url(self.instance.pk)
+            inline_limit = getattr(
+                settings, "RECURRING_WIDGET_INLINE_LIMIT", DEFAULT_INLINE_LIMIT
             )
+            if schedule_url and schedule_size(self.instance) > inline_limit:
+                # the widget loads the events in pages, so the page renders in
+                # constant time however large the schedule is
+                widget.schedule_url = schedule_url
+            else:
+                calendar_entry = CalendarEntry.objects.with_schedule().get(
+                    pk=self.instance.pk
+                )
+                self.initial["calendar_entry"] = json.dumps(calendar_entry.to_dict())
 
     def save(self, commit: bool = True) -> CalendarEntry:
         logger.info(f"Starting save method (commit={commit})")
         instance = super().save(commit=False)
         if commit:
-            logger.info("Commit is True, saving instance")
-            instance.save(recalculate=False)  # Save without recalculating
-
-            logger.info("Processing calendar_entry data")
-            calendar_entry_data = self.cleaned_data.get("calendar_entry")
-            if calendar_entry_data:
-                logger.info("Clearing existing events")
-                for event in instance.events.all():
-                    event.delete()
-
-                logger.info("Adding new events and exclusions")
-                instance.from_dict(calendar_entry_data)
-                instance.save(recalculate=False)
-
-            logger.info("Recalculating occurrences")
-            instance.calculate_occurrences()
+            # only the events, rules and exclusions that changed are written, and
+            # occurrences are recalculated once at the end
+            timer = instrumentation.timer("recurring.form.save", count_queries=True)
+            with timer, deferred_recalculation():
+                logger.info("Commit is True, saving instance")
+                instance.save()
+
+                logger.info("Processing calendar_entry data")
+                calendar_entry_data = self.cleaned_data.get("calendar_entry")
+                if calendar_entry_data:
+                    logger.info("Merging events and exclusions")
+                    instance.from_dict(calendar_entry_data, mode="merge")
 
         logger.info("Save method completed")
         return instance
 
-    def clean(self) -> Dict[str, Any]:
+    def clean(self) -> dict[str, Any]:
         logger.info("Inside clean")
         cleaned_data = super().clean()
 
@@ -154,13 +178,14 @@ class CalendarEntryForm(forms.ModelForm):
                                 tzinfo=submitted_timezone
                             )
 
-                            # Assert that start_date <= end_date
+                            # the widget only edits dates, so a single day has the
+                            # same start and end date
                             if (
-                                exclusion_data["start_date"]
-                                >= exclusion_data["end_date"]
+                                exclusion_data["start_date"].date()
+                                > exclusion_data["end_date"].date()
                             ):
                                 raise ValueError(
-                                    "Exclusion start date must be less than the end date."
+                                    "Exclusion start date must not be after the end date."
                                 )
 
             except json.JSONDecodeError:
@@ -0,0 +1,410 @@
+"""
+Streaming iCalendar export and import of many calendar entries.
+
+Rather than building one ``icalendar.Calendar`` in memory, the feed is yielded in
+chunks: the VCALENDAR header, one VTIMEZONE per distinct timezone, the VEVENTs of
+each calendar entry (loaded in batches with ``with_schedule()``) and the footer.
+Memory use therefore depends on the batch size, not on the number of entries.
+
+Likewise, imports read one VEVENT at a time and create calendar entries in batches
+with ``bulk_create`` (see :mod:`recurring.bulk`).
+"""
+
+from __future__ import annotations
+
+from collections.abc import Iterable, Iterator
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Any
+from zoneinfo import ZoneInfo
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Min, QuerySet
+from django.http import StreamingHttpResponse
+from django.utils import timezone as django_timezone
+from icalendar import Calendar, Timezone, TimezoneDaylight, TimezoneStandard
+from icalendar import Event as ICalEvent
+from icalendar.prop import vDDDTypes
+
+from . import instrumentation
+from .bulk import build_schedule, create_schedules, get_timezones
+from .models import RRULE_LIST_PARTS, RecurrenceRule
+from .timezones import year_transitions
+
+DEFAULT_BATCH_SIZE = 500
+
+# the name of imported entries with neither a SUMMARY nor a UID
+DEFAULT_IMPORT_NAME = "Imported event"
+
+# how many years after the current one VTIMEZONE transitions are listed for
+DEFAULT_VTIMEZONE_YEARS = 10
+
+
+def iter_ical(
+    queryset: QuerySet,
+    prod_id: str | None = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> Iterator[str]:
+    """
+    Yields an iCal feed of all the calendar entries in a queryset in chunks.
+
+    Calendar entries without events are skipped, as in ``CalendarEntry.to_ical()``.
+
+    :param queryset: The calendar entries to export
+    :type queryset: QuerySet
+    :param prod_id: The PRODID to use. Defaults to the ``ICAL_PROD_ID`` setting.
+    :type prod_id: str | None
+    :param batch_size: How many calendar entries to load per batch
+    :type batch_size: int
+    :return: An iterator of iCal strings that together form one VCALENDAR
+    :rtype: Iterator[str]
+    """
+    if prod_id is None:
+        prod_id = getattr(
+            settings, "ICAL_PROD_ID", "-//django-recurring//NONSGML v1.0//EN"
+        )
+
+    cal = Calendar()
+    cal.add("version", "2.0")
+    cal.add("prodid", prod_id)
+    header, footer = cal.to_ical().decode("utf-8").rsplit("END:VCALENDAR", 1)
+    yield header
+
+    first_starts = (
+        queryset.order_by()
+        .values_list("timezone__name")
+        .annotate(first_start=Min("events__start_time"))
+    )
+    last_year = django_timezone.now().year + getattr(
+        settings, "RECURRING_VTIMEZONE_YEARS", DEFAULT_VTIMEZONE_YEARS
+    )
+    for tz_name, first_start in first_starts:
+        if first_start is None:
+            continue
+        vtimezone = build_vtimezone(tz_name, first_start.year, last_year)
+        if vtimezone is not None:
+            yield vtimezone.to_ical().decode("utf-8")
+
+    for calendar_entry in queryset.with_schedule().iterator(chunk_size=batch_size):
+        with instrumentation.timer(
+            "recurring.ical.render", calendar_entry=calendar_entry.pk
+        ):
+            chunk = "".join(
+                ical_event.to_ical().decode("utf-8")
+                for ical_event in calendar_entry.to_ical_events()
+            )
+        if chunk:
+            yield chunk
+
+    yield "END:VCALENDAR" + footer
+
+
+def build_vtimezone(tz_name: str, first_year: int, last_year: int) -> Timezone | None:
+    """
+    Builds a VTIMEZONE listing a timezone's offset transitions between two years.
+
+    The timezone's offset at the start of ``first_year`` is given as the first
+    observance. Timezones that iCal writes as UTC (with a ``Z`` suffix rather than a
+    TZID) don't need a VTIMEZONE.
+
+    :param tz_name: The name of the timezone
+    :type tz_name: str
+    :param first_year: The first year to list transitions for
+    :type first_year: int
+    :param last_year: The last year to list transitions for
+    :type last_year: int
+    :return: The VTIMEZONE component, or None if it isn't needed
+    :rtype: Timezone | None
+    """
+    tz = ZoneInfo(tz_name)
+    start = datetime(first_year, 1, 1, tzinfo=timezone.utc)
+    if "TZID" not in vDDDTypes(start.astimezone(tz)).params:
+        return None
+
+    vtimezone = Timezone()
+    vtimezone.add("tzid", tz_name)
+
+    offset = year_transitions(tz_name, first_year)[0]
+    vtimezone.add_component(_observance(tz, int(start.timestamp()), offset, offset))
+    for year in range(first_year, last_year + 1):
+        for transition, new_offset in year_transitions(tz_name, year)[1]:
+            vtimezone.add_component(_observance(tz, transition, offset, new_offset))
+            offset = new_offset
+
+    return vtimezone
+
+
+def _observance(
+    tz: ZoneInfo, instant: int, offset_from: int, offset_to: int
+) -> TimezoneStandard | TimezoneDaylight:
+    """
+    Builds the STANDARD or DAYLIGHT observance starting at an instant.
+    """
+    dt = datetime.fromtimestamp(instant, tz)
+    observance = TimezoneDaylight() if dt.dst() else TimezoneStandard()
+    observance.add(
+        "dtstart",
+        datetime.fromtimestamp(instant + offset_from, timezone.utc).replace(
+            tzinfo=None
+        ),
+    )
+    observance.add("tzoffsetfrom", timedelta(seconds=offset_from))
+    observance.add("tzoffsetto", timedelta(seconds=offset_to))
+    tzname = dt.tzname()
+    if tzname:
+        observance.add("tzname", tzname)
+    return observance
+
+
+def streaming_ical_response(
+    queryset: QuerySet,
+    filename: str = "calendar.ics",
+    prod_id: str | None = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> StreamingHttpResponse:
+    """
+    Returns a response streaming an iCal feed of the calendar entries in a queryset.
+
+    :param queryset: The calendar entries to export
+    :type queryset: QuerySet
+    :param filename: The filename to download the feed as
+    :type filename: str
+    :param prod_id: The PRODID to use. Defaults to the ``ICAL_PROD_ID`` setting.
+    :type prod_id: str | None
+    :param batch_size: How many calendar entries to load per batch
+    :type batch_size: int
+    :return: A streaming ``text/calendar`` response
+    :rtype: StreamingHttpResponse
+    """
+    response = StreamingHttpResponse(
+        iter_ical(queryset, prod_id=prod_id, batch_size=batch_size),
+        content_type="text/calendar",
+    )
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
+
+
+#: iCal weekday abbreviations mapped to ``RecurrenceRule.wkst`` values
+WKST_VALUES = {weekday: value for value, weekday in RecurrenceRule.WEEKDAYS}
+
+
+def import_ical(
+    lines: Iterable[str],
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    default_timezone: str = "UTC",
+) -> dict[str, Any]:
+    """
+    Creates calendar entries from an iCal feed, read one VEVENT at a time.
+
+    Each VEVENT becomes an event. Consecutive VEVENTs sharing a UID (and timezone)
+    are grouped into one calendar entry, named after the first one's SUMMARY (or its
+    UID, as SUMMARY is optional). Entries
+    are created ``batch_size`` at a time, each batch with one ``bulk_create`` per model
+    in its own transaction, and have their occurrence fields recalculated once per
+    batch.
+
+    VEVENTs that can't be represented (e.g. overridden instances with a
+    RECURRENCE-ID, RDATEs or BYDAY ordinals like ``1MO``) are skipped and reported.
+
+    :param lines: The lines of the feed, e.g. a file opened in text mode
+    :type lines: Iterable[str]
+    :param batch_size: How many calendar entries to create at a time
+    :type batch_size: int
+    :param default_timezone: The timezone for floating times and unknown TZIDs
+    :type default_timezone: str
+    :return: The number of ``entries`` and ``events`` created, and a list of ``skipped`` VEVENTs with the reasons
+    :rtype: dict[str, Any]
+    """
+    result: dict[str, Any] = {"entries": 0, "events": 0, "skipped": []}
+    timezones: dict[str, Any] = {}
+    batch: list[dict[str, Any]] = []
+
+    def flush() -> None:
+        timezones.update(
+            get_timezones(
+                data["timezone"] for data in batch if data["timezone"] not in timezones
+            )
+        )
+        graphs = []
+        for data in batch:
+            try:
+                graphs.append(build_schedule(data, timezones))
+            except ValidationError as e:
+                result["skipped"].append(f"{data['uid']}: {'; '.join(e.messages)}")
+        create_schedules(graphs)
+        result["entries"] += len(graphs)
+        result["events"] += sum(len(events) for _, events in graphs)
+        batch.clear()
+
+    for vevent in iter_vevents(lines):
+        uid = str(vevent.get("UID", ""))
+        try:
+            tz_name, event_data = vevent_to_dict(vevent, default_timezone)
+        except (ValidationError, ValueError) as e:
+            message = "; ".join(e.messages) if isinstance(e, ValidationError) else e
+            result["skipped"].append(f"{uid}: {message}")
+            continue
+
+        if (
+            batch
+            and uid
+            and batch[-1]["uid"] == uid
+            and batch[-1]["timezone"] == tz_name
+        ):
+            batch[-1]["events"].append(event_data)
+            continue
+
+        if len(batch) >= batch_size:
+            flush()
+        batch.append(
+            {
+                "uid": uid,
+                "name": (
+                    str(vevent.get("SUMMARY", "")).strip() or uid or DEFAULT_IMPORT_NAME
+                )[:255],
+                "description": str(vevent.get("DESCRIPTION", "")),
+                "timezone": tz_name,
+                "events": [event_data],
+            }
+        )
+
+    if batch:
+        flush()
+
+    return result
+
+
+def iter_vevents(lines: Iterable[str]) -> Iterator[ICalEvent]:
+    """
+    Parses the VEVENTs of an iCal feed one at a time, without loading the whole feed.
+
+    :param lines: The lines of the feed
+    :type lines: Iterable[str]
+    :return: An iterator of VEVENT components
+    :rtype: Iterator[ICalEvent]
+    """
+    block: list[str] = []
+    depth = 0
+    for line in lines:
+        line = line.rstrip("\r\n")
+        # folded continuation lines start with whitespace so never match these
+        if line == "BEGIN:VEVENT":
+            depth += 1
+        if depth:
+            block.append(line)
+        if line == "END:VEVENT" and depth:
+            depth -= 1
+            if not depth:
+                yield ICalEvent.from_ical("\r\n".join(block) + "\r\n")
+                block = []
+
+
+def vevent_to_dict(
+    vevent: ICalEvent, default_timezone: str = "UTC"
+) -> tuple[str, dict[str, Any]]:
+    """
+    Maps a VEVENT's DTSTART, DTEND/DURATION, RRULE and EXDATEs onto an event
+    dictionary in the format of ``CalendarEntry.to_dict()``.
+
+    :param vevent: The VEVENT
+    :type vevent: ICalEvent
+    :param default_timezone: The timezone for floating times and unknown TZIDs
+    :type default_timezone: str
+    :return: The name of the event's timezone and the event dictionary
+    :rtype: tuple[str, dict[str, Any]]
+    :raises ValueError: If the VEVENT can't be represented
+    """
+    for prop in ("RECURRENCE-ID", "RDATE"):
+        if prop in vevent:
+            raise ValueError(f"{prop} is not supported")
+    if "DTSTART" not in vevent:
+        raise ValueError("DTSTART is required")
+
+    dtstart = vevent.decoded("DTSTART")
+    tz_name = _timezone_name(dtstart, default_timezone)
+    tz = ZoneInfo(tz_name)
+
+    is_full_day = not isinstance(dtstart, datetime)
+    start_time = _to_datetime(dtstart, tz)
+    end_time = None
+    if not is_full_day:
+        if "DTEND" in vevent:
+            end_time = _to_datetime(vevent.decoded("DTEND"), tz)
+        elif "DURATION" in vevent:
+            end_time = start_time + vevent.decoded("DURATION")
+        else:
+            raise ValueError("Events without a DTEND or DURATION are not supported")
+
+    rrule = vevent.get("RRULE")
+    exdates = vevent.get("EXDATE", [])
+    if not isinstance(exdates, list):
+        exdates = [exdates]
+
+    return tz_name, {
+        "start_time": start_time,
+        "end_time": end_time,
+        "is_full_day": is_full_day,
+        "recurrence_rule": _rrule_to_dict(rrule, tz) if rrule else {},
+        # each EXDATE excludes a single occurrence, like the interval of a one second
+        # exclusion (see ExclusionDateRange.to_interval())
+        "exclusions": [
+            {"start_date": exdate, "end_date": exdate + timedelta(seconds=1)}
+            for exdates_prop in exdates
+            for exdate in (_to_datetime(value.dt, tz) for value in exdates_prop.dts)
+        ],
+    }
+
+
+def _rrule_to_dict(rrule: Any, tz: ZoneInfo) -> dict[str, Any]:
+    """
+    Maps an RRULE onto a dictionary in the format of ``RecurrenceRule.to_dict()``.
+    """
+    byday = [str(day) for day in rrule.get("BYDAY", [])]
+    if any(day not in WKST_VALUES for day in byday):
+        raise ValueError(f"BYDAY ordinals are not supported: {','.join(byday)}")
+
+    rule_data: dict[str, Any] = {
+        "frequency": rrule["FREQ"][0],
+        "interval": int(rrule.get("INTERVAL", [1])[0]),
+        "byweekday": byday or None,
+    }
+    if "WKST" in rrule:
+        rule_data["wkst"] = WKST_VALUES[rrule["WKST"][0]]
+    if "COUNT" in rrule:
+        rule_data["count"] = int(rrule["COUNT"][0])
+    if "UNTIL" in rrule:
+        until = rrule["UNTIL"][0]
+        if not isinstance(until, datetime):
+            # include occurrences at any time on the last day
+            until = datetime.combine(until, time(23, 59, 59))
+        rule_data["until"] = _to_datetime(until, tz)
+    for part in RRULE_LIST_PARTS:
+        if part.upper() in rrule:
+            rule_data[part] = [int(value) for value in rrule[part.upper()]]
+
+    return rule_data
+
+
+def _timezone_name(dtstart: date | datetime, default_timezone: str) -> str:
+    """
+    Returns the name of a DTSTART's timezone, or the default for floating times.
+    """
+    if isinstance(dtstart, datetime) and dtstart.tzinfo is not None:
+        if isinstance(dtstart.tzinfo, ZoneInfo):
+            return dtstart.tzinfo.key
+        if dtstart.utcoffset() == timedelta(0):
+            return "UTC"
+        raise ValueError(f"Unsupported timezone: {dtstart.tzinfo}")
+    return default_timezone
+
+
+def _to_datetime(value: date | datetime, tz: ZoneInfo) -> datetime:
+    """
+    Converts an iCal date or datetime to an aware datetime, treating dates as
+    midnight and floating times as local to ``tz``.
+    """
+    if not isinstance(value, datetime):
+        value = datetime.combine(value, time())
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=tz)
+    return value
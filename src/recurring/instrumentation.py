@@ -0,0 +1,224 @@
+"""
+Timings and counters for schedule operations.
+
+Point the ``RECURRING_METRICS_HANDLER`` setting at a callable (or its dotted path)
+taking ``(kind, name, value, tags)`` to receive them, e.g. to forward them to StatsD
+or Prometheus:
+
+* ``kind`` is ``"timing"`` (``value`` in seconds) or ``"counter"``
+* ``name`` is e.g. ``"recurring.occurrences.calculate"``
+* ``tags`` is a dictionary, e.g. ``{"calendar_entry": 42}``
+
+Without a handler, :func:`timer` and :func:`incr` return straight away, so
+instrumentation costs next to nothing. Errors raised by the handler are logged rather
+than interrupting the operation being measured.
+
+For tests and benchmarks, :func:`collect_metrics` records everything in an
+:class:`InMemoryCollector`::
+
+    with collect_metrics() as metrics:
+        calendar_entry.calculate_occurrences()
+    assert metrics.count("recurring.occurrences.calculate") == 1
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from collections import defaultdict
+from collections.abc import Callable, Iterator
+from contextlib import AbstractContextManager, contextmanager, nullcontext
+from typing import Any
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import connection
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+MetricsHandler = Callable[[str, str, float, dict[str, Any]], None]
+
+_UNRESOLVED = object()
+_handler: Any = _UNRESOLVED
+_null_timer = nullcontext()
+
+
+def get_handler() -> MetricsHandler | None:
+    """
+    Returns the handler set by ``RECURRING_METRICS_HANDLER``, importing it the first
+    time it's needed.
+
+    :return: The metrics handler, or None if metrics are disabled
+    :rtype: MetricsHandler | None
+    """
+    global _handler
+    if _handler is _UNRESOLVED:
+        handler = getattr(settings, "RECURRING_METRICS_HANDLER", None)
+        if isinstance(handler, str):
+            handler = import_string(handler)
+        _handler = handler
+    return _handler
+
+
+def _reset_handler(*, setting: str, **kwargs: Any) -> None:
+    global _handler
+    if setting == "RECURRING_METRICS_HANDLER":
+        _handler = _UNRESOLVED
+
+
+setting_changed.connect(_reset_handler)
+
+
+def _emit(
+    handler: MetricsHandler, kind: str, name: str, value: float, tags: dict[str, Any]
+) -> None:
+    try:
+        handler(kind, name, value, tags)
+    except Exception:
+        logger.exception(f"Metrics handler failed to record {name}")
+
+
+def incr(name: str, value: float = 1, **tags: Any) -> None:
+    """
+    Increments a counter.
+
+    :param name: The name of the counter
+    :type name: str
+    :param value: How much to increment it by
+    :type value: float
+    :param tags: Tags to record with the value
+    """
+    handler = _handler if _handler is not _UNRESOLVED else get_handler()
+    if handler is None:
+        return
+    _emit(handler, "counter", name, value, tags)
+
+
+def timer(
+    name: str, count_queries: bool = False, **tags: Any
+) -> AbstractContextManager[Any]:
+    """
+    Times the block it wraps.
+
+    :param name: The name of the timing
+    :type name: str
+    :param count_queries: Whether to also count the database queries issued inside the block, as a ``<name>.queries`` counter
+    :type count_queries: bool
+    :param tags: Tags to record with the value
+    :return: A context manager
+    :rtype: AbstractContextManager
+    """
+    handler = _handler if _handler is not _UNRESOLVED else get_handler()
+    if handler is None:
+        return _null_timer
+    return _timer(handler, name, count_queries, tags)
+
+
+@contextmanager
+def _timer(
+    handler: MetricsHandler, name: str, count_queries: bool, tags: dict[str, Any]
+) -> Iterator[None]:
+    queries = 0
+
+    def count(execute: Callable, sql: str, params: Any, many: bool, context: Any):
+        nonlocal queries
+        queries += 1
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(count) if count_queries else nullcontext():
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            _emit(handler, "timing", name, time.perf_counter() - started, tags)
+            if count_queries:
+                _emit(handler, "counter", f"{name}.queries", queries, tags)
+
+
+class InMemoryCollector:
+    """
+    A metrics handler keeping every value in memory, for tests and benchmarks.
+
+    Values are stored per metric name, without their tags.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.timings: dict[str, list[float]] = defaultdict(list)
+        self.counters: dict[str, float] = defaultdict(float)
+
+    def __call__(
+        self, kind: str, name: str, value: float, tags: dict[str, Any]
+    ) -> None:
+        with self._lock:
+            if kind == "timing":
+                self.timings[name].append(value)
+            else:
+                self.counters[name] += value
+
+    def count(self, name: str) -> int:
+        """
+        Returns how many times a timing was recorded.
+
+        :param name: The name of the timing
+        :type name: str
+        :return: The number of timings recorded
+        :rtype: int
+        """
+        return len(self.timings.get(name, []))
+
+    def total(self, name: str) -> float:
+        """
+        Returns the total of a timing, in seconds, or of a counter.
+
+        :param name: The name of the timing or counter
+        :type name: str
+        :return: The total
+        :rtype: float
+        """
+        if name in self.timings:
+            return sum(self.timings[name])
+        return self.counters.get(name, 0)
+
+    def summary(self) -> dict[str, dict[str, float]]:
+        """
+        Summarises everything recorded, e.g. to store with benchmark results.
+
+        :return: The count and total of each timing and the total of each counter
+        :rtype: dict[str, dict[str, float]]
+        """
+        with self._lock:
+            summary: dict[str, dict[str, float]] = {
+                name: {"count": len(values), "seconds": sum(values)}
+                for name, values in self.timings.items()
+            }
+            for name, value in self.counters.items():
+                summary[name] = {"total": value}
+            return summary
+
+    def clear(self) -> None:
+        """
+        Forgets everything recorded.
+        """
+        with self._lock:
+            self.timings.clear()
+            self.counters.clear()
+
+
+@contextmanager
+def collect_metrics() -> Iterator[InMemoryCollector]:
+    """
+    Records the metrics emitted inside the block in a new :class:`InMemoryCollector`,
+    instead of passing them to the configured handler.
+
+    :return: The collector
+    :rtype: Iterator[InMemoryCollector]
+    """
+    global _handler
+    previous, _handler = _handler, InMemoryCollector()
+    try:
+        yield _handler
+    finally:
+        _handler = previous
@@ -0,0 +1,78 @@
+"""
+Helpers for management commands that spread work across a process pool.
+
+These live apart from the commands themselves so that worker processes started with
+the ``spawn`` method can import them before Django's app registry is ready.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Iterator
+
+import django
+
+
+def init_worker(database_names: dict[str, str] | None = None) -> None:
+    """
+    Sets up Django in a freshly started worker process.
+
+    :param database_names: The names of the databases the parent process uses, keyed by alias, so that workers use the same ones (e.g. a test database)
+    :type database_names: dict[str, str] | None
+    """
+    django.setup()
+
+    from django.db import connections
+
+    for alias, name in (database_names or {}).items():
+        connections[alias].settings_dict["NAME"] = name
+
+
+def iter_pk_ranges(chunk_size: int) -> Iterator[tuple[int, int]]:
+    """
+    Streams inclusive ``(first_pk, last_pk)`` ranges covering all calendar entries,
+    each holding at most ``chunk_size`` entries. Only primary keys are loaded, one
+    chunk at a time.
+
+    :param chunk_size: The maximum number of entries in each range
+    :type chunk_size: int
+    :return: An iterator of primary key ranges
+    :rtype: Iterator[tuple[int, int]]
+    """
+    from recurring.models import CalendarEntry
+
+    last_pk = None
+    while True:
+        queryset = CalendarEntry.objects.order_by("pk")
+        if last_pk is not None:
+            queryset = queryset.filter(pk__gt=last_pk)
+        pks = list(queryset.values_list("pk", flat=True)[:chunk_size])
+        if not pks:
+            return
+        last_pk = pks[-1]
+        yield pks[0], last_pk
+
+
+def recalculate_chunk(
+    first_pk: int, last_pk: int, window_days: int, window_multiple: int
+) -> int:
+    """
+    Recalculates the occurrence fields for calendar entries with primary keys in
+    ``[first_pk, last_pk]``, writing them back with a single ``bulk_update``.
+
+    :param first_pk: The first primary key in the chunk
+    :type first_pk: int
+    :param last_pk: The last primary key in the chunk
+    :type last_pk: int
+    :param window_days: Passed through to ``calculate_occurrences()``
+    :type window_days: int
+    :param window_multiple: Passed through to ``calculate_occurrences()``
+    :type window_multiple: int
+    :return: The number of calendar entries processed
+    :rtype: int
+    """
+    from recurring.models import CalendarEntry
+
+    entries = CalendarEntry.objects.filter(
+        pk__gte=first_pk, pk__lte=last_pk
+    ).recalculate_occurrences(window_days=window_days, window_multiple=window_multiple)
+    return len(entries)
@@ -1,22 +1,110 @@
-from django.core.management.base import BaseCommand
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.core.management.base import BaseCommand, CommandParser
+from django.db import connections
+
 from recurring.models import CalendarEntry
 
+from ._workers import init_worker, iter_pk_ranges, recalculate_chunk
+
 
 class Command(BaseCommand):
     help = (
         "Recalculates first/next/last, etc occurrence fields for all calendar entries"
     )
 
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help="Number of worker processes to recalculate chunks in parallel",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=500,
+            help="Number of calendar entries loaded and written back at a time",
+        )
+        parser.add_argument(
+            "--window-days",
+            type=int,
+            default=365,
+            help="No longer used, as first/last occurrences are exact",
+        )
+        parser.add_argument(
+            "--window-multiple",
+            type=int,
+            default=3,
+            help="No longer used, as first/last occurrences are exact",
+        )
+
     def handle(self, *args, **options):
-        calendar_entries = CalendarEntry.objects.all()
-        total = calendar_entries.count()
+        workers = options["workers"]
+        chunk_size = options["chunk_size"]
+        chunk_kwargs = {
+            "window_days": options["window_days"],
+            "window_multiple": options["window_multiple"],
+        }
+        total = CalendarEntry.objects.count()
 
         self.stdout.write(f"Recalculating occurrences for {total} calendar entries...")
 
-        for i, calendar_entry in enumerate(calendar_entries, 1):
-            calendar_entry.calculate_occurrences()
-            self.stdout.write(f"Processed {i}/{total}: {calendar_entry.name}")
+        started = time.monotonic()
+        self.processed = 0
+        self.next_report = 0.1
+
+        if workers > 1:
+            pk_ranges = list(iter_pk_ranges(chunk_size))
+            database_names = {
+                alias: connections[alias].settings_dict["NAME"] for alias in connections
+            }
+            # workers are spawned rather than forked, so they open their own
+            # database connections instead of sharing the parent's
+            connections.close_all()
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=init_worker,
+                initargs=(database_names,),
+            ) as executor:
+                futures = [
+                    executor.submit(
+                        recalculate_chunk, first_pk, last_pk, **chunk_kwargs
+                    )
+                    for first_pk, last_pk in pk_ranges
+                ]
+                for future in as_completed(futures):
+                    self.report_progress(future.result(), total, options["verbosity"])
+        else:
+            for first_pk, last_pk in iter_pk_ranges(chunk_size):
+                count = recalculate_chunk(first_pk, last_pk, **chunk_kwargs)
+                self.report_progress(count, total, options["verbosity"])
 
+        elapsed = time.monotonic() - started
         self.stdout.write(
-            self.style.SUCCESS("Successfully recalculated all occurrences")
+            self.style.SUCCESS(
+                f"Successfully recalculated occurrences for {self.processed} "
+                f"calendar entries in {elapsed:.1f}s"
+            )
         )
+
+    def report_progress(self, count: int, total: int, verbosity: int) -> None:
+        """
+        Writes a progress line every 10% (or every chunk with ``--verbosity 2``).
+
+        :param count: The number of entries in the chunk that just completed
+        :type count: int
+        :param total: The total number of entries being processed
+        :type total: int
+        :param verbosity: The command's verbosity
+        :type verbosity: int
+        """
+        self.processed += count
+        fraction = self.processed / total if total else 1
+        if verbosity >= 2 or fraction >= self.next_report:
+            self.stdout.write(f"Processed {self.processed}/{total} ({fraction:.0%})")
+            while self.next_report <= fraction:
+                self.next_report += 0.1
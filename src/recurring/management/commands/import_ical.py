@@ -0,0 +1,54 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandParser
+
+from recurring.ical import DEFAULT_BATCH_SIZE, import_ical
+
+
+class Command(BaseCommand):
+    help = "Creates calendar entries from the VEVENTs of one or more .ics files"
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("paths", nargs="+", help="The .ics files to import")
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help="Number of calendar entries created in each transaction",
+        )
+        parser.add_argument(
+            "--timezone",
+            default="UTC",
+            help="Timezone for floating times and unknown TZIDs",
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        entries = events = 0
+
+        for path in options["paths"]:
+            with open(path, encoding="utf-8") as f:
+                result = import_ical(
+                    f,
+                    batch_size=options["batch_size"],
+                    default_timezone=options["timezone"],
+                )
+
+            entries += result["entries"]
+            events += result["events"]
+            if result["skipped"]:
+                self.stderr.write(
+                    self.style.WARNING(
+                        f"Skipped {len(result['skipped'])} VEVENTs in {path}"
+                    )
+                )
+                if options["verbosity"] > 1:
+                    for reason in result["skipped"]:
+                        self.stderr.write(f"  {reason}")
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Successfully imported {entries} calendar entries ({events} events) "
+                f"in {time.monotonic() - started:.1f}s"
+            )
+        )
@@ -0,0 +1,94 @@
+import logging
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+from django.utils import timezone as django_timezone
+from django.utils.module_loading import import_string
+
+from recurring.models import CalendarEntry
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = (
+        "Claims calendar entries whose next occurrence is due, advances their "
+        "occurrence fields and passes each to a handler"
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            "--handler",
+            help=(
+                "Dotted path to a callable taking a claimed CalendarEntry. "
+                "Defaults to the RECURRING_DUE_HANDLER setting"
+            ),
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=100,
+            help="Number of due calendar entries claimed at a time",
+        )
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Keep polling for due entries instead of exiting once none are due",
+        )
+        parser.add_argument(
+            "--sleep",
+            type=float,
+            default=1.0,
+            help="Seconds to wait between polls with --loop when nothing is due",
+        )
+
+    def handle(self, *args, **options):
+        handler_path = options["handler"] or getattr(
+            settings, "RECURRING_DUE_HANDLER", None
+        )
+        if not handler_path:
+            raise CommandError(
+                "No handler given. Pass --handler or set RECURRING_DUE_HANDLER"
+            )
+        try:
+            handler = import_string(handler_path)
+        except ImportError as e:
+            raise CommandError(f"Couldn't import handler {handler_path}: {e}")
+
+        started = time.monotonic()
+        processed = failed = 0
+
+        try:
+            while True:
+                entries = CalendarEntry.objects.claim_due(
+                    now=django_timezone.now(), limit=options["batch_size"]
+                )
+                if not entries:
+                    if not options["loop"]:
+                        break
+                    time.sleep(options["sleep"])
+                    continue
+
+                for entry in entries:
+                    try:
+                        handler(entry)
+                    except Exception:
+                        failed += 1
+                        logger.exception(
+                            f"Error handling due CalendarEntry {entry.pk} "
+                            f"({entry.due_occurrence})"
+                        )
+                    processed += 1
+
+                if options["verbosity"] >= 2:
+                    self.stdout.write(f"Processed {processed} due calendar entries")
+        except KeyboardInterrupt:
+            pass
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Processed {processed} due calendar entries ({failed} failed) "
+                f"in {time.monotonic() - started:.1f}s"
+            )
+        )
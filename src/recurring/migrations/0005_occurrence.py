@@ -0,0 +1,67 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:50
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("recurring", "0004_calendarentry_created_at_calendarentry_updated_at"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Occurrence",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "start_utc",
+                    models.DateTimeField(
+                        help_text="When the occurrence starts, in UTC"
+                    ),
+                ),
+                (
+                    "end_utc",
+                    models.DateTimeField(help_text="When the occurrence ends, in UTC"),
+                ),
+                (
+                    "calendar_entry",
+                    models.ForeignKey(
+                        help_text="The calendar entry this occurrence belongs to",
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="occurrences",
+                        to="recurring.calendarentry",
+                    ),
+                ),
+                (
+                    "event",
+                    models.ForeignKey(
+                        help_text="The event that generated this occurrence",
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="occurrences",
+                        to="recurring.event",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["start_utc", "end_utc"],
+                        name="recurring_occurrence_range",
+                    ),
+                    models.Index(
+                        fields=["calendar_entry", "start_utc"],
+                        name="recurring_occurrence_entry",
+                    ),
+                ],
+            },
+        ),
+    ]
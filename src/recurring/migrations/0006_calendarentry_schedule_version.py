@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("recurring", "0005_occurrence"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="calendarentry",
+            name="schedule_version",
+            field=models.PositiveIntegerField(
+                default=0,
+                editable=False,
+                help_text="Incremented whenever an event, recurrence rule or exclusion of this calendar entry changes",
+            ),
+        ),
+    ]
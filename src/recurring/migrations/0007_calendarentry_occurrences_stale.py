@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("recurring", "0006_calendarentry_schedule_version"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="calendarentry",
+            name="occurrences_stale",
+            field=models.BooleanField(
+                db_index=True,
+                default=False,
+                editable=False,
+                help_text="Set when the schedule changes, until the occurrences are recalculated",
+            ),
+        ),
+    ]
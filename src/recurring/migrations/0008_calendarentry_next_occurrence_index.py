@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("recurring", "0007_calendarentry_occurrences_stale"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="calendarentry",
+            name="next_occurrence",
+            field=models.DateTimeField(
+                blank=True,
+                db_index=True,
+                help_text="The next occurrence of this calendar entry from the last time occurrences were calculated",
+                null=True,
+            ),
+        ),
+    ]
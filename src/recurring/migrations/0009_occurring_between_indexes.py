@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("recurring", "0008_calendarentry_next_occurrence_index"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="event",
+            name="start_time",
+            field=models.DateTimeField(db_index=True),
+        ),
+        migrations.AlterField(
+            model_name="recurrencerule",
+            name="until",
+            field=models.DateTimeField(
+                blank=True,
+                db_index=True,
+                help_text="The date and time until which occurrences will be generated",
+                null=True,
+            ),
+        ),
+    ]
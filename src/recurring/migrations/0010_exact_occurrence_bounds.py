@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    def mark_occurrences_stale(apps, schema_editor):
+        # first and last occurrences were capped to a window, and open-ended
+        # schedules had a last occurrence, until they're recalculated
+        CalendarEntry = apps.get_model("recurring", "CalendarEntry")
+        CalendarEntry.objects.update(occurrences_stale=True)
+
+    dependencies = [
+        ("recurring", "0009_occurring_between_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="calendarentry",
+            name="is_infinite",
+            field=models.BooleanField(
+                db_index=True,
+                default=False,
+                editable=False,
+                help_text="Whether any event of this calendar entry recurs forever",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="calendarentry",
+            name="first_occurrence",
+            field=models.DateTimeField(
+                blank=True,
+                db_index=True,
+                help_text="The first occurrence of this calendar entry",
+                null=True,
+            ),
+        ),
+        migrations.AlterField(
+            model_name="calendarentry",
+            name="last_occurrence",
+            field=models.DateTimeField(
+                blank=True,
+                db_index=True,
+                help_text="The last occurrence of this calendar entry. Empty if it recurs forever.",
+                null=True,
+            ),
+        ),
+        migrations.RunPython(mark_occurrences_stale, migrations.RunPython.noop),
+    ]
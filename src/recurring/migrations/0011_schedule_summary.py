@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-17 05:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    def copy_timezone_names(apps, schema_editor):
+        # summaries are left empty until occurrences are recalculated, and described
+        # from the schedule until then
+        CalendarEntry = apps.get_model("recurring", "CalendarEntry")
+        Timezone = apps.get_model("recurring", "Timezone")
+        CalendarEntry.objects.update(
+            timezone_name=models.Subquery(
+                Timezone.objects.filter(pk=models.OuterRef("timezone_id")).values(
+                    "name"
+                )[:1]
+            )
+        )
+
+    dependencies = [
+        ("recurring", "0010_exact_occurrence_bounds"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="calendarentry",
+            name="summary_text",
+            field=models.TextField(
+                blank=True,
+                editable=False,
+                help_text="A description of when this calendar entry occurs, saved when occurrences are calculated",
+            ),
+        ),
+        migrations.AddField(
+            model_name="calendarentry",
+            name="timezone_name",
+            field=models.CharField(
+                blank=True,
+                editable=False,
+                help_text="The name of the timezone, saved when occurrences are calculated",
+                max_length=64,
+            ),
+        ),
+        migrations.RunPython(copy_timezone_names, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-17 05:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("recurring", "0011_schedule_summary"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="calendarentry",
+            name="compiled_schedule",
+            field=models.JSONField(
+                blank=True,
+                editable=False,
+                help_text="The whole schedule serialised when occurrences are calculated, so it can be read without joins",
+                null=True,
+            ),
+        ),
+    ]
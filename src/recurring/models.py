@@ -1,35 +1,48 @@
+from __future__ import annotations
+
+import hashlib
 import logging
-import traceback
 import uuid
+from collections.abc import Iterable, Iterator
 from datetime import datetime, timedelta
-from typing import Any, Dict, Optional
+from typing import Any
 from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 
+from asgiref.sync import sync_to_async
 from dateutil.rrule import (
-    YEARLY,
-    MONTHLY,
-    WEEKLY,
     DAILY,
+    FR,
     HOURLY,
     MINUTELY,
-    SECONDLY,
     MO,
-    TU,
-    WE,
-    TH,
-    FR,
+    MONTHLY,
     SA,
+    SECONDLY,
     SU,
+    TH,
+    TU,
+    WE,
+    WEEKLY,
+    YEARLY,
     rrule,
-    rruleset,
 )
 from django.conf import settings
+from django.core.cache import BaseCache, caches
 from django.core.exceptions import ValidationError
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F
 from django.template.defaultfilters import date as date_filter
 from django.utils import timezone as django_timezone
 from django.utils.translation import gettext_lazy as _
-from icalendar import Calendar, Event as ICalEvent
+from icalendar import Calendar, vRecur
+from icalendar import Event as ICalEvent
+
+from . import bounds, compiled, instrumentation
+from .cache import ruleset_cache
+from .executor import run_in_executor
+from .fastpath import FixedIntervalRule
+from .recalculation import deferred_recalculation, mark_stale
+from .rulesets import ScheduleRuleset
 
 # created in migrations
 UTC_ID = 1
@@ -47,6 +60,51 @@ class WeekDay:
 
 logger = logging.getLogger(__name__)
 
+#: The namespace of the UUIDs used as iCal UIDs
+ICAL_UID_NAMESPACE = uuid.uuid5(
+    uuid.NAMESPACE_URL, "https://github.com/boosh/django_recurring"
+)
+
+
+def _ical_cache() -> BaseCache | None:
+    """
+    Returns the cache rendered iCal is kept in, set by the ``RECURRING_ICAL_CACHE``
+    setting, or None if it's disabled.
+    """
+    alias = getattr(settings, "RECURRING_ICAL_CACHE", "default")
+    if alias is None:
+        return None
+    return caches[alias]
+
+
+def _schedule_changed(
+    calendar_entry_id: int | None, calendar_entry: CalendarEntry | None = None
+) -> None:
+    """
+    Records that the schedule of a calendar entry changed by bumping its
+    ``schedule_version`` and ``updated_at``, evicting its compiled ruleset from the cache and marking its
+    occurrences stale so they're recalculated (see :mod:`recurring.recalculation`).
+
+    :param calendar_entry_id: The primary key of the changed calendar entry
+    :type calendar_entry_id: int | None
+    :param calendar_entry: A loaded instance of the calendar entry to keep in step, so that it doesn't use its outdated compiled schedule
+    :type calendar_entry: CalendarEntry | None
+    """
+    if calendar_entry_id is None:
+        return
+    now = django_timezone.now()
+    CalendarEntry.objects.filter(pk=calendar_entry_id).update(
+        schedule_version=F("schedule_version") + 1,
+        occurrences_stale=True,
+        updated_at=now,
+    )
+    if calendar_entry is not None and calendar_entry.pk == calendar_entry_id:
+        calendar_entry.schedule_version += 1
+        calendar_entry.occurrences_stale = True
+        calendar_entry.updated_at = now
+    ruleset_cache.invalidate(calendar_entry_id)
+    mark_stale(calendar_entry_id)
+
 
 class Timezone(models.Model):
     """
@@ -100,6 +158,19 @@ class Timezone(models.Model):
         super().save(*args, **kwargs)
 
 
+#: RRULE parts stored as lists of integers
+RRULE_LIST_PARTS = (
+    "bysetpos",
+    "bymonth",
+    "bymonthday",
+    "byyearday",
+    "byweekno",
+    "byhour",
+    "byminute",
+    "bysecond",
+)
+
+
 class RecurrenceRule(models.Model):
     """
     Represents a recurrence rule for calendar events.
@@ -151,6 +222,7 @@ class RecurrenceRule(models.Model):
     until = models.DateTimeField(
         null=True,
         blank=True,
+        db_index=True,
         help_text=_("The date and time until which occurrences will be generated"),
     )
     bysetpos = models.JSONField(
@@ -195,12 +267,12 @@ class RecurrenceRule(models.Model):
         """
         return self.Frequency(self.frequency).name
 
-    def get_wkst_display(self) -> Optional[str]:
+    def get_wkst_display(self) -> str | None:
         """
         Returns the display name of the week start day.
 
         :return: The name of the week start day, or None if not set
-        :rtype: Optional[str]
+        :rtype: str | None
         """
         return dict(self.WEEKDAYS)[self.wkst] if self.wkst is not None else None
 
@@ -222,15 +294,44 @@ class RecurrenceRule(models.Model):
         """
         self.full_clean()
         super().save(*args, **kwargs)
+        _schedule_changed(self._calendar_entry_id())
+
+    def delete(self, *args: Any, **kwargs: Any) -> Any:
+        """
+        Deletes the RecurrenceRule object.
 
-    def _get_rrule_kwargs(self, start_date: datetime) -> Dict[str, Any]:
+        :param args: Variable length argument list
+        :param kwargs: Arbitrary keyword arguments
+        """
+        calendar_entry_id = self._calendar_entry_id()
+        result = super().delete(*args, **kwargs)
+        _schedule_changed(calendar_entry_id)
+        return result
+
+    def _calendar_entry_id(self) -> int | None:
+        """
+        Returns the primary key of the calendar entry whose event uses this rule.
+
+        :return: The calendar entry's primary key, or None if no event uses this rule
+        :rtype: int | None
+        """
+        try:
+            return self.event.calendar_entry_id
+        except Event.DoesNotExist:
+            return None
+
+    def _get_rrule_kwargs(
+        self, start_date: datetime, tz: ZoneInfo | None = None
+    ) -> dict[str, Any]:
         """
         Generates keyword arguments for creating an rrule object.
 
         :param start_date: The start date for the recurrence rule
         :type start_date: datetime
+        :param tz: The timezone of the calendar entry. Looked up via the event if not given.
+        :type tz: ZoneInfo | None
         :return: A dictionary of keyword arguments for rrule
-        :rtype: Dict[str, Any]
+        :rtype: dict[str, Any]
         """
         weekday_map = {
             WeekDay.MONDAY: MO,
@@ -242,11 +343,16 @@ class RecurrenceRule(models.Model):
             WeekDay.SUNDAY: SU,
         }
 
-        timezone = (
-            self.event.calendar_entry.timezone.as_tz if hasattr(self, "event") else None
-        )
+        if tz is not None:
+            timezone = tz
+        else:
+            timezone = (
+                self.event.calendar_entry.timezone.as_tz
+                if hasattr(self, "event")
+                else None
+            )
 
-        kwargs: Dict[str, Any] = {
+        kwargs: dict[str, Any] = {
             "freq": self.frequency,
             "interval": self.interval,
             "dtstart": start_date.astimezone(timezone) if timezone else start_date,
@@ -283,23 +389,148 @@ class RecurrenceRule(models.Model):
 
         return kwargs
 
-    def to_rrule(self, start_date: datetime) -> rrule:
+    def to_rrule(self, start_date: datetime, tz: ZoneInfo | None = None) -> rrule:
         """
         Creates an rrule object from the RecurrenceRule.
 
+        Rules with a fixed interval (no BY* parts and a frequency of weekly or shorter)
+        are created as a :class:`~recurring.fastpath.FixedIntervalRule`, which
+        calculates ``after()``, ``before()`` and ``between()`` instead of iterating.
+
         :param start_date: The start date for the recurrence rule
         :type start_date: datetime
+        :param tz: The timezone of the calendar entry. Looked up via the event if not given.
+        :type tz: ZoneInfo | None
         :return: An rrule object
         :rtype: rrule
         """
-        return rrule(**self._get_rrule_kwargs(start_date))
+        kwargs = self._get_rrule_kwargs(start_date, tz=tz)
+        if FixedIntervalRule.supports(**kwargs):
+            return FixedIntervalRule(**kwargs)
+        return rrule(**kwargs)
+
+    def to_ical_rrule(self, tz: ZoneInfo | None = None) -> dict[str, Any]:
+        """
+        Converts the RecurrenceRule to the RRULE parts icalendar expects.
+
+        :param tz: The timezone to give the until in. Left as it is if not given.
+        :type tz: ZoneInfo | None
+        :return: A dictionary of RRULE parts, e.g. ``{"freq": "WEEKLY", "interval": 1}``
+        :rtype: dict[str, Any]
+        """
+        rrule_dict: dict[str, Any] = {
+            "freq": self.get_frequency_display(),
+            "interval": self.interval,
+        }
+        if self.wkst is not None:
+            rrule_dict["wkst"] = self.get_wkst_display()
+        if self.count is not None:
+            rrule_dict["count"] = self.count
+        if self.until is not None:
+            rrule_dict["until"] = self.until.astimezone(tz) if tz else self.until
+        for part in RRULE_LIST_PARTS:
+            if getattr(self, part):
+                rrule_dict[part] = getattr(self, part)
+        if self.byweekday:
+            rrule_dict["byday"] = self.byweekday
+        return rrule_dict
+
+    def to_rrule_string(self) -> str:
+        """
+        Converts the RecurrenceRule to an RRULE value, e.g.
+        ``FREQ=WEEKLY;INTERVAL=1;BYDAY=MO,FR``, with the until in UTC.
+
+        :return: The RRULE value, without the ``RRULE:`` prefix
+        :rtype: str
+        """
+        return vRecur(self.to_ical_rrule(ZoneInfo("UTC"))).to_ical().decode("utf-8")
+
+    @classmethod
+    def from_rrule_string(cls, value: str) -> RecurrenceRule:
+        """
+        Creates an unsaved RecurrenceRule from an RRULE value written by
+        :meth:`to_rrule_string`.
+
+        :param value: The RRULE value, without the ``RRULE:`` prefix
+        :type value: str
+        :return: The unsaved RecurrenceRule
+        :rtype: RecurrenceRule
+        """
+        parts = vRecur.from_ical(value)
+        rule = cls(
+            frequency=cls.Frequency[parts["FREQ"][0]].value,
+            interval=int(parts.get("INTERVAL", [1])[0]),
+        )
+        if "WKST" in parts:
+            rule.wkst = {label: value for value, label in cls.WEEKDAYS}[
+                parts["WKST"][0]
+            ]
+        if "COUNT" in parts:
+            rule.count = int(parts["COUNT"][0])
+        if "UNTIL" in parts:
+            rule.until = parts["UNTIL"][0]
+        for part in RRULE_LIST_PARTS:
+            if part.upper() in parts:
+                setattr(rule, part, [int(value) for value in parts[part.upper()]])
+        if "BYDAY" in parts:
+            rule.byweekday = [str(day) for day in parts["BYDAY"]]
+        return rule
+
+    @property
+    def is_infinite(self) -> bool:
+        """
+        Returns whether the rule recurs forever, i.e. has neither a count nor an until.
+
+        :return: True if the rule never ends
+        :rtype: bool
+        """
+        return self.count is None and self.until is None
+
+    def last_occurrence(
+        self, start_date: datetime, tz: ZoneInfo | None = None
+    ) -> datetime | None:
+        """
+        Calculates the last occurrence of the rule without iterating over it, for rules
+        simple enough to allow it (see :func:`recurring.bounds.last_occurrence`).
+
+        :param start_date: The start date for the recurrence rule
+        :type start_date: datetime
+        :param tz: The timezone of the calendar entry. Looked up via the event if not given.
+        :type tz: ZoneInfo | None
+        :return: The last occurrence, or None if the rule is infinite, not simple enough or has no occurrences
+        :rtype: datetime | None
+        """
+        if self.is_infinite or any(
+            (
+                self.bysetpos,
+                self.bymonth,
+                self.bymonthday,
+                self.byyearday,
+                self.byweekno,
+                self.byhour,
+                self.byminute,
+                self.bysecond,
+            )
+        ):
+            return None
+
+        kwargs = self._get_rrule_kwargs(start_date, tz=tz)
+        return bounds.last_occurrence(
+            kwargs["freq"],
+            kwargs["interval"],
+            kwargs["dtstart"],
+            count=kwargs.get("count"),
+            until=kwargs.get("until"),
+            byweekday=[day.weekday for day in kwargs.get("byweekday", [])],
+            wkst=kwargs["wkst"].weekday if "wkst" in kwargs else None,
+        )
 
-    def to_dict(self) -> Dict[str, Any]:
+    def to_dict(self) -> dict[str, Any]:
         """
         Converts the RecurrenceRule to a dictionary representation.
 
         :return: A dictionary representation of the RecurrenceRule
-        :rtype: Dict[str, Any]
+        :rtype: dict[str, Any]
         """
         return {
             "id": self.id,
@@ -335,6 +566,253 @@ WEEKDAY_ABBR = {
 }
 
 
+def _schedule_prefetch() -> models.Prefetch:
+    """
+    Returns the prefetch of a calendar entry's events, with their recurrence rules and
+    exclusions, shared by ``with_schedule()`` and the async model methods.
+    """
+    return models.Prefetch(
+        "events",
+        queryset=Event.objects.select_related("recurrence_rule").prefetch_related(
+            "exclusions"
+        ),
+    )
+
+
+class CalendarEntryQuerySet(models.QuerySet):
+    def with_schedule(self) -> CalendarEntryQuerySet:
+        """
+        Loads the whole schedule graph (timezone, events, recurrence rules and
+        exclusions) up front, so that ``to_rruleset()``, ``to_ical()``, ``to_dict()``,
+        ``__str__()`` and ``calculate_occurrences()`` don't issue any further queries.
+
+        Evaluating the queryset costs three queries however many entries it holds.
+
+        :return: The queryset with related objects selected and prefetched
+        :rtype: CalendarEntryQuerySet
+        """
+        return self.select_related("timezone").prefetch_related(_schedule_prefetch())
+
+    def bulk_create_from_dicts(
+        self, schedules: Iterable[dict[str, Any]]
+    ) -> list[CalendarEntry]:
+        """
+        Creates many calendar entries from dictionaries in the format of
+        ``CalendarEntry.to_dict()``.
+
+        Unlike calling ``from_dict()`` per entry, every schedule is validated in memory
+        first, then all entries, recurrence rules, events and exclusions are inserted
+        with one ``bulk_create`` per model inside a single transaction. Nothing is
+        created if any schedule is invalid.
+
+        :param schedules: The schedule dictionaries
+        :type schedules: Iterable[dict[str, Any]]
+        :return: The created calendar entries, with their occurrence fields populated
+        :rtype: list[CalendarEntry]
+        :raises ValidationError: Listing the errors of every invalid schedule by index
+        """
+        from .bulk import bulk_create_schedules
+
+        return bulk_create_schedules(schedules)
+
+    def claim_due(
+        self, now: datetime | None = None, limit: int = 100
+    ) -> list[CalendarEntry]:
+        """
+        Claims up to ``limit`` calendar entries whose ``next_occurrence`` is due and
+        advances their occurrence fields past ``now``, so that they won't be claimed
+        again until their following occurrence is due.
+
+        Rows are locked with ``SELECT ... FOR UPDATE SKIP LOCKED``, so several workers
+        can claim entries at the same time without claiming the same ones. The locks
+        are held until the surrounding transaction ends. Called outside a transaction,
+        entries are claimed and advanced in a transaction of their own, so each due
+        occurrence is handed out at most once. To process entries at least once
+        instead, call this inside ``transaction.atomic()`` together with the work, so
+        that a failure rolls back the claim.
+
+        Each claimed entry has a ``due_occurrence`` attribute holding the
+        ``next_occurrence`` it was claimed for. If several occurrences were missed,
+        the entry is only claimed once, for the earliest of them.
+
+        If an entry's ``next_occurrence`` doesn't advance past ``now`` (e.g. because
+        calculating its occurrences failed), the error is logged and the entry is still
+        returned, but its ``next_occurrence`` is cleared and its occurrences are marked
+        stale, so it isn't claimed again until they're recalculated.
+
+        Skipping locked rows needs a database that supports it (e.g. PostgreSQL, MySQL
+        8 or Oracle). Other databases (e.g. SQLite) ignore the lock, so only run one
+        worker against them.
+
+        :param now: The time entries must be due by. Defaults to the current time.
+        :type now: datetime | None
+        :param limit: The maximum number of entries to claim
+        :type limit: int
+        :return: The claimed entries, in order of when they were due
+        :rtype: list[CalendarEntry]
+        """
+        if now is None:
+            now = django_timezone.now()
+
+        with transaction.atomic(using=self.db):
+            # lock only the calendar entry rows, not any joined ones
+            pks = list(
+                self.filter(next_occurrence__lte=now)
+                .order_by("next_occurrence", "pk")
+                .select_for_update(skip_locked=True)
+                .values_list("pk", flat=True)[:limit]
+            )
+            if not pks:
+                return []
+
+            entries = list(
+                self.model.objects.using(self.db)
+                .filter(pk__in=pks)
+                .order_by("next_occurrence", "pk")
+                .with_schedule()
+            )
+            for entry in entries:
+                entry.due_occurrence = entry.next_occurrence
+                try:
+                    entry.calculate_occurrences(commit=False, now=now)
+                except Exception:
+                    logger.exception(
+                        f"Error calculating occurrences of due CalendarEntry {entry.pk}"
+                    )
+                    entry.occurrences_stale = True
+                if entry.next_occurrence is not None and entry.next_occurrence <= now:
+                    # it would be claimed again straight away, forever
+                    logger.error(
+                        f"Next occurrence of due CalendarEntry {entry.pk} didn't advance "
+                        f"past {now}; clearing it until its occurrences are recalculated"
+                    )
+                    entry.next_occurrence = None
+                    entry.occurrences_stale = True
+
+            self.model.objects.using(self.db).bulk_update(
+                entries, self.model.CALCULATED_FIELDS
+            )
+
+        return entries
+
+    def candidates_between(
+        self, start: datetime, end: datetime
+    ) -> CalendarEntryQuerySet:
+        """
+        Filters to the calendar entries that may have an occurrence starting between
+        ``start`` and ``end`` (inclusive), using only the database.
+
+        Every occurrence of an event falls between its start time and its recurrence
+        rule's ``until`` (or its start time, if it doesn't recur), and every occurrence
+        of an entry whose occurrences aren't stale falls between its
+        ``first_occurrence`` and its ``last_occurrence`` (if it isn't infinite), so
+        entries that can't occur in the window are left out. Entries that are left in
+        may still turn out not to occur in it.
+
+        :param start: The start of the window. Must be timezone aware.
+        :type start: datetime
+        :param end: The end of the window. Must be timezone aware.
+        :type end: datetime
+        :return: The filtered queryset
+        :rtype: CalendarEntryQuerySet
+        """
+        candidates = Event.objects.filter(start_time__lte=end).filter(
+            models.Q(recurrence_rule__isnull=True, start_time__gte=start)
+            | models.Q(
+                recurrence_rule__isnull=False, recurrence_rule__until__isnull=True
+            )
+            | models.Q(recurrence_rule__until__gte=start)
+        )
+        # the stored bounds may be shifted by a DST offset, so allow some margin
+        margin = timedelta(days=1)
+        return self.filter(pk__in=candidates.values("calendar_entry")).filter(
+            models.Q(occurrences_stale=True)
+            | models.Q(first_occurrence__isnull=True)
+            | models.Q(
+                models.Q(is_infinite=True)
+                | models.Q(last_occurrence__gte=start - margin),
+                first_occurrence__lte=end + margin,
+            )
+        )
+
+    def occurring_between(
+        self,
+        start: datetime,
+        end: datetime,
+        with_occurrences: bool = False,
+        batch_size: int = 500,
+    ) -> Iterator[Any]:
+        """
+        Lazily yields the calendar entries with at least one occurrence starting
+        between ``start`` and ``end`` (inclusive).
+
+        Entries that can't occur in the window are pruned in SQL with
+        :meth:`candidates_between`. The remaining candidates are loaded ``batch_size``
+        at a time with :meth:`with_schedule` and confirmed with their compiled ruleset's
+        ``after()``, which stops at the first occurrence. The window is only expanded
+        with ``between()`` when ``with_occurrences`` is set.
+
+        Example::
+
+            for entry, occurrence in CalendarEntry.objects.occurring_between(
+                start, end, with_occurrences=True
+            ):
+                ...
+
+        :param start: The start of the window. Must be timezone aware.
+        :type start: datetime
+        :param end: The end of the window. Must be timezone aware.
+        :type end: datetime
+        :param with_occurrences: Whether to yield an ``(entry, occurrence)`` pair for every occurrence in the window, in the entry's timezone, instead of each entry once
+        :type with_occurrences: bool
+        :param batch_size: How many candidate entries are loaded at a time
+        :type batch_size: int
+        :return: An iterator of calendar entries, or of ``(entry, occurrence)`` pairs
+        :rtype: Iterator[CalendarEntry] | Iterator[tuple[CalendarEntry, datetime]]
+        """
+        queryset = self.candidates_between(start, end)
+        for entry in queryset.with_schedule().iterator(chunk_size=batch_size):
+            rset = entry.to_rruleset()
+            if not with_occurrences:
+                first = rset.after(start, inc=True)
+                if first is not None and first <= end:
+                    yield entry
+                continue
+            for occurrence in rset.between(start, end, inc=True):
+                yield entry, occurrence
+
+    def recalculate_occurrences(
+        self, window_days: int = 365, window_multiple: int = 3
+    ) -> list[CalendarEntry]:
+        """
+        Recalculates the occurrence fields of every calendar entry in the queryset,
+        writing them back with a single ``bulk_update`` rather than a save per entry.
+
+        Occurrences are also materialised if ``RECURRING_MATERIALISE_OCCURRENCES`` is
+        enabled.
+
+        :param window_days: Passed through to ``calculate_occurrences()``
+        :type window_days: int
+        :param window_multiple: Passed through to ``calculate_occurrences()``
+        :type window_multiple: int
+        :return: The recalculated calendar entries
+        :rtype: list[CalendarEntry]
+        """
+        entries = list(self.with_schedule())
+        for entry in entries:
+            entry.calculate_occurrences(
+                window_days=window_days, window_multiple=window_multiple, commit=False
+            )
+
+        self.model.objects.bulk_update(entries, self.model.CALCULATED_FIELDS)
+
+        if getattr(settings, "RECURRING_MATERIALISE_OCCURRENCES", False):
+            for entry in entries:
+                entry.materialise_occurrences()
+
+        return entries
+
+
 class CalendarEntry(models.Model):
     """
     Represents a calendar entry with associated events and recurrence rules.
@@ -343,6 +821,39 @@ class CalendarEntry(models.Model):
     class Meta:
         verbose_name_plural = "Calendar entries"
 
+    schedule_version = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        help_text=_(
+            "Incremented whenever an event, recurrence rule or exclusion of this calendar entry changes"
+        ),
+    )
+
+    occurrences_stale = models.BooleanField(
+        default=False,
+        editable=False,
+        db_index=True,
+        help_text=_(
+            "Set when the schedule changes, until the occurrences are recalculated"
+        ),
+    )
+
+    #: The fields written by :meth:`calculate_occurrences`
+    CALCULATED_FIELDS = (
+        "first_occurrence",
+        "previous_occurrence",
+        "next_occurrence",
+        "last_occurrence",
+        "is_infinite",
+        "summary_text",
+        "timezone_name",
+        "compiled_schedule",
+        "occurrences_stale",
+    )
+
+    # only ever written by dedicated updates, never from possibly stale instances
+    TRACKED_FIELDS = ("schedule_version", "occurrences_stale")
+
     name = models.CharField(
         max_length=255,
         help_text=_(
@@ -364,16 +875,27 @@ class CalendarEntry(models.Model):
     first_occurrence = models.DateTimeField(
         null=True,
         blank=True,
+        db_index=True,
         help_text=_("The first occurrence of this calendar entry"),
     )
     last_occurrence = models.DateTimeField(
         null=True,
         blank=True,
-        help_text=_("The last occurrence of this calendar entry"),
+        db_index=True,
+        help_text=_(
+            "The last occurrence of this calendar entry. Empty if it recurs forever."
+        ),
+    )
+    is_infinite = models.BooleanField(
+        default=False,
+        editable=False,
+        db_index=True,
+        help_text=_("Whether any event of this calendar entry recurs forever"),
     )
     next_occurrence = models.DateTimeField(
         null=True,
         blank=True,
+        db_index=True,
         help_text=_(
             "The next occurrence of this calendar entry from the last time occurrences were calculated"
         ),
@@ -386,6 +908,31 @@ class CalendarEntry(models.Model):
         ),
     )
 
+    summary_text = models.TextField(
+        blank=True,
+        editable=False,
+        help_text=_(
+            "A description of when this calendar entry occurs, saved when occurrences are calculated"
+        ),
+    )
+    timezone_name = models.CharField(
+        max_length=64,
+        blank=True,
+        editable=False,
+        help_text=_("The name of the timezone, saved when occurrences are calculated"),
+    )
+
+    compiled_schedule = models.JSONField(
+        null=True,
+        blank=True,
+        editable=False,
+        help_text=_(
+            "The whole schedule serialised when occurrences are calculated, so it can be read without joins"
+        ),
+    )
+
+    objects = CalendarEntryQuerySet.as_manager()
+
     def __str__(self, format_template=None):
         """
         Returns a human-readable description of when this calendar entry occurs.
@@ -393,8 +940,11 @@ class CalendarEntry(models.Model):
 
         Default format is like: "Every Mon, Wed, Fri at 12:00 (Europe/London) from today until 31 Dec 24"
 
+        The occurrences are described from :attr:`summary_text` if it's up to date, so
+        this doesn't query the schedule of entries whose occurrences are calculated.
+
         :param format_template: Optional string template with {name} and {occurrences} placeholders
-        :type format_template: Optional[str]
+        :type format_template: str | None
         :return: A string describing when the calendar entry occurs
         :rtype: str
         """
@@ -404,8 +954,24 @@ class CalendarEntry(models.Model):
                 settings, "CALENDAR_ENTRY_FORMAT", "{name}: {occurrences}"
             )
 
-        if not self.events.exists():
-            return format_template.format(name=self.name, occurrences="No events")
+        if self.summary_text and not self.occurrences_stale:
+            occurrences = self.summary_text
+        else:
+            occurrences = self._with_compiled_schedule().summarise()
+        return format_template.format(name=self.name, occurrences=occurrences)
+
+    def summarise(self) -> str:
+        """
+        Describes when the calendar entry occurs from its schedule, e.g. "Every Mon,
+        Wed, Fri at 12:00 (Europe/London) until 31 Dec 24". This is the
+        ``{occurrences}`` part of :meth:`__str__`, saved as :attr:`summary_text`.
+
+        :return: A description of the calendar entry's events
+        :rtype: str
+        """
+        events = list(self.events.all())
+        if not events:
+            return "No events"
 
         tz = self.timezone.as_tz
 
@@ -420,7 +986,7 @@ class CalendarEntry(models.Model):
             return date_filter(dt.astimezone(tz), "H:i")
 
         parts = []
-        for event in self.events.all():
+        for event in events:
             event_str = []
 
             if event.recurrence_rule:
@@ -445,6 +1011,9 @@ class CalendarEntry(models.Model):
                         event_str.append("Every month")
                 elif freq_name == "yearly":
                     event_str.append("Every year")
+                else:
+                    # hourly, minutely or secondly
+                    event_str.append(f"Every {freq_name.removesuffix('ly')}")
 
                 if rule.interval > 1:
                     event_str[-1] = event_str[-1].replace(
@@ -469,133 +1038,302 @@ class CalendarEntry(models.Model):
 
             parts.append(" ".join(event_str))
 
-        return format_template.format(name=self.name, occurrences=", then ".join(parts))
+        return ", then ".join(parts)
 
-    def to_rruleset(self):
+    def to_rruleset(self) -> ScheduleRuleset:
         """
         Converts the CalendarEntry to an rruleset object.
 
+        Compiled rulesets of saved entries are kept in a process-local LRU cache keyed
+        by primary key and :meth:`_ruleset_stamp`, so the returned object may be shared
+        and must not be modified.
+
         :return: An rruleset object representing the CalendarEntry
-        :rtype: rruleset
+        :rtype: ScheduleRuleset
         """
-        rset = rruleset()
+        if self.pk is None:
+            return self._build_rruleset()
 
-        for event in self.events.all():
-            # add the event as a single event in case it isn't
-            # included in any recurrence rules
-            rset.rdate(event.start_time)
+        stamp = self._ruleset_stamp()
+        rset = ruleset_cache.get(self.pk, stamp)
+        if rset is None:
+            rset = self._with_compiled_schedule()._build_rruleset()
+            ruleset_cache.set(self.pk, stamp, rset)
+        return rset
 
-            if event.recurrence_rule:
-                rrule_obj = event.recurrence_rule.to_rrule(event.start_time)
-                rset.rrule(rrule_obj)
+    def _ruleset_stamp(self) -> tuple[int, int, datetime | None]:
+        """
+        Returns the stamp the CalendarEntry's compiled ruleset is cached with.
 
-            for exclusion in event.exclusions.all():
-                # the time component is kept in sync with the event start time
-                for exclusion_date in exclusion.get_all_dates():
-                    rset.exdate(exclusion_date)
+        ``updated_at`` is included because a ``schedule_version`` can repeat: if a
+        transaction that bumped it is rolled back, the next change bumps it to the same
+        number again.
+
+        :return: The ``schedule_version``, timezone and ``updated_at``
+        :rtype: tuple[int, int, datetime | None]
+        """
+        return (self.schedule_version, self.timezone_id, self.updated_at)
+
+    def _with_compiled_schedule(self) -> CalendarEntry:
+        """
+        Returns a copy of the CalendarEntry with its schedule loaded from
+        :attr:`compiled_schedule` (see :mod:`recurring.compiled`) if that's current and
+        the schedule isn't loaded already, or the CalendarEntry itself otherwise.
+
+        :return: The CalendarEntry to read the schedule from
+        :rtype: CalendarEntry
+        """
+        if "events" in getattr(
+            self, "_prefetched_objects_cache", {}
+        ) or not compiled.is_current(self):
+            return self
+        return compiled.load_schedule(self)
+
+    def _build_rruleset(self) -> ScheduleRuleset:
+        """
+        Compiles an rruleset from the CalendarEntry's events, bypassing the cache.
+
+        Each event contributes its own ruleset, so its exclusions only apply to its
+        own occurrences.
+
+        :return: An rruleset object representing the CalendarEntry
+        :rtype: ScheduleRuleset
+        """
+        with instrumentation.timer(
+            "recurring.rruleset.compile", calendar_entry=self.pk
+        ):
+            rset = ScheduleRuleset()
+            tz = self.timezone.as_tz
+
+            for event in self.events.all():
+                rset.rrule(event.to_rruleset(tz=tz))
 
         return rset
 
-    def to_dict(self) -> Dict[str, Any]:
+    async def _aload_schedule(self) -> None:
+        """
+        Loads the timezone, events, recurrence rules and exclusions with the async ORM,
+        unless they're already loaded (e.g. with ``with_schedule()``), so that the
+        schedule can be expanded without any further queries.
+        """
+        if self.pk is None:
+            return
+        lookups = ("timezone", _schedule_prefetch())
+        if hasattr(models, "aprefetch_related_objects"):
+            await models.aprefetch_related_objects([self], *lookups)
+        else:
+            # Django < 5.0
+            await sync_to_async(models.prefetch_related_objects)([self], *lookups)
+
+    async def ato_rruleset(self) -> ScheduleRuleset:
+        """
+        Async version of :meth:`to_rruleset`. The schedule is loaded with the async ORM
+        if it isn't cached, and compiled in the executor of :mod:`recurring.executor`.
+
+        :return: An rruleset object representing the CalendarEntry
+        :rtype: ScheduleRuleset
+        """
+        if self.pk is None:
+            return await run_in_executor(self._build_rruleset)
+
+        stamp = self._ruleset_stamp()
+        rset = ruleset_cache.get(self.pk, stamp)
+        if rset is None:
+            if not compiled.is_current(self):
+                await self._aload_schedule()
+            rset = await run_in_executor(self._with_compiled_schedule()._build_rruleset)
+            ruleset_cache.set(self.pk, stamp, rset)
+        return rset
+
+    def to_dict(self) -> dict[str, Any]:
         """
         Converts the CalendarEntry to a dictionary representation.
 
         :return: A dictionary representation of the CalendarEntry
-        :rtype: Dict[str, Any]
+        :rtype: dict[str, Any]
         """
         return {
             "name": self.name,
             "description": self.description,
             "timezone": self.timezone.name,
-            "events": [
-                {
-                    "start_time": event.start_time.isoformat(),
-                    "end_time": event.end_time.isoformat() if event.end_time else None,
-                    "is_full_day": event.is_full_day,
-                    "recurrence_rule": event.recurrence_rule.to_dict()
-                    if event.recurrence_rule
-                    else {},
-                    "exclusions": [
-                        {
-                            "start_date": exclusion.start_date.isoformat(),
-                            "end_date": exclusion.end_date.isoformat(),
-                        }
-                        for exclusion in event.exclusions.all()
-                    ],
-                }
-                for event in self.events.all()
-            ],
+            "events": [event.to_dict() for event in self.events.all()],
         }
 
-    def from_dict(self, data: Dict[str, Any]) -> None:
+    def from_dict(self, data: dict[str, Any], mode: str = "append") -> None:
         """
         Populates the CalendarEntry from a dictionary representation.
 
+        By default the events in ``data`` are added to any the CalendarEntry already
+        has. With ``mode="merge"`` its saved events are updated to match ``data``
+        instead: events and exclusions are matched by ``id``, and only the rows that
+        changed are inserted, updated or deleted, with bulk queries (see
+        :func:`recurring.bulk.merge_schedule`).
+
         :param data: A dictionary containing CalendarEntry data
-        :type data: Dict[str, Any]
-        """
-        self.name = data.get("name", self.name)
-        self.description = data.get("description", self.description)
-        self.timezone = Timezone.objects.get(
-            name=data.get("timezone", self.timezone.name)
-        )
-        self.save(recalculate=False)
-
-        for event_data in data.get("events", []):
-            event = Event(
-                calendar_entry=self,
-                start_time=event_data["start_time"],
-                end_time=event_data["end_time"] if event_data.get("end_time") else None,
-                is_full_day=event_data["is_full_day"],
+        :type data: dict[str, Any]
+        :param mode: ``"append"`` or ``"merge"``
+        :type mode: str
+        :raises ValueError: If the mode is unknown
+        :raises ValidationError: If a merged event is invalid
+        """
+        if mode not in ("append", "merge"):
+            raise ValueError(f"Unknown mode: {mode}")
+
+        with deferred_recalculation():
+            self.name = data.get("name", self.name)
+            self.description = data.get("description", self.description)
+            self.timezone = Timezone.objects.get(
+                name=data.get("timezone", self.timezone.name)
             )
-            event.save()
-
-            rule_data = event_data.get("recurrence_rule")
-            if rule_data:
-                rule = RecurrenceRule(
-                    frequency=RecurrenceRule.Frequency[rule_data["frequency"]].value,
-                    interval=rule_data.get("interval", 1),
-                    wkst=rule_data.get("wkst"),
-                    count=rule_data.get("count"),
-                    until=rule_data["until"] if rule_data.get("until") else None,
-                    bysetpos=rule_data.get("bysetpos"),
-                    bymonth=rule_data.get("bymonth"),
-                    bymonthday=rule_data.get("bymonthday"),
-                    byyearday=rule_data.get("byyearday"),
-                    byweekno=rule_data.get("byweekno"),
-                    byweekday=rule_data.get("byweekday"),
-                    byhour=rule_data.get("byhour"),
-                    byminute=rule_data.get("byminute"),
-                    bysecond=rule_data.get("bysecond"),
+            self.save(recalculate=False)
+
+            if mode == "merge":
+                from .bulk import merge_schedule
+
+                if merge_schedule(self, data.get("events", [])):
+                    mark_stale(self.pk, self)
+                return
+
+            for event_data in data.get("events", []):
+                event = Event(
+                    calendar_entry=self,
+                    start_time=event_data["start_time"],
+                    end_time=event_data["end_time"]
+                    if event_data.get("end_time")
+                    else None,
+                    is_full_day=event_data["is_full_day"],
                 )
-                rule.save()
-                event.recurrence_rule = rule
                 event.save()
 
-            for exclusion_data in event_data.get("exclusions", []):
-                ExclusionDateRange.objects.create(
-                    event=event,
-                    start_date=exclusion_data["start_date"],
-                    end_date=exclusion_data["end_date"],
-                )
+                rule_data = event_data.get("recurrence_rule")
+                if rule_data:
+                    rule = RecurrenceRule(
+                        frequency=RecurrenceRule.Frequency[
+                            rule_data["frequency"]
+                        ].value,
+                        interval=rule_data.get("interval", 1),
+                        wkst=rule_data.get("wkst"),
+                        count=rule_data.get("count"),
+                        until=rule_data["until"] if rule_data.get("until") else None,
+                        bysetpos=rule_data.get("bysetpos"),
+                        bymonth=rule_data.get("bymonth"),
+                        bymonthday=rule_data.get("bymonthday"),
+                        byyearday=rule_data.get("byyearday"),
+                        byweekno=rule_data.get("byweekno"),
+                        byweekday=rule_data.get("byweekday"),
+                        byhour=rule_data.get("byhour"),
+                        byminute=rule_data.get("byminute"),
+                        bysecond=rule_data.get("bysecond"),
+                    )
+                    rule.save()
+                    event.recurrence_rule = rule
+                    event.save()
+
+                for exclusion_data in event_data.get("exclusions", []):
+                    ExclusionDateRange.objects.create(
+                        event=event,
+                        start_date=exclusion_data["start_date"],
+                        end_date=exclusion_data["end_date"],
+                    )
+
+            mark_stale(self.pk, self)
 
     def calculate_occurrences(
-        self, window_days: int = 365, window_multiple: int = 3
+        self,
+        window_days: int = 365,
+        window_multiple: int = 3,
+        commit: bool = True,
+        now: datetime | None = None,
     ) -> None:
         """
         Recalculates the cached occurrences of the CalendarEntry in **UTC**. Calculated occurrences include:
 
-        * first_occurrence/last_occurrence (across all events in the CalendarEntry). Capped based on the window parameters for performance reasons.
+        * first_occurrence/last_occurrence (across all events in the CalendarEntry)
+        * is_infinite, set if any event recurs forever, in which case last_occurrence is empty
         * previous_occurrence/next_occurrence (relative to the time this method was last called)
+        * summary_text/timezone_name, so that :meth:`__str__` and the admin don't need to query the schedule
+
+        If every event has a fixed interval (see :meth:`RecurrenceRule.to_rrule`), the
+        previous and next occurrences are calculated. Otherwise they're found in a
+        single pass over the occurrences, which stops at the first one after ``now``.
+        The last occurrence is calculated from each event's recurrence rule where it's
+        simple enough (see :meth:`RecurrenceRule.last_occurrence`), and only found by
+        iterating over the event's occurrences otherwise.
+
+        :param window_days: No longer used, as the first and last occurrences are exact. Kept for backwards compatibility.
+        :param window_multiple: No longer used, as the first and last occurrences are exact. Kept for backwards compatibility.
+        :param commit: Whether to save the calculated fields (and materialised occurrences). Pass ``False`` to write :attr:`CALCULATED_FIELDS` in bulk yourself.
+        :param now: The time to calculate the previous/next occurrences from. Defaults to the current time.
+        """
+        with instrumentation.timer(
+            "recurring.occurrences.calculate", calendar_entry=self.pk
+        ):
+            self._calculate_occurrence_fields(now)
+
+        self.occurrences_stale = False
+
+        if not commit:
+            return
+
+        self.save(
+            recalculate=False,
+            update_fields=None
+            if self._state.adding
+            else [*self._default_update_fields(), "occurrences_stale"],
+        )
+
+        if getattr(settings, "RECURRING_MATERIALISE_OCCURRENCES", False):
+            self.materialise_occurrences()
+
+    async def acalculate_occurrences(
+        self, commit: bool = True, now: datetime | None = None
+    ) -> None:
+        """
+        Async version of :meth:`calculate_occurrences`. The schedule is loaded with the
+        async ORM and the occurrences are calculated in the executor of
+        :mod:`recurring.executor`.
+
+        Like ``recalculate_occurrences()``, only :attr:`CALCULATED_FIELDS` are written
+        back, with a single update.
+
+        :param commit: Whether to save the calculated fields (and materialised occurrences)
+        :type commit: bool
+        :param now: The time to calculate the previous/next occurrences from. Defaults to the current time.
+        :type now: datetime | None
+        """
+        await self._aload_schedule()
+        with instrumentation.timer(
+            "recurring.occurrences.calculate", calendar_entry=self.pk
+        ):
+            await run_in_executor(self._calculate_occurrence_fields, now)
+
+        self.occurrences_stale = False
+
+        if not commit:
+            return
+
+        if self._state.adding:
+            await sync_to_async(self.save)(recalculate=False)
+        else:
+            await CalendarEntry.objects.filter(pk=self.pk).aupdate(
+                **{field: getattr(self, field) for field in self.CALCULATED_FIELDS}
+            )
+
+        if getattr(settings, "RECURRING_MATERIALISE_OCCURRENCES", False):
+            await sync_to_async(self.materialise_occurrences)()
 
-        :param window_days: The number of days to use as the basis for calculating the delta from now for the 'first'/'last' occurrences
-        :param window_multiple: Multiplied by `occurence_window_days` to create the delta from now to use to calculate the 'first'/'last' occurrences. E.g. if window_days=365 and window_multiple=5, we'll only look forwards and backwards 5 years to calculate the 'first' and 'last' occurrences.
+    def _calculate_occurrence_fields(self, now: datetime | None) -> None:
         """
+        Sets the occurrence fields for :meth:`calculate_occurrences`.
+        """
+        self.summary_text = self.summarise()
+        self.timezone_name = self.timezone.name
+        self.compiled_schedule = compiled.compile_schedule(self)
+
         try:
-            rruleset = self.to_rruleset()
             utc = ZoneInfo("UTC")
             tz = self.timezone.as_tz
-            now = datetime.now().astimezone(tz)
+            now = (now or datetime.now()).astimezone(tz)
 
             def adjust_for_dst(dt):
                 if dt is None:
@@ -608,26 +1346,90 @@ class CalendarEntry(models.Model):
                 else:
                     return dt.astimezone(utc)
 
-            next_occurrence_dt = rruleset.after(now)
-            self.next_occurrence = adjust_for_dst(next_occurrence_dt)
+            rset = self.to_rruleset()
+            first = next(iter(rset), None)
+            if rset.fast_path:
+                previous, next_ = rset.before(now), rset.after(now)
+            else:
+                # dateutil walks every rule from its start whatever it's asked for,
+                # so walk them once up to now rather than once per field
+                previous = next_ = None
+                for dt in rset:
+                    if dt < now:
+                        previous = dt
+                    elif dt > now:
+                        next_ = dt
+                        break
+
+            events = list(self.events.all())
+            self.is_infinite = any(
+                event.recurrence_rule and event.recurrence_rule.is_infinite
+                for event in events
+            )
+            last = None
+            if not self.is_infinite:
+                last = max(
+                    (
+                        event_last
+                        for event in events
+                        if (event_last := event.last_occurrence(tz)) is not None
+                    ),
+                    default=None,
+                )
 
-            previous_occurrence_dt = rruleset.before(now, inc=False)
-            self.previous_occurrence = adjust_for_dst(previous_occurrence_dt)
+            self.first_occurrence = adjust_for_dst(first)
+            self.previous_occurrence = adjust_for_dst(previous)
+            self.next_occurrence = adjust_for_dst(next_)
+            self.last_occurrence = adjust_for_dst(last)
+        except Exception:
+            logger.exception(
+                f"Error recalculating occurrences for CalendarEntry {self.pk}"
+            )
 
-            window_delta = timedelta(days=window_days * window_multiple)
+    def materialise_occurrences(
+        self, horizon_days: int | None = None, now: datetime | None = None
+    ) -> int:
+        """
+        Replaces the stored :class:`Occurrence` rows for this CalendarEntry with those
+        falling within a rolling horizon either side of ``now``.
 
-            first_occurrence_dt = rruleset.after(now - window_delta, inc=True)
-            self.first_occurrence = adjust_for_dst(first_occurrence_dt)
+        :param horizon_days: How many days to look backwards and forwards from ``now``. Defaults to the ``RECURRING_OCCURRENCE_HORIZON_DAYS`` setting (365).
+        :type horizon_days: int | None
+        :param now: The centre of the horizon. Defaults to the current time.
+        :type now: datetime | None
+        :return: The number of occurrences stored
+        :rtype: int
+        """
+        if horizon_days is None:
+            horizon_days = getattr(settings, "RECURRING_OCCURRENCE_HORIZON_DAYS", 365)
+        if now is None:
+            now = django_timezone.now()
 
-            last_occurrence_dt = rruleset.before(now + window_delta, inc=True)
-            self.last_occurrence = adjust_for_dst(last_occurrence_dt)
-        except Exception as e:
-            print(
-                f"Error recalculating occurrences for CalendarEntry {self.id}: {str(e)}"
-            )
-            traceback.print_exc()
+        horizon = timedelta(days=horizon_days)
+        utc = ZoneInfo("UTC")
+        tz = self.timezone.as_tz
 
-        self.save(recalculate=False)
+        occurrences = []
+        for event in self.events.all():
+            duration = event.duration
+            for start in event.to_rruleset(tz=tz).between(
+                now - horizon, now + horizon, inc=True
+            ):
+                start_utc = start.astimezone(utc)
+                occurrences.append(
+                    Occurrence(
+                        calendar_entry=self,
+                        event=event,
+                        start_utc=start_utc,
+                        end_utc=start_utc + duration,
+                    )
+                )
+
+        with transaction.atomic():
+            self.occurrences.all().delete()
+            Occurrence.objects.bulk_create(occurrences)
+
+        return len(occurrences)
 
     def save(self, *args: Any, **kwargs: Any) -> None:
         """
@@ -635,12 +1437,38 @@ class CalendarEntry(models.Model):
 
         :param args: Variable length argument list
         :param kwargs: Arbitrary keyword arguments
-        :keyword bool recalculate: Whether to recalculate occurrences. Defaults to ``True``.
+        :keyword bool recalculate: Whether to recalculate occurrences. Defaults to ``True``. Recalculation is deferred until the transaction commits (see :mod:`recurring.recalculation`).
         """
         recalculate = kwargs.pop("recalculate", True)
+        if recalculate:
+            self.occurrences_stale = True
+        if (
+            not self._state.adding
+            and not args
+            and kwargs.get("update_fields") is None
+            and not kwargs.get("force_insert")
+        ):
+            # tracked fields are only ever written by dedicated updates, so never
+            # overwrite them with possibly stale in-memory values
+            kwargs["update_fields"] = self._default_update_fields()
+            if recalculate:
+                kwargs["update_fields"].append("occurrences_stale")
         super().save(*args, **kwargs)
         if recalculate:
-            self.calculate_occurrences()
+            mark_stale(self.pk, self)
+
+    def _default_update_fields(self) -> list[str]:
+        """
+        Returns the fields written when saving an existing CalendarEntry.
+
+        :return: The names of every concrete field except the primary key and :attr:`TRACKED_FIELDS`
+        :rtype: list[str]
+        """
+        return [
+            field.name
+            for field in self._meta.concrete_fields
+            if not field.primary_key and field.name not in self.TRACKED_FIELDS
+        ]
 
     def delete(self, *args: Any, **kwargs: Any) -> None:
         """
@@ -649,37 +1477,132 @@ class CalendarEntry(models.Model):
         :param args: Variable length argument list
         :param kwargs: Arbitrary keyword arguments
         """
-        for event in self.events.all():
-            event.delete()
-        super().delete(*args, **kwargs)
+        with deferred_recalculation():
+            for event in self.events.all():
+                event.delete()
+            ruleset_cache.invalidate(self.pk)
+            return super().delete(*args, **kwargs)
 
-    def to_ical(self, prod_id: Optional[str] = None) -> str:
+    def to_ical(self, prod_id: str | None = None) -> str:
         """
         Convert the CalendarEntry to an iCal string representation.
 
+        The output only changes when the entry does: UIDs are derived from the entry
+        and event primary keys and DTSTAMPs from :attr:`updated_at`. Saved entries are
+        therefore rendered once per :meth:`ical_etag` and kept in the Django cache
+        named by the ``RECURRING_ICAL_CACHE`` setting (``"default"``, or None to
+        disable it) for ``RECURRING_ICAL_CACHE_TIMEOUT`` seconds (a day).
+
         :param prod_id: The PRODID to use in the iCal. Defaults to None.
-        :type prod_id: Optional[str]
+        :type prod_id: str | None
         :return: The iCal string representation of the calendar entry.
         :rtype: str
         """
-        tz = self.timezone.as_tz
+        if prod_id is None:
+            prod_id = getattr(
+                settings, "ICAL_PROD_ID", "-//django-recurring//NONSGML v1.0//EN"
+            )
 
-        cal = Calendar()
-        cal.add("version", "2.0")
+        cache = _ical_cache()
+        etag = self.ical_etag(prod_id) if cache is not None else None
+        if etag is not None:
+            key = f"recurring:ical:{etag}"
+            cached = cache.get(key)
+            if cached is not None:
+                instrumentation.incr(
+                    "recurring.ical.cache.hits", calendar_entry=self.pk
+                )
+                return cached
+
+        with instrumentation.timer(
+            "recurring.ical.render", count_queries=True, calendar_entry=self.pk
+        ):
+            cal = Calendar()
+            cal.add("version", "2.0")
+            cal.add("prodid", prod_id)
+
+            ical_events = self._with_compiled_schedule().to_ical_events()
+            if ical_events:
+                for ical_event in ical_events:
+                    cal.add_component(ical_event)
+                ical = cal.to_ical().decode("utf-8")
+            else:
+                ical = ""
+
+        if etag is not None:
+            cache.set(
+                key,
+                ical,
+                getattr(settings, "RECURRING_ICAL_CACHE_TIMEOUT", 24 * 60 * 60),
+            )
+        return ical
+
+    def ical_etag(self, prod_id: str | None = None) -> str | None:
+        """
+        Returns a fingerprint of everything :meth:`to_ical` output depends on (the
+        primary key, ``schedule_version``, timezone, :attr:`updated_at` and PRODID),
+        which changes whenever the output does, without rendering it.
 
+        :param prod_id: The PRODID to use in the iCal. Defaults to the ``ICAL_PROD_ID`` setting.
+        :type prod_id: str | None
+        :return: The fingerprint, or None if the entry isn't saved
+        :rtype: str | None
+        """
+        if self.pk is None or self.updated_at is None:
+            return None
         if prod_id is None:
             prod_id = getattr(
                 settings, "ICAL_PROD_ID", "-//django-recurring//NONSGML v1.0//EN"
             )
-        cal.add("prodid", prod_id)
+        identity = (
+            f"{self.pk}:{self.schedule_version}:{self.timezone_id}:"
+            f"{self.updated_at.isoformat()}:{prod_id}"
+        )
+        return hashlib.sha1(identity.encode("utf-8")).hexdigest()
+
+    async def ato_ical(self, prod_id: str | None = None) -> str:
+        """
+        Async version of :meth:`to_ical`. The schedule is loaded with the async ORM and
+        rendered in the executor of :mod:`recurring.executor`.
+
+        :param prod_id: The PRODID to use in the iCal. Defaults to None.
+        :type prod_id: str | None
+        :return: The iCal string representation of the calendar entry.
+        :rtype: str
+        """
+        if not compiled.is_current(self):
+            await self._aload_schedule()
+        return await run_in_executor(self.to_ical, prod_id)
 
-        if not self.events.exists():
-            return ""
+    def _ical_uid(self, event: Event) -> str:
+        """
+        Returns the UID of an event's VEVENT, which stays the same across renders once
+        the CalendarEntry and Event are saved.
+
+        :param event: One of the CalendarEntry's events
+        :type event: Event
+        :return: The UID
+        :rtype: str
+        """
+        if self.pk is None or event.pk is None:
+            return str(uuid.uuid4())
+        return str(uuid.uuid5(ICAL_UID_NAMESPACE, f"{self.pk}.{event.pk}"))
+
+    def to_ical_events(self) -> list[ICalEvent]:
+        """
+        Convert each of the CalendarEntry's events to an iCal VEVENT.
+
+        :return: A VEVENT component per event
+        :rtype: list[ICalEvent]
+        """
+        tz = self.timezone.as_tz
+        dtstamp = self.updated_at or django_timezone.now()
+        ical_events = []
 
         for event in self.events.all():
             ical_event = ICalEvent()
-            ical_event.add("dtstamp", django_timezone.now())
-            ical_event.add("uid", str(uuid.uuid4()))
+            ical_event.add("dtstamp", dtstamp)
+            ical_event.add("uid", self._ical_uid(event))
             ical_event.add(
                 "summary", self.description if self.description else self.name
             )
@@ -689,49 +1612,25 @@ class CalendarEntry(models.Model):
 
             rule = event.recurrence_rule
             if rule:
-                rrule_dict = {
-                    "freq": rule.get_frequency_display(),
-                    "interval": rule.interval,
+                ical_event.add("rrule", rule.to_ical_rrule(tz))
+
+            # the occurrences the exclusions remove, so that calendar clients skip
+            # the same ones as to_rruleset()
+            exclusions = list(event.exclusions.all())
+            own_occurrences = event.to_rruleset(tz=tz, exclusions=()) if rule else None
+            exdates = sorted(
+                {
+                    date
+                    for exclusion in exclusions
+                    for date in exclusion.get_all_dates(tz=tz, rset=own_occurrences)
                 }
-                if rule.wkst is not None:
-                    rrule_dict["wkst"] = rule.wkst
-                if rule.count is not None:
-                    rrule_dict["count"] = rule.count
-                if rule.until is not None:
-                    rrule_dict["until"] = rule.until.astimezone(tz)
-                if rule.bysetpos:
-                    rrule_dict["bysetpos"] = rule.bysetpos
-                if rule.bymonth:
-                    rrule_dict["bymonth"] = rule.bymonth
-                if rule.bymonthday:
-                    rrule_dict["bymonthday"] = rule.bymonthday
-                if rule.byyearday:
-                    rrule_dict["byyearday"] = rule.byyearday
-                if rule.byweekno:
-                    rrule_dict["byweekno"] = rule.byweekno
-                if rule.byweekday:
-                    rrule_dict["byday"] = rule.byweekday
-                if rule.byhour:
-                    rrule_dict["byhour"] = rule.byhour
-                if rule.byminute:
-                    rrule_dict["byminute"] = rule.byminute
-                if rule.bysecond:
-                    rrule_dict["bysecond"] = rule.bysecond
-
-                ical_event.add("rrule", rrule_dict)
-
-            # the time component is kept in sync with the event start time
-            exdates = [
-                date
-                for exclusion in event.exclusions.all()
-                for date in exclusion.get_all_dates()
-            ]
+            )
             if exdates:
                 ical_event.add("exdate", exdates)
 
-            cal.add_component(ical_event)
+            ical_events.append(ical_event)
 
-        return cal.to_ical().decode("utf-8")
+        return ical_events
 
 
 class Event(models.Model):
@@ -742,7 +1641,7 @@ class Event(models.Model):
     calendar_entry = models.ForeignKey(
         CalendarEntry, on_delete=models.CASCADE, related_name="events"
     )
-    start_time = models.DateTimeField()
+    start_time = models.DateTimeField(db_index=True)
     end_time = models.DateTimeField(null=True, blank=True)
     is_full_day = models.BooleanField(default=False)
     recurrence_rule = models.OneToOneField(
@@ -778,14 +1677,133 @@ class Event(models.Model):
         self.full_clean()
         super().save(*args, **kwargs)
         self.update_exclusions()
+        _schedule_changed(self.calendar_entry_id, self._loaded_calendar_entry())
+
+    def to_dict(self) -> dict[str, Any]:
+        """
+        Converts the Event, with its recurrence rule and exclusions, to the dictionary
+        representation used by ``CalendarEntry.to_dict()``.
+
+        :return: A dictionary representation of the Event
+        :rtype: dict[str, Any]
+        """
+        return {
+            "id": self.id,
+            "start_time": self.start_time.isoformat(),
+            "end_time": self.end_time.isoformat() if self.end_time else None,
+            "is_full_day": self.is_full_day,
+            "recurrence_rule": self.recurrence_rule.to_dict()
+            if self.recurrence_rule
+            else {},
+            "exclusions": [
+                {
+                    "id": exclusion.id,
+                    "start_date": exclusion.start_date.isoformat(),
+                    "end_date": exclusion.end_date.isoformat(),
+                }
+                for exclusion in self.exclusions.all()
+            ],
+        }
+
+    @property
+    def duration(self) -> timedelta:
+        """
+        Returns the length of each occurrence of the Event. Full day events last a day.
+
+        :return: The duration of the Event
+        :rtype: timedelta
+        """
+        if self.end_time:
+            return self.end_time - self.start_time
+        return timedelta(days=1)
+
+    def to_rruleset(
+        self,
+        tz: ZoneInfo | None = None,
+        exclusions: Iterable[ExclusionDateRange] | None = None,
+    ) -> ScheduleRuleset:
+        """
+        Converts the Event to an rruleset object containing only its own occurrences.
+
+        Exclusions are applied as intervals rather than expanded into exdates.
+
+        :param tz: The timezone of the calendar entry. Looked up if not given.
+        :type tz: ZoneInfo | None
+        :param exclusions: The exclusions to apply. Defaults to the Event's own, which can't be read until it's saved.
+        :type exclusions: Iterable[ExclusionDateRange] | None
+        :return: An rruleset object representing the Event
+        :rtype: ScheduleRuleset
+        """
+        if tz is None:
+            tz = self.calendar_entry.timezone.as_tz
+
+        rset = ScheduleRuleset()
+        # add the event as a single event in case it isn't
+        # included in the recurrence rule
+        rset.rdate(self.start_time)
+
+        if self.recurrence_rule:
+            rset.rrule(self.recurrence_rule.to_rrule(self.start_time, tz=tz))
+
+            if exclusions is None:
+                exclusions = self.exclusions.all()
+            for exclusion in exclusions:
+                # the time component is kept in sync with the event start time
+                rset.exclude(*exclusion.to_interval(tz=tz))
+
+        return rset
+
+    def last_occurrence(self, tz: ZoneInfo | None = None) -> datetime | None:
+        """
+        Returns the last occurrence of the Event. It's calculated from the recurrence
+        rule if possible, and found by iterating over every occurrence otherwise.
+
+        :param tz: The timezone of the calendar entry. Looked up if not given.
+        :type tz: ZoneInfo | None
+        :return: The last occurrence, or None if the Event recurs forever or never occurs
+        :rtype: datetime | None
+        """
+        if tz is None:
+            tz = self.calendar_entry.timezone.as_tz
+
+        rule = self.recurrence_rule
+        if rule is None:
+            return self.start_time.astimezone(tz)
+        if rule.is_infinite:
+            return None
+
+        last = rule.last_occurrence(self.start_time, tz=tz)
+        if last is not None and not any(
+            start <= last < end
+            for start, end in (
+                exclusion.to_interval(tz=tz) for exclusion in self.exclusions.all()
+            )
+        ):
+            return last
+
+        last = None
+        for dt in self.to_rruleset(tz=tz):
+            last = dt
+        return last
+
+    def _loaded_calendar_entry(self) -> CalendarEntry | None:
+        """
+        Returns the Event's calendar entry if it's already loaded, without querying it.
+
+        :return: The calendar entry, or None if it isn't loaded
+        :rtype: CalendarEntry | None
+        """
+        return self._meta.get_field("calendar_entry").get_cached_value(self, None)
 
     def update_exclusions(self) -> None:
         """
         Updates the time component of all exclusions associated with this event.
         """
-        for exclusion in self.exclusions.all():
+        exclusions = list(self.exclusions.all())
+        for exclusion in exclusions:
+            exclusion.event = self
             exclusion.sync_time_component()
-            exclusion.save(sync_time=False)
+        ExclusionDateRange.objects.bulk_update(exclusions, ["start_date", "end_date"])
 
     def __str__(self) -> str:
         """
@@ -806,7 +1824,9 @@ class Event(models.Model):
         if self.recurrence_rule:
             logger.info("Deleting event recurrence rules")
             self.recurrence_rule.delete()
-        return super().delete(*args, **kwargs)
+        result = super().delete(*args, **kwargs)
+        _schedule_changed(self.calendar_entry_id, self._loaded_calendar_entry())
+        return result
 
 
 class ExclusionDateRange(models.Model):
@@ -856,28 +1876,45 @@ class ExclusionDateRange(models.Model):
         if sync_time:
             self.sync_time_component()
         super().save(*args, **kwargs)
+        _schedule_changed(
+            self.event.calendar_entry_id, self.event._loaded_calendar_entry()
+        )
 
     def delete(self, *args: Any, **kwargs: Any) -> None:
         """
-        Deletes the ExclusionDateRange object and recalculates occurrences for the associated CalendarEntry.
+        Deletes the ExclusionDateRange object and marks the associated CalendarEntry's occurrences stale.
 
         :param args: Variable length argument list
         :param kwargs: Arbitrary keyword arguments
         """
-        calendar_entry = self.event.calendar_entry
-        super().delete(*args, **kwargs)
-        calendar_entry.calculate_occurrences()
+        calendar_entry_id = self.event.calendar_entry_id
+        result = super().delete(*args, **kwargs)
+        _schedule_changed(calendar_entry_id, self.event._loaded_calendar_entry())
+        return result
 
     def sync_time_component(self) -> None:
         """
         Synchronizes the time component of the start and end dates with the event's start time.
+
+        Dates and times are taken in the calendar entry's timezone, so that the
+        exclusion lines up with the event's local start time. A range within a single
+        day ends a second after it starts.
         """
-        event_time = self.event.start_time.time()
         tz = self.event.calendar_entry.timezone.as_tz
+
+        def local(dt: datetime) -> datetime:
+            return dt.astimezone(tz) if django_timezone.is_aware(dt) else dt
+
+        event_time = local(self.event.start_time).time()
         self.start_date = datetime.combine(
-            self.start_date.date(), event_time, tzinfo=tz
+            local(self.start_date).date(), event_time, tzinfo=tz
+        )
+        self.end_date = datetime.combine(
+            local(self.end_date).date(), event_time, tzinfo=tz
         )
-        self.end_date = datetime.combine(self.end_date.date(), event_time, tzinfo=tz)
+        if self.end_date == self.start_date:
+            # a single day, which still has to end after it starts
+            self.end_date += timedelta(seconds=1)
 
     def to_rrule(self) -> rrule:
         """
@@ -894,21 +1931,120 @@ class ExclusionDateRange(models.Model):
         }
         return rrule(**kwargs)
 
-    def get_all_dates(self) -> list[datetime]:
+    def to_interval(self, tz: ZoneInfo | None = None) -> tuple[datetime, datetime]:
+        """
+        Returns the ExclusionDateRange as a half-open ``[start, end)`` interval. The end
+        date itself is excluded, so the interval ends a second after it.
+
+        :param tz: The timezone of the calendar entry. Looked up via the event if not given.
+        :type tz: ZoneInfo | None
+        :return: The start and end of the interval
+        :rtype: tuple[datetime, datetime]
+        """
+        if tz is None:
+            tz = self.event.calendar_entry.timezone.as_tz
+        return (
+            self.start_date.astimezone(tz),
+            self.end_date.astimezone(tz) + timedelta(seconds=1),
+        )
+
+    def get_all_dates(
+        self, tz: ZoneInfo | None = None, rset: ScheduleRuleset | None = None
+    ) -> list[datetime]:
         """
-        Returns a list of all dates within the ExclusionDateRange.
+        Returns the occurrences of the event that the ExclusionDateRange removes, i.e.
+        those within :meth:`to_interval`. This is only needed to write EXDATEs, e.g. in
+        ``to_ical()``; rulesets apply :meth:`to_interval` instead.
 
+        :param tz: The timezone of the calendar entry. Looked up via the event if not given.
+        :type tz: ZoneInfo | None
+        :param rset: The event's occurrences without any exclusions, to reuse across its exclusions. Built if not given.
+        :type rset: ScheduleRuleset | None
         :return: A list of datetime objects
         :rtype: list[datetime]
         """
         if not hasattr(self.event, "recurrence_rule") or not self.event.recurrence_rule:
             return []
 
-        tz = self.event.calendar_entry.timezone.as_tz
-        return list(
-            rrule(
-                self.event.recurrence_rule.frequency,
-                dtstart=self.start_date.astimezone(tz),
-                until=self.end_date.astimezone(tz),
-            )
+        if tz is None:
+            tz = self.event.calendar_entry.timezone.as_tz
+        if rset is None:
+            rset = self.event.to_rruleset(tz=tz, exclusions=())
+        start, end = self.to_interval(tz=tz)
+        with instrumentation.timer(
+            "recurring.exclusions.expand", calendar_entry=self.event.calendar_entry_id
+        ):
+            dates = [
+                dt.astimezone(tz)
+                for dt in rset.between(start, end, inc=True)
+                if dt < end
+            ]
+        instrumentation.incr(
+            "recurring.exclusions.dates",
+            len(dates),
+            calendar_entry=self.event.calendar_entry_id,
+        )
+        return dates
+
+
+class OccurrenceQuerySet(models.QuerySet):
+    def between(self, start: datetime, end: datetime) -> OccurrenceQuerySet:
+        """
+        Filters to occurrences that overlap the half-open window ``[start, end)``.
+
+        :param start: The start of the window
+        :type start: datetime
+        :param end: The end of the window
+        :type end: datetime
+        :return: The filtered queryset
+        :rtype: OccurrenceQuerySet
+        """
+        return self.filter(start_utc__lt=end, end_utc__gt=start)
+
+
+class Occurrence(models.Model):
+    """
+    A single materialised occurrence of an Event, stored in UTC.
+
+    Rows are only written when the ``RECURRING_MATERIALISE_OCCURRENCES`` setting is
+    enabled, in which case they are refreshed each time occurrences are calculated for
+    the owning CalendarEntry. They cover ``RECURRING_OCCURRENCE_HORIZON_DAYS`` either
+    side of the time they were calculated.
+    """
+
+    calendar_entry = models.ForeignKey(
+        CalendarEntry,
+        on_delete=models.CASCADE,
+        related_name="occurrences",
+        help_text=_("The calendar entry this occurrence belongs to"),
+    )
+    event = models.ForeignKey(
+        Event,
+        on_delete=models.CASCADE,
+        related_name="occurrences",
+        help_text=_("The event that generated this occurrence"),
+    )
+    start_utc = models.DateTimeField(help_text=_("When the occurrence starts, in UTC"))
+    end_utc = models.DateTimeField(help_text=_("When the occurrence ends, in UTC"))
+
+    objects = OccurrenceQuerySet.as_manager()
+
+    class Meta:
+        indexes = (
+            models.Index(
+                fields=["start_utc", "end_utc"], name="recurring_occurrence_range"
+            ),
+            models.Index(
+                fields=["calendar_entry", "start_utc"],
+                name="recurring_occurrence_entry",
+            ),
         )
+
+    def __str__(self) -> str:
+        """
+        Returns a string representation of the Occurrence.
+
+        :return: A string describing the Occurrence
+        :rtype: str
+        """
+        return f"Occurrence of {self.calendar_entry.name}: {self.start_utc} to {self.end_utc}"
@@ -0,0 +1,137 @@
+"""
+Previews of the occurrences of unsaved schedules, for the admin widget.
+
+The widget posts the JSON it would save (see ``CalendarEntryForm``) to the admin's
+preview endpoint, which validates it with :func:`recurring.bulk.build_schedule` and
+expands the next few occurrences of the unsaved objects, so nothing is written to the
+database.
+
+Some rules take a long time to produce occurrences, or never do (e.g. the 30th of
+February, which dateutil searches for until the year 9999). The expansion therefore
+runs in the preview thread pool of :mod:`recurring.executor`, and the preview only
+waits ``RECURRING_PREVIEW_TIMEOUT`` seconds (half a second by default) for it before
+returning the occurrences found so far, marked incomplete. The expansion is then
+cancelled, although dateutil can only be stopped once it finds an occurrence or
+gives up, which can take a few seconds. Until then it holds one of the
+``RECURRING_PREVIEW_WORKERS`` threads, but not a thread of the pool the async model
+methods use.
+"""
+
+from __future__ import annotations
+
+import heapq
+import threading
+from collections.abc import Iterator
+from concurrent.futures import TimeoutError
+from datetime import datetime
+from typing import Any
+
+from django.conf import settings
+from django.utils import timezone as django_timezone
+
+from .bulk import build_schedule
+from .executor import get_preview_executor
+from .models import Timezone
+from .rulesets import ScheduleRuleset
+
+DEFAULT_PREVIEW_COUNT = 10
+MAX_PREVIEW_COUNT = 100
+DEFAULT_PREVIEW_TIMEOUT = 0.5
+
+
+def _upcoming(
+    rset: ScheduleRuleset, after: datetime, cancelled: threading.Event
+) -> Iterator[datetime]:
+    """
+    Lazily yields the occurrences of a ruleset from ``after`` (inclusive) until it's
+    cancelled.
+    """
+    if rset.fast_path:
+        # each step is calculated directly
+        dt = rset.after(after, inc=True)
+        while dt is not None and not cancelled.is_set():
+            yield dt
+            dt = rset.after(dt)
+        return
+
+    # dateutil walks from the start of the rules
+    for dt in rset:
+        if cancelled.is_set():
+            return
+        if dt >= after:
+            yield dt
+
+
+def preview_occurrences(
+    data: dict[str, Any],
+    timezone: Timezone,
+    count: int = DEFAULT_PREVIEW_COUNT,
+    after: datetime | None = None,
+    timeout: float | None = None,
+) -> dict[str, Any]:
+    """
+    Expands the next occurrences of an unsaved schedule without touching the database.
+
+    :param data: The schedule, in the format of ``CalendarEntry.to_dict()`` with times in the timezone's local time unless they have an offset
+    :type data: dict[str, Any]
+    :param timezone: The timezone of the schedule
+    :type timezone: Timezone
+    :param count: The most occurrences to return, up to :data:`MAX_PREVIEW_COUNT`
+    :type count: int
+    :param after: Only include occurrences from this time on. Defaults to now.
+    :type after: datetime | None
+    :param timeout: How many seconds to wait for the occurrences. Defaults to the ``RECURRING_PREVIEW_TIMEOUT`` setting.
+    :type timeout: float | None
+    :return: ``{"occurrences": [{"event", "start", "end"}], "complete": bool}``, where ``event`` is the index of the event in ``data`` and times are ISO 8601 in the timezone. ``complete`` is False if the time ran out.
+    :rtype: dict[str, Any]
+    :raises ValidationError: If the schedule is invalid
+    """
+    if after is None:
+        after = django_timezone.now()
+    if timeout is None:
+        timeout = getattr(
+            settings, "RECURRING_PREVIEW_TIMEOUT", DEFAULT_PREVIEW_TIMEOUT
+        )
+    count = max(0, min(count, MAX_PREVIEW_COUNT))
+
+    _, events = build_schedule(
+        # the name isn't needed to preview the schedule
+        {**data, "name": data.get("name") or "Preview", "timezone": timezone.name},
+        {timezone.name: timezone},
+    )
+    tz = timezone.as_tz
+    after = after.astimezone(tz)
+    cancelled = threading.Event()
+    results: list[dict[str, Any]] = []
+
+    def occurrences(index: int) -> Iterator[tuple[datetime, int]]:
+        event, _, exclusions = events[index]
+        rset = event.to_rruleset(tz=tz, exclusions=exclusions)
+        for dt in _upcoming(rset, after, cancelled):
+            yield dt, index
+
+    def expand() -> None:
+        merged = heapq.merge(*(occurrences(index) for index in range(len(events))))
+        for dt, index in merged:
+            if len(results) >= count or cancelled.is_set():
+                return
+            start = dt.astimezone(tz)
+            results.append(
+                {
+                    "event": index,
+                    "start": start.isoformat(),
+                    "end": (start + events[index][0].duration).isoformat(),
+                }
+            )
+
+    future = get_preview_executor().submit(expand)
+    try:
+        future.result(timeout=timeout)
+        complete = True
+    except TimeoutError:
+        # drop it if it's still queued behind other previews
+        future.cancel()
+        cancelled.set()
+        complete = False
+
+    return {"occurrences": results[:count], "complete": complete}
@@ -0,0 +1,124 @@
+"""
+Coalesced recalculation of occurrence fields.
+
+Saving or deleting a calendar entry's events, recurrence rules or exclusions marks
+the entry as stale. Rather than recalculating straight away, stale entries are
+collected and recalculated together in a single ``transaction.on_commit()`` callback,
+so each entry is recalculated at most once per transaction, however many of its
+parts changed. Outside a transaction the callback runs immediately, so wrap bulk
+edits in :func:`deferred_recalculation` to coalesce them.
+
+Models are imported lazily so that this module can be imported before Django's app
+registry is ready.
+"""
+
+from __future__ import annotations
+
+import threading
+from collections.abc import Iterator
+from contextlib import contextmanager
+from typing import Any
+
+from django.db import transaction
+
+
+class _State(threading.local):
+    def __init__(self) -> None:
+        # how many deferred_recalculation() blocks are open
+        self.depth = 0
+        # entries marked stale inside deferred_recalculation() blocks
+        self.deferred: dict[int, Any] = {}
+        # entries waiting for the registered on_commit callback
+        self.pending: dict[int, Any] = {}
+        self.callback: Any | None = None
+
+
+_state = _State()
+
+
+@contextmanager
+def deferred_recalculation() -> Iterator[None]:
+    """
+    Defers recalculating occurrences until the end of the block, then recalculates
+    every stale calendar entry once (on commit, if inside a transaction).
+
+    Blocks can be nested; recalculation waits for the outermost block to finish.
+
+    Example::
+
+        with deferred_recalculation():
+            for exclusion in exclusions:
+                exclusion.save()
+    """
+    _state.depth += 1
+    try:
+        yield
+    finally:
+        _state.depth -= 1
+        if not _state.depth:
+            deferred, _state.deferred = _state.deferred, {}
+            if deferred:
+                _schedule(deferred)
+
+
+def mark_stale(calendar_entry_id: int | None, instance: Any = None) -> None:
+    """
+    Schedules a calendar entry's occurrence fields to be recalculated.
+
+    :param calendar_entry_id: The primary key of the stale calendar entry
+    :type calendar_entry_id: int | None
+    :param instance: A CalendarEntry instance to update with the recalculated fields
+    :type instance: CalendarEntry | None
+    """
+    if calendar_entry_id is None:
+        return
+
+    entries = _state.deferred if _state.depth else {}
+    if instance is not None or calendar_entry_id not in entries:
+        entries[calendar_entry_id] = instance
+    if not _state.depth:
+        _schedule(entries)
+
+
+def _schedule(entries: dict[int, Any]) -> None:
+    """
+    Adds entries to the callback registered for the current transaction, registering
+    one if needed. Outside a transaction they're recalculated immediately.
+    """
+    connection = transaction.get_connection()
+    if not connection.in_atomic_block:
+        _recalculate(entries)
+        return
+
+    # the callback is discarded if the transaction or savepoint it was registered in
+    # rolls back
+    if _state.callback is None or not any(
+        callback is _state.callback for _, callback, *_ in connection.run_on_commit
+    ):
+
+        def callback() -> None:
+            entries, _state.pending = _state.pending, {}
+            _state.callback = None
+            _recalculate(entries)
+
+        _state.pending = {}
+        _state.callback = callback
+        transaction.on_commit(callback)
+
+    for calendar_entry_id, instance in entries.items():
+        if instance is not None or calendar_entry_id not in _state.pending:
+            _state.pending[calendar_entry_id] = instance
+
+
+def _recalculate(entries: dict[int, Any]) -> None:
+    """
+    Recalculates the occurrence fields of calendar entries in bulk, copying the
+    results onto any instances that were given.
+    """
+    from .models import CalendarEntry
+
+    for entry in CalendarEntry.objects.filter(pk__in=entries).recalculate_occurrences():
+        instance = entries[entry.pk]
+        if instance is not None:
+            for field in CalendarEntry.CALCULATED_FIELDS:
+                setattr(instance, field, getattr(entry, field))
@@ -0,0 +1,208 @@
+from __future__ import annotations
+
+from bisect import bisect_right
+from collections.abc import Iterator
+from datetime import datetime
+
+from dateutil.rrule import rruleset
+
+from .fastpath import FixedIntervalRule
+
+
+class ScheduleRuleset(rruleset):
+    """
+    An rruleset that also skips any occurrence falling inside an exclusion interval.
+
+    Exclusion intervals are half-open (``[start, end)``), kept sorted and merged, and
+    each occurrence is checked against them with a binary search. Unlike exdates, an
+    interval costs the same however many occurrences it covers.
+
+    If every rule of the set is a :class:`~recurring.fastpath.FixedIntervalRule` (or a
+    ScheduleRuleset made of them), ``after()``, ``before()``, ``between()`` and
+    ``xafter()`` combine
+    the answers of each rule instead of iterating over the whole set, jumping over
+    exclusions rather than checking every occurrence inside them. The results are the
+    same as iterating, except around local times that don't exist (e.g. when clocks go
+    forward), where occurrences are out of order and iterating merges them differently.
+    """
+
+    def __init__(self, cache: bool = False) -> None:
+        super().__init__(cache=cache)
+        self._exclusions: list[tuple[datetime, datetime]] = []
+        self._exclusion_starts: list[datetime] | None = None
+        self._exclusion_ends: list[datetime] = []
+
+    def exclude(self, start: datetime, end: datetime) -> None:
+        """
+        Excludes all occurrences in the half-open interval ``[start, end)``.
+
+        :param start: The first instant to exclude
+        :type start: datetime
+        :param end: The first instant after the exclusion
+        :type end: datetime
+        """
+        if start < end:
+            self._exclusions.append((start, end))
+            self._exclusion_starts = None
+
+    @property
+    def exclusions(self) -> list[tuple[datetime, datetime]]:
+        """
+        Returns the sorted, merged exclusion intervals.
+
+        :return: A list of ``(start, end)`` half-open intervals
+        :rtype: list[tuple[datetime, datetime]]
+        """
+        self._merge_exclusions()
+        return list(zip(self._exclusion_starts, self._exclusion_ends))
+
+    def _merge_exclusions(self) -> None:
+        """
+        Sorts and merges overlapping or touching exclusion intervals.
+        """
+        if self._exclusion_starts is not None:
+            return
+
+        starts: list[datetime] = []
+        ends: list[datetime] = []
+        for start, end in sorted(self._exclusions):
+            if ends and start <= ends[-1]:
+                ends[-1] = max(ends[-1], end)
+            else:
+                starts.append(start)
+                ends.append(end)
+
+        self._exclusion_starts = starts
+        self._exclusion_ends = ends
+
+    def _exclusion_index(self, dt: datetime) -> int | None:
+        """
+        Returns the index of the merged exclusion interval ``dt`` falls inside, if any.
+        """
+        self._merge_exclusions()
+        i = bisect_right(self._exclusion_starts, dt) - 1
+        if i >= 0 and dt < self._exclusion_ends[i]:
+            return i
+        return None
+
+    def is_excluded(self, dt: datetime) -> bool:
+        """
+        Returns whether ``dt`` falls inside one of the exclusion intervals.
+
+        :param dt: The datetime to check
+        :type dt: datetime
+        :return: True if ``dt`` is excluded
+        :rtype: bool
+        """
+        return self._exclusion_index(dt) is not None
+
+    @property
+    def fast_path(self) -> bool:
+        """
+        Returns whether ``after()``, ``before()`` and ``between()`` can be answered
+        without iterating over the set, because all its rules have a fixed interval.
+
+        :return: True if every rule can be evaluated with arithmetic
+        :rtype: bool
+        """
+        return (
+            not self._exrule
+            and not self._exdate
+            and all(
+                isinstance(rule, FixedIntervalRule)
+                or (isinstance(rule, ScheduleRuleset) and rule.fast_path)
+                for rule in self._rrule
+            )
+        )
+
+    def after(self, dt: datetime, inc: bool = False) -> datetime | None:
+        if not self.fast_path:
+            return super().after(dt, inc)
+
+        candidates = [
+            rdate
+            for rdate in self._rdate
+            if (rdate >= dt if inc else rdate > dt) and not self.is_excluded(rdate)
+        ]
+        for rule in self._rrule:
+            occurrence = rule.after(dt, inc)
+            while occurrence is not None:
+                i = self._exclusion_index(occurrence)
+                if i is None:
+                    candidates.append(occurrence)
+                    break
+                occurrence = rule.after(self._exclusion_ends[i], inc=True)
+        result = min(candidates, default=None)
+        if result is not None and not (result >= dt if inc else result > dt):
+            # exclusions ending on a time that doesn't exist locally can compare
+            # inconsistently, so leave those to dateutil
+            return super().after(dt, inc)
+        return result
+
+    def before(self, dt: datetime, inc: bool = False) -> datetime | None:
+        if not self.fast_path:
+            return super().before(dt, inc)
+
+        candidates = [
+            rdate
+            for rdate in self._rdate
+            if (rdate <= dt if inc else rdate < dt) and not self.is_excluded(rdate)
+        ]
+        for rule in self._rrule:
+            occurrence = rule.before(dt, inc)
+            while occurrence is not None:
+                i = self._exclusion_index(occurrence)
+                if i is None:
+                    candidates.append(occurrence)
+                    break
+                occurrence = rule.before(self._exclusion_starts[i])
+        result = max(candidates, default=None)
+        if result is not None and not (result <= dt if inc else result < dt):
+            return super().before(dt, inc)
+        return result
+
+    def between(
+        self, after: datetime, before: datetime, inc: bool = False, count: int = 1
+    ) -> list[datetime]:
+        if not self.fast_path:
+            return super().between(after, before, inc, count)
+
+        if inc:
+            occurrences = [rdate for rdate in self._rdate if after <= rdate <= before]
+        else:
+            occurrences = [rdate for rdate in self._rdate if after < rdate < before]
+        for rule in self._rrule:
+            occurrences.extend(rule.between(after, before, inc))
+
+        # drop duplicates the way iterating over the set does
+        result: list[datetime] = []
+        for occurrence in sorted(occurrences):
+            if (not result or result[-1] != occurrence) and not self.is_excluded(
+                occurrence
+            ):
+                result.append(occurrence)
+        return result
+
+    def xafter(
+        self, dt: datetime, count: int | None = None, inc: bool = False
+    ) -> Iterator[datetime]:
+        if not self.fast_path:
+            yield from super().xafter(dt, count, inc)
+            return
+
+        found = 0
+        occurrence = self.after(dt, inc)
+        while occurrence is not None and (count is None or found < count):
+            yield occurrence
+            found += 1
+            occurrence = self.after(occurrence)
+
+    def _iter(self) -> Iterator[datetime]:
+        if not self._exclusions:
+            yield from super()._iter()
+            return
+
+        self._merge_exclusions()
+        for dt in super()._iter():
+            if not self.is_excluded(dt):
+                yield dt
@@ -1,3 +1,6 @@
+import os
+import tempfile
+
 SECRET_KEY = "test-key"
 INSTALLED_APPS = [
     "django.contrib.contenttypes",
@@ -9,5 +12,15 @@ DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": ":memory:",  # Use an in-memory database for tests
+        # worker processes started by ``calculate_occurrences --workers``
+        # can only share the test database through a file
+        "TEST": {"NAME": os.path.join(tempfile.gettempdir(), "recurring_test.sqlite3")},
     }
 }
+MIDDLEWARE = [
+    "django.contrib.sessions.middleware.SessionMiddleware",
+    "django.contrib.auth.middleware.AuthenticationMiddleware",
+]
+SESSION_ENGINE = "django.contrib.sessions.backends.signed_cookies"
+ROOT_URLCONF = "tests.urls"
+USE_TZ = True
@@ -13,15 +13,127 @@ function initCalendarEntryWidget(name) {
 
     const calendarEntryForm = new CalendarEntryForm(form, name);
 
+    // Large schedules are loaded in pages instead of being inlined in the page. The
+    // input stays empty until every page has loaded, so saving before then leaves the
+    // events unchanged.
+    const scheduleUrl = widget.dataset.scheduleUrl;
+    let loaded = true;
+
     function updateInputAndText() {
+        if (!loaded) return;
         const jsonValue = calendarEntryForm.toJSON();
         input.value = jsonValue;
         text.innerHTML = calendarEntryForm.toText();
         console.log('Updated input value:', jsonValue);
+        schedulePreview();
     }
 
     calendarEntryForm.onChange = updateInputAndText;
 
+    // Live preview of the next occurrences, calculated by the server without saving
+    const previewUrl = widget.dataset.previewUrl;
+    const preview = document.getElementById(`calendar-entry-preview-${name}`);
+    const timezoneSelect = document.getElementById('id_timezone');
+    const PREVIEW_DELAY = 400;
+    let previewTimer = null;
+    let previewController = null;
+
+    function schedulePreview() {
+        if (!previewUrl || !preview) return;
+        clearTimeout(previewTimer);
+        previewTimer = setTimeout(loadPreview, PREVIEW_DELAY);
+    }
+
+    function loadPreview() {
+        const results = preview.querySelector('.calendar-entry-preview-results');
+        if (!timezoneSelect || !timezoneSelect.value || calendarEntryForm.events.length === 0) {
+            results.textContent = 'Add an event and choose a timezone to preview its occurrences.';
+            return;
+        }
+
+        // only the latest request's response is shown
+        if (previewController) previewController.abort();
+        previewController = new AbortController();
+
+        const csrfInput = form.closest('form')?.querySelector('[name=csrfmiddlewaretoken]');
+        fetch(previewUrl, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+                'X-CSRFToken': csrfInput ? csrfInput.value : ''
+            },
+            body: JSON.stringify({
+                calendar_entry: input.value,
+                timezone: timezoneSelect.value
+            }),
+            signal: previewController.signal
+        })
+            .then(response => response.json())
+            .then(data => renderPreview(results, data))
+            .catch(error => {
+                if (error.name !== 'AbortError') {
+                    console.error('Error loading preview:', error);
+                    results.textContent = 'The preview could not be loaded.';
+                }
+            });
+    }
+
+    function renderPreview(results, data) {
+        results.innerHTML = '';
+        if (data.error) {
+            results.textContent = data.error;
+            return;
+        }
+        if (data.occurrences.length === 0) {
+            results.textContent = 'No upcoming occurrences.';
+        } else {
+            const list = document.createElement('ol');
+            data.occurrences.forEach(occurrence => {
+                const item = document.createElement('li');
+                const start = DateTime.fromISO(occurrence.start, { setZone: true });
+                const end = DateTime.fromISO(occurrence.end, { setZone: true });
+                const endFormat = start.hasSame(end, 'day') ? 'HH:mm' : 'ccc d LLL yyyy HH:mm';
+                item.textContent = `${start.toFormat('ccc d LLL yyyy HH:mm')} – ${end.toFormat(endFormat)} (Event ${occurrence.event + 1})`;
+                list.appendChild(item);
+            });
+            results.appendChild(list);
+        }
+        if (!data.complete) {
+            const note = document.createElement('p');
+            note.className = 'help';
+            note.textContent = 'This rule takes too long to expand, so the preview is incomplete.';
+            results.appendChild(note);
+        }
+    }
+
+    if (timezoneSelect) {
+        timezoneSelect.addEventListener('change', schedulePreview);
+    }
+
+    function loadSchedule(url, events) {
+        fetch(url, { headers: { 'Accept': 'application/json' } })
+            .then(response => {
+                if (!response.ok) throw new Error(`HTTP ${response.status}`);
+                return response.json();
+            })
+            .then(data => {
+                events.push(...data.events);
+                if (data.next) {
+                    text.textContent = `Loading events... (${events.length} so far)`;
+                    loadSchedule(data.next, events);
+                    return;
+                }
+                calendarEntryForm.setEvents(parseScheduleData({ timezone: data.timezone, events }));
+                loaded = true;
+                form.style.display = '';
+                updateInputAndText();
+            })
+            .catch(error => {
+                console.error('Error loading events:', error);
+                text.textContent = 'The events could not be loaded. Reload the page to edit them.';
+            });
+    }
+
     const initialData = input.value || input.getAttribute('data-initial');
     console.log(`parsing initial data ${initialData}`);
     if (initialData) {
@@ -33,6 +145,11 @@ function initCalendarEntryWidget(name) {
             console.error('Initial data:', initialData);
             text.innerHTML = `Error: Invalid calendar entry data - ${error.message}`;
         }
+    } else if (scheduleUrl) {
+        loaded = false;
+        form.style.display = 'none';
+        text.textContent = 'Loading events...';
+        loadSchedule(scheduleUrl, []);
     }
 
     // Always set the initial input value
@@ -514,6 +631,9 @@ class CalendarEntryForm {
         const endDateInput = exclusionContainer.querySelector('.exclusion-end-date');
 
         if (exclusion) {
+            if (exclusion.id) {
+                exclusionContainer.dataset.exclusionId = exclusion.id.toString();
+            }
             startDateInput.value = this.formatDateForInput(exclusion.start_date, event.timezone);
             endDateInput.value = this.formatDateForInput(exclusion.end_date, event.timezone);
         }
@@ -557,6 +677,7 @@ class CalendarEntryForm {
 
         event.exclusions = Array.from(exclusionContainers).map(container => {
             return {
+                id: container.dataset.exclusionId ? parseInt(container.dataset.exclusionId, 10) : undefined,
                 start_date: this.formatDateTimeToLocal(container.querySelector('.exclusion-start-date').value, event.timezone),
                 end_date: this.formatDateTimeToLocal(container.querySelector('.exclusion-end-date').value, event.timezone)
             };
@@ -769,7 +890,10 @@ function parseInitialData(jsonString) {
     console.log('Parsing initial data string:', jsonString);
     const data = JSON.parse(jsonString);
     console.log('Parsed JSON data:', data);
+    return parseScheduleData(data);
+}
 
+function parseScheduleData(data) {
     const events = data.events.map(eventData => ({
         id: eventData.id || `temp_${Date.now()}_${Math.random().toString(36).substr(2, 9)}`,
         timezone: data.timezone,
@@ -794,6 +918,7 @@ function parseInitialData(jsonString) {
             timezone: eventData.recurrence_rule.timezone
         } : null,
         exclusions: eventData.exclusions ? eventData.exclusions.map(exclusion => ({
+            id: exclusion.id,
             start_date: removeTimezone(exclusion.start_date),
             end_date: removeTimezone(exclusion.end_date)
         })) : []
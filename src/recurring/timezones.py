@@ -0,0 +1,82 @@
+"""
+Helpers for finding the UTC offset transitions of a timezone.
+"""
+
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from typing import Any
+from zoneinfo import ZoneInfo
+
+SECONDS_PER_DAY = 86400
+
+
+@lru_cache(maxsize=1024)
+def year_transitions(tz_name: str, year: int) -> tuple[int, list[tuple[int, int]]]:
+    """
+    Finds a timezone's UTC offset changes during a year.
+
+    :param tz_name: The name of the timezone
+    :type tz_name: str
+    :param year: The year
+    :type year: int
+    :return: The offset at the start of the year, then each transition instant with the offset that follows it
+    :rtype: tuple[int, list[tuple[int, int]]]
+    """
+    tz = ZoneInfo(tz_name)
+    start = int(datetime(year, 1, 1, tzinfo=timezone.utc).timestamp())
+    end = int(datetime(year + 1, 1, 1, tzinfo=timezone.utc).timestamp())
+
+    initial_offset = utc_offset(tz, start)
+    transitions: list[tuple[int, int]] = []
+    previous, previous_offset = start, initial_offset
+    for sample in range(
+        start + SECONDS_PER_DAY, end + SECONDS_PER_DAY, SECONDS_PER_DAY
+    ):
+        sample = min(sample, end)
+        offset = utc_offset(tz, sample)
+        if offset != previous_offset:
+            transitions.append(
+                (find_transition(tz, previous, sample, previous_offset), offset)
+            )
+        previous, previous_offset = sample, offset
+
+    return initial_offset, transitions
+
+
+def utc_offset(tz: ZoneInfo, seconds: int) -> int:
+    """
+    Returns a timezone's UTC offset in seconds at an instant.
+
+    :param tz: The timezone
+    :type tz: ZoneInfo
+    :param seconds: The instant as seconds since the epoch
+    :type seconds: int
+    :return: The UTC offset in seconds
+    :rtype: int
+    """
+    offset: Any = datetime.fromtimestamp(seconds, tz).utcoffset()
+    return int(offset / timedelta(seconds=1))
+
+
+def find_transition(tz: ZoneInfo, low: int, high: int, low_offset: int) -> int:
+    """
+    Binary searches for the first second in ``(low, high]`` with a different offset.
+
+    :param tz: The timezone
+    :type tz: ZoneInfo
+    :param low: An instant known to have ``low_offset``
+    :type low: int
+    :param high: An instant known to have a different offset
+    :type high: int
+    :param low_offset: The UTC offset at ``low``
+    :type low_offset: int
+    :return: The transition instant as seconds since the epoch
+    :rtype: int
+    """
+    while high - low > 1:
+        middle = (low + high) // 2
+        if utc_offset(tz, middle) == low_offset:
+            low = middle
+        else:
+            high = middle
+    return high
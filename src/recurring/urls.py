@@ -0,0 +1,9 @@
+from django.urls import path
+
+from .views import OccurrencesView
+
+app_name = "recurring"
+
+urlpatterns = [
+    path("occurrences/", OccurrencesView.as_view(), name="occurrences"),
+]
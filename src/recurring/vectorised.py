@@ -0,0 +1,523 @@
+"""
+A NumPy engine for expanding the occurrences of many calendar entries at once.
+
+Entries are expanded a batch at a time. Common rule shapes (DAILY, WEEKLY and
+MONTHLY rules with an interval, BYDAY and BYMONTHDAY) are grouped across the batch,
+and each group is expanded in local wall time with one set of array operations
+whatever its events' start times, COUNT/UNTIL and timezones. The occurrences are
+converted to UTC using a table of each timezone's transitions and filtered by their
+exclusions with vectorised masks. Anything else falls back to dateutil via
+``Event.to_rruleset()``, so the results always match ``CalendarEntry.to_rruleset()``.
+
+This module requires numpy (``pip install django_recurring[numpy]``).
+"""
+
+from __future__ import annotations
+
+from collections import defaultdict
+from collections.abc import Iterable, Iterator
+from datetime import datetime, timezone
+from itertools import islice
+from zoneinfo import ZoneInfo
+
+import numpy as np
+from dateutil.rrule import DAILY, MONTHLY, WEEKLY
+from django.db.models import QuerySet
+
+from .models import CalendarEntry, Event, RecurrenceRule, WeekDay
+from .timezones import SECONDS_PER_DAY, year_transitions
+
+WEEKDAY_NUMBERS = {
+    WeekDay.MONDAY: 0,
+    WeekDay.TUESDAY: 1,
+    WeekDay.WEDNESDAY: 2,
+    WeekDay.THURSDAY: 3,
+    WeekDay.FRIDAY: 4,
+    WeekDay.SATURDAY: 5,
+    WeekDay.SUNDAY: 6,
+}
+
+SUPPORTED_FREQUENCIES = (DAILY, WEEKLY, MONTHLY)
+
+# rule fields the engine can't express
+UNSUPPORTED_FIELDS = (
+    "bysetpos",
+    "bymonth",
+    "byyearday",
+    "byweekno",
+    "byhour",
+    "byminute",
+    "bysecond",
+)
+
+
+# 1970-01-01 was a Thursday
+EPOCH_WEEKDAY = 3
+
+# how far either side of a window to expand in local time, covering any UTC offset
+WINDOW_MARGIN_DAYS = 2
+
+# the UNTIL of rules without one
+NO_LIMIT = np.iinfo("int64").max
+
+# occurrences are sorted per event or entry as int64 keys: the index of the event or
+# entry in the top bits and the time, offset to be positive, in the bottom ones
+KEY_BITS = 39
+KEY_OFFSET = 1 << 38
+KEY_MASK = (1 << KEY_BITS) - 1
+
+
+def supports(rule: RecurrenceRule | None) -> bool:
+    """
+    Returns whether the engine can expand a recurrence rule without dateutil.
+
+    :param rule: The recurrence rule, or None for a single occurrence
+    :type rule: RecurrenceRule | None
+    :return: True if the rule can be vectorised
+    :rtype: bool
+    """
+    if rule is None:
+        return True
+    if rule.frequency not in SUPPORTED_FREQUENCIES or rule.interval < 1:
+        return False
+    if any(getattr(rule, field) for field in UNSUPPORTED_FIELDS):
+        return False
+    if rule.byweekday and any(day not in WEEKDAY_NUMBERS for day in rule.byweekday):
+        return False
+    if rule.bymonthday:
+        if rule.frequency != MONTHLY or rule.byweekday:
+            return False
+        if any(not isinstance(day, int) or day == 0 for day in rule.bymonthday):
+            return False
+    return not (rule.frequency == MONTHLY and rule.byweekday)
+
+
+def expand_between(
+    entries: Iterable[CalendarEntry],
+    start: datetime,
+    end: datetime,
+    batch_size: int = 500,
+) -> Iterator[tuple[CalendarEntry, np.ndarray]]:
+    """
+    Expands the occurrences of each calendar entry between ``start`` and ``end``
+    (inclusive), equivalent to ``entry.to_rruleset().between(start, end, inc=True)``.
+
+    Entries are expanded ``batch_size`` at a time, the events of a whole batch in one
+    go (see :func:`_expand_events`). If a queryset is given, each batch is loaded with
+    ``with_schedule()``.
+
+    :param entries: The calendar entries to expand
+    :type entries: Iterable[CalendarEntry]
+    :param start: The start of the window (timezone-aware)
+    :type start: datetime
+    :param end: The end of the window (timezone-aware)
+    :type end: datetime
+    :param batch_size: How many entries to expand (and load from a queryset) at a time
+    :type batch_size: int
+    :return: An iterator of each entry and a sorted ``datetime64[s]`` array of its occurrences in UTC
+    :rtype: Iterator[tuple[CalendarEntry, np.ndarray]]
+    """
+    if isinstance(entries, QuerySet):
+        entries = entries.with_schedule().iterator(chunk_size=batch_size)
+
+    window = (_to_utc_seconds(start), _to_utc_seconds(end))
+
+    iterator = iter(entries)
+    while batch := list(islice(iterator, batch_size)):
+        events = []
+        for index, entry in enumerate(batch):
+            tz = entry.timezone.as_tz
+            events.extend((index, event, tz) for event in entry.events.all())
+
+        owners, occurrences = _expand_events(events, window)
+        # sorts each entry's occurrences and drops those shared by its events
+        keys = np.unique(_keys(owners, occurrences))
+        bounds = np.searchsorted(
+            keys, np.arange(len(batch) + 1, dtype="int64") << KEY_BITS
+        )
+        for index, entry in enumerate(batch):
+            occurrences = keys[bounds[index] : bounds[index + 1]] & KEY_MASK
+            yield entry, (occurrences - KEY_OFFSET).astype("datetime64[s]")
+
+
+def expand_event(event: Event, tz: ZoneInfo, window: tuple[int, int]) -> np.ndarray:
+    """
+    Expands the occurrences of a single event within a window, falling back to
+    dateutil if its rule isn't supported.
+
+    :param event: The event to expand
+    :type event: Event
+    :param tz: The calendar entry's timezone
+    :type tz: ZoneInfo
+    :param window: The inclusive window as UTC seconds since the epoch
+    :type window: tuple[int, int]
+    :return: A sorted int64 array of UTC seconds since the epoch
+    :rtype: np.ndarray
+    """
+    _, occurrences = _expand_events([(0, event, tz)], window)
+    return np.unique(occurrences)
+
+
+def _expand_events(
+    events: Iterable[tuple[int, Event, ZoneInfo]], window: tuple[int, int]
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Expands the occurrences of many events within a window.
+
+    Events whose rules have the same shape (frequency, interval and BYDAY or
+    BYMONTHDAY) are expanded together, with one set of array operations for all of
+    them whatever their start times, COUNT/UNTIL, timezones and exclusions. Events
+    with unsupported rules fall back to dateutil one at a time.
+
+    :param events: ``(owner, event, tz)`` tuples, where ``owner`` is a non-negative number (e.g. the index of the event's calendar entry) returned with each of the event's occurrences and ``tz`` is the calendar entry's timezone
+    :type events: Iterable[tuple[int, Event, ZoneInfo]]
+    :param window: The inclusive window as UTC seconds since the epoch
+    :type window: tuple[int, int]
+    :return: int64 arrays of the owner and UTC seconds since the epoch of each occurrence, in no particular order and with duplicates if events share occurrences
+    :rtype: tuple[np.ndarray, np.ndarray]
+    """
+    groups: dict[tuple, list[tuple[int, Event, ZoneInfo]]] = defaultdict(list)
+    single_owners: list[int] = []
+    single_starts: list[int] = []
+    owners = []
+    occurrences = []
+
+    for owner, event, tz in events:
+        rule = event.recurrence_rule
+        if rule is None:
+            single_owners.append(owner)
+            single_starts.append(_to_utc_seconds(event.start_time))
+        elif supports(rule):
+            groups[_shape(rule, event.start_time.astimezone(tz))].append(
+                (owner, event, tz)
+            )
+        else:
+            expanded = _expand_with_dateutil(event=event, tz=tz, window=window)
+            owners.append(np.full(expanded.size, owner, dtype="int64"))
+            occurrences.append(expanded)
+
+    owners.append(np.array(single_owners, dtype="int64"))
+    occurrences.append(np.array(single_starts, dtype="int64"))
+    for shape, members in groups.items():
+        group_owners, group_occurrences = _expand_group(shape, members, window)
+        owners.append(group_owners)
+        occurrences.append(group_occurrences)
+
+    owners_array = np.concatenate(owners)
+    occurrences_array = np.concatenate(occurrences)
+    in_window = (occurrences_array >= window[0]) & (occurrences_array <= window[1])
+    return owners_array[in_window], occurrences_array[in_window]
+
+
+def _expand_with_dateutil(
+    event: Event, tz: ZoneInfo, window: tuple[int, int]
+) -> np.ndarray:
+    """
+    Expands an event with dateutil and converts the result to an array.
+
+    :param event: The event to expand
+    :type event: Event
+    :param tz: The calendar entry's timezone
+    :type tz: ZoneInfo
+    :param window: The inclusive window as UTC seconds since the epoch
+    :type window: tuple[int, int]
+    :return: A sorted int64 array of UTC seconds since the epoch
+    :rtype: np.ndarray
+    """
+    occurrences = event.to_rruleset(tz=tz).between(
+        datetime.fromtimestamp(window[0], timezone.utc),
+        datetime.fromtimestamp(window[1], timezone.utc),
+        inc=True,
+    )
+    return np.array([_to_utc_seconds(dt) for dt in occurrences], dtype="int64")
+
+
+def _shape(rule: RecurrenceRule, dtstart: datetime) -> tuple:
+    """
+    Returns what events must have in common to be expanded together: the frequency,
+    interval and the days of each period they occur on.
+
+    :param rule: A supported recurrence rule
+    :type rule: RecurrenceRule
+    :param dtstart: The event's start time in the entry's timezone
+    :type dtstart: datetime
+    :return: A hashable description of the rule's shape
+    :rtype: tuple
+    """
+    weekdays = sorted({WEEKDAY_NUMBERS[day] for day in rule.byweekday or ()})
+    if rule.frequency == DAILY:
+        return DAILY, rule.interval, tuple(weekdays)
+    if rule.frequency == WEEKLY:
+        wkst = rule.wkst if rule.wkst is not None else 0
+        if not weekdays:
+            weekdays = [dtstart.weekday()]
+        return (
+            WEEKLY,
+            rule.interval,
+            wkst,
+            tuple(sorted((day - wkst) % 7 for day in weekdays)),
+        )
+    return MONTHLY, rule.interval, tuple(sorted(set(rule.bymonthday or [dtstart.day])))
+
+
+def _expand_group(
+    shape: tuple, members: list[tuple[int, Event, ZoneInfo]], window: tuple[int, int]
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Expands events whose rules have the same shape (see :func:`_shape`) with one set
+    of array operations.
+
+    Each event's periods (days, weeks or months) are generated in local wall time
+    from its start, or only over the window (plus a margin for UTC offsets) if it
+    has no COUNT, then its days are picked from each period. The days are counted
+    and converted to UTC per event, and filtered by UNTIL and the exclusions.
+
+    :param shape: The shape of the rules
+    :type shape: tuple
+    :param members: ``(owner, event, tz)`` tuples of events with rules of that shape
+    :type members: list[tuple[int, Event, ZoneInfo]]
+    :param window: The inclusive window as UTC seconds since the epoch
+    :type window: tuple[int, int]
+    :return: int64 arrays of the owner and UTC seconds since the epoch of each occurrence
+    :rtype: tuple[np.ndarray, np.ndarray]
+    """
+    frequency, interval = shape[:2]
+
+    timezones: dict[str, int] = {}
+    owner_list, tz_list, start_list, day_list, time_list = [], [], [], [], []
+    count_list, until_list, until_day_list = [], [], []
+    exclusion_members, exclusion_starts, exclusion_ends = [], [], []
+    for member, (owner, event, tz) in enumerate(members):
+        rule = event.recurrence_rule
+        dtstart = event.start_time.astimezone(tz)
+        owner_list.append(owner)
+        tz_list.append(timezones.setdefault(tz.key, len(timezones)))
+        start_list.append(_to_utc_seconds(event.start_time))
+        day_list.append(_local_day(dtstart))
+        time_list.append(dtstart.hour * 3600 + dtstart.minute * 60 + dtstart.second)
+        count_list.append(rule.count if rule.count is not None else -1)
+        if rule.until is not None:
+            until_list.append(_to_utc_seconds(rule.until))
+            until_day_list.append(_local_day(rule.until.astimezone(tz)))
+        else:
+            until_list.append(NO_LIMIT)
+            until_day_list.append(NO_LIMIT)
+        for exclusion in event.exclusions.all():
+            exclusion_start, exclusion_end = exclusion.to_interval(tz=tz)
+            exclusion_members.append(member)
+            exclusion_starts.append(_to_utc_seconds(exclusion_start))
+            exclusion_ends.append(_to_utc_seconds(exclusion_end))
+
+    owner = np.array(owner_list, dtype="int64")
+    tz_index = np.array(tz_list, dtype="int64")
+    start_day = np.array(day_list, dtype="int64")
+    count = np.array(count_list, dtype="int64")
+    counted = count >= 0
+
+    first_day = np.maximum(start_day, window[0] // SECONDS_PER_DAY - WINDOW_MARGIN_DAYS)
+    last_day = np.minimum(
+        window[1] // SECONDS_PER_DAY + WINDOW_MARGIN_DAYS,
+        np.array(until_day_list, dtype="int64"),
+    )
+
+    # each member's periods are numbered from its first one, which starts on ``base``
+    if frequency == DAILY:
+        base, period = start_day, interval
+        first_unit, last_unit = first_day, last_day
+        # every 7 periods cycle through the weekdays, so this is always enough
+        counted_periods = count * (7 if shape[2] else 1) + 7
+    elif frequency == WEEKLY:
+        wkst, offsets = shape[2], np.array(shape[3], dtype="int64")
+        base = start_day - (start_day + EPOCH_WEEKDAY - wkst) % 7
+        period = 7 * interval
+        first_unit, last_unit = first_day, last_day
+        counted_periods = count // len(offsets) + 2
+    else:
+        monthdays = np.array(shape[2], dtype="int64")
+        base = _month_of(start_day)
+        period = interval
+        first_unit, last_unit = _month_of(first_day), _month_of(last_day)
+        # some months don't have every day, so over-generate before counting
+        counted_periods = (count + 12) * 12 // len(monthdays) + 1
+
+    first = np.where(counted, 0, np.maximum(0, (first_unit - base) // period))
+    periods = np.where(
+        counted,
+        counted_periods,
+        np.where(last_day < first_day, 0, (last_unit - base) // period + 1 - first),
+    )
+    periods = np.maximum(periods, 0)
+
+    # one row per period of every member
+    member = np.repeat(np.arange(len(members), dtype="int64"), periods)
+    index = np.arange(member.size, dtype="int64") - np.repeat(
+        np.cumsum(periods) - periods, periods
+    )
+    units = base[member] + period * (first[member] + index)
+
+    if frequency == DAILY:
+        days = units
+        if shape[2]:
+            on_weekday = np.isin((days + EPOCH_WEEKDAY) % 7, shape[2])
+            member, days = member[on_weekday], days[on_weekday]
+    elif frequency == WEEKLY:
+        days = (units[:, None] + offsets[None, :]).ravel()
+        member = np.repeat(member, offsets.size)
+    else:
+        month_starts = units.astype("datetime64[M]").astype("datetime64[D]")
+        month_starts = month_starts.astype("int64")
+        month_lengths = (units + 1).astype("datetime64[M]").astype("datetime64[D]")
+        month_lengths = month_lengths.astype("int64") - month_starts
+        day_of_month = np.where(
+            monthdays[None, :] > 0,
+            monthdays[None, :],
+            month_lengths[:, None] + monthdays[None, :] + 1,
+        )
+        # days that don't exist in a month (e.g. the 31st of April) are skipped
+        valid = (day_of_month >= 1) & (day_of_month <= month_lengths[:, None])
+        days = (month_starts[:, None] + day_of_month - 1)[valid]
+        member = np.broadcast_to(member[:, None], valid.shape)[valid]
+
+    after_start = days >= start_day[member]
+    # sorts each member's days and drops duplicates (e.g. the 31st and the last day
+    # of the month can coincide)
+    keys = np.unique(_keys(member[after_start], days[after_start]))
+    member, days = keys >> KEY_BITS, (keys & KEY_MASK) - KEY_OFFSET
+
+    if counted.any():
+        rank = np.arange(member.size) - np.searchsorted(member, member)
+        within_count = ~counted[member] | (rank < count[member])
+        member, days = member[within_count], days[within_count]
+
+    local = days * SECONDS_PER_DAY + np.array(time_list, dtype="int64")[member]
+    occurrences = np.empty_like(local)
+    for tz_key, i in timezones.items():
+        in_tz = tz_index[member] == i
+        occurrences[in_tz] = _local_to_utc(local[in_tz], ZoneInfo(tz_key))
+
+    before_until = occurrences <= np.array(until_list, dtype="int64")[member]
+    # the event's start is always an occurrence, even if the rule doesn't match it
+    member = np.concatenate(
+        [member[before_until], np.arange(len(members), dtype="int64")]
+    )
+    occurrences = np.concatenate(
+        [occurrences[before_until], np.array(start_list, dtype="int64")]
+    )
+
+    if exclusion_members:
+        exclusion_members_array = np.array(exclusion_members, dtype="int64")
+        excluded = _excluded_mask(
+            occurrences=_keys(member, occurrences),
+            starts=_keys(exclusion_members_array, np.array(exclusion_starts)),
+            ends=_keys(exclusion_members_array, np.array(exclusion_ends)),
+        )
+        member, occurrences = member[~excluded], occurrences[~excluded]
+
+    return owner[member], occurrences
+
+
+def _excluded_mask(
+    occurrences: np.ndarray, starts: np.ndarray, ends: np.ndarray
+) -> np.ndarray:
+    """
+    Returns a mask of occurrences falling inside any half-open exclusion interval.
+
+    Occurrences and intervals are given as keys (see :func:`_keys`), so each
+    occurrence is only checked against its own event's exclusions.
+
+    :param occurrences: The occurrence keys
+    :type occurrences: np.ndarray
+    :param starts: The keys of the starts of the exclusion intervals
+    :type starts: np.ndarray
+    :param ends: The keys of the ends of the exclusion intervals
+    :type ends: np.ndarray
+    :return: A boolean array
+    :rtype: np.ndarray
+    """
+    order = np.argsort(starts)
+    starts = starts[order]
+    # merging isn't needed if each interval covers every later one that starts
+    # before it ends
+    ends = np.maximum.accumulate(ends[order])
+
+    i = np.searchsorted(starts, occurrences, side="right") - 1
+    return (i >= 0) & (occurrences < ends[np.maximum(i, 0)])
+
+
+def _keys(index: np.ndarray, values: np.ndarray) -> np.ndarray:
+    """
+    Combines an index (e.g. of an event) and a value (e.g. a time) into one int64
+    key, so that sorting the keys sorts by index and then value.
+
+    :param index: Non-negative indexes, less than 2**24
+    :type index: np.ndarray
+    :param values: Values between -2**38 and 2**38, e.g. seconds since the epoch in years 1 to 9999
+    :type values: np.ndarray
+    :return: The keys
+    :rtype: np.ndarray
+    """
+    return (index << KEY_BITS) + (values + KEY_OFFSET)
+
+
+def _local_to_utc(local: np.ndarray, tz: ZoneInfo) -> np.ndarray:
+    """
+    Converts local wall times to UTC using a table of the timezone's transitions.
+
+    Like dateutil (and ``fold=0``), ambiguous times use the offset before the
+    transition, as do times skipped by a transition.
+
+    :param local: An int64 array of local wall times as seconds since the epoch
+    :type local: np.ndarray
+    :param tz: The timezone
+    :type tz: ZoneInfo
+    :return: An int64 array of UTC seconds since the epoch
+    :rtype: np.ndarray
+    """
+    if local.size == 0:
+        return local
+
+    first_year = _year_of(int(local.min()) - SECONDS_PER_DAY)
+    last_year = _year_of(int(local.max()) + SECONDS_PER_DAY)
+
+    # each boundary is the first local wall time to use the offset after a
+    # transition, i.e. the transition instant plus the larger of the offsets
+    boundaries = []
+    offsets = [year_transitions(tz.key, first_year)[0]]
+    for year in range(first_year, last_year + 1):
+        for transition, offset in year_transitions(tz.key, year)[1]:
+            boundaries.append(transition + max(offsets[-1], offset))
+            offsets.append(offset)
+
+    offsets_array = np.array(offsets, dtype="int64")
+    boundaries_array = np.array(boundaries, dtype="int64")
+    return local - offsets_array[np.searchsorted(boundaries_array, local, side="right")]
+
+
+def _local_day(dt: datetime) -> int:
+    """
+    Returns the day (since the epoch) of an aware datetime's local wall time.
+    """
+    return (dt.replace(tzinfo=None) - datetime(1970, 1, 1)).days
+
+
+def _month_of(days: np.ndarray) -> np.ndarray:
+    """
+    Returns the months (since January 1970) containing days (since the epoch).
+    """
+    return days.astype("datetime64[D]").astype("datetime64[M]").astype("int64")
+
+
+def _year_of(seconds: int) -> int:
+    """
+    Returns the year containing a number of seconds since the epoch.
+    """
+    return (
+        int(np.datetime64(seconds, "s").astype("datetime64[Y]").astype("int64")) + 1970
+    )
+
+
+def _to_utc_seconds(dt: datetime) -> int:
+    """
+    Converts an aware datetime to whole seconds since the epoch.
+    """
+    return int(dt.timestamp() // 1)
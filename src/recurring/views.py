@@ -0,0 +1,349 @@
+"""
+A JSON API of the occurrences of many calendar entries in a date window, for
+calendar front-ends.
+
+:class:`OccurrencesView` (routed by :mod:`recurring.urls`) answers
+``GET ?start=...&end=...`` with every occurrence starting in the half-open window
+``[start, end)``, in time order::
+
+    {
+        "occurrences": [
+            {
+                "entry": 1,
+                "event": 3,
+                "title": "Weekly Team Meeting",
+                "start": "2024-01-01T09:00:00+00:00",
+                "end": "2024-01-01T10:00:00+00:00",
+                "full_day": false
+            }
+        ],
+        "next": "eyJzdGFydCI6..."
+    }
+
+Times are in each entry's timezone and each occurrence lasts as long as its event.
+At most ``RECURRING_OCCURRENCES_LIMIT`` occurrences (1000 by default, or fewer with
+``?limit=``) are returned per request. If there are more, ``next`` is a cursor to
+pass back as ``?cursor=`` (with the same window) for the next page, and null
+otherwise. Windows longer than ``RECURRING_OCCURRENCES_MAX_DAYS`` (366) are
+rejected. ``?entry=`` limits the results to some entries, and may be repeated or
+comma separated.
+
+Only users with the ``recurring.view_calendarentry`` permission can list
+occurrences; others get a 403.
+
+Responses have an ``ETag`` derived from the ``schedule_version`` and ``updated_at``
+of the entries that may occur in the window and their number, so conditional
+requests are answered with a 304 before anything is expanded.
+"""
+
+from __future__ import annotations
+
+import base64
+import binascii
+import hashlib
+import heapq
+import json
+from collections.abc import Iterator
+from datetime import datetime, timedelta
+from typing import Any
+
+from django.conf import settings
+from django.contrib.auth.mixins import PermissionRequiredMixin
+from django.db.models import Count, Max, QuerySet, Sum
+from django.http import HttpRequest, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.utils import timezone as django_timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.dateparse import parse_datetime
+from django.views import View
+
+from .models import CalendarEntry
+
+DEFAULT_LIMIT = 1000
+DEFAULT_MAX_DAYS = 366
+DEFAULT_BATCH_SIZE = 500
+
+#: An occurrence's sort key, start time and entry and event primary keys, followed by
+#: its end time, title and whether it's a full day event
+OccurrenceTuple = tuple[datetime, int, int, datetime, str, bool]
+
+
+class BadRequest(ValueError):
+    """
+    Raised for invalid query parameters.
+    """
+
+
+def expand_occurrences(
+    queryset: QuerySet,
+    start: datetime,
+    end: datetime,
+    limit: int,
+    after: tuple[datetime, int, int] | None = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> list[OccurrenceTuple]:
+    """
+    Returns the first ``limit`` occurrences of the calendar entries in a queryset
+    starting in the window ``[start, end)``, ordered by start time and then entry and
+    event primary key.
+
+    Candidates are pruned in SQL with ``candidates_between()`` and loaded in batches
+    with ``with_schedule()``. Only the ``limit`` earliest occurrences are kept in
+    memory, however many there are in the window.
+
+    :param queryset: The calendar entries
+    :type queryset: QuerySet
+    :param start: The start of the window. Must be timezone aware.
+    :type start: datetime
+    :param end: The end of the window. Must be timezone aware.
+    :type end: datetime
+    :param limit: The most occurrences to return
+    :type limit: int
+    :param after: Only return occurrences whose ``(start, entry, event)`` sort key is after this one
+    :type after: tuple[datetime, int, int] | None
+    :param batch_size: How many calendar entries to load at a time
+    :type batch_size: int
+    :return: ``(start, entry, event, end, title, full_day)`` tuples
+    :rtype: list[OccurrenceTuple]
+    """
+    if after is not None:
+        start = max(start, after[0])
+
+    def occurrences() -> Iterator[OccurrenceTuple]:
+        entries = queryset.candidates_between(start, end).with_schedule()
+        for entry in entries.iterator(chunk_size=batch_size):
+            tz = entry.timezone.as_tz
+            for event in entry.events.all():
+                duration = event.duration
+                found = 0
+                # lazily, so a frequent rule stops at the limit rather than
+                # expanding the whole window
+                for dt in event.to_rruleset(tz=tz).xafter(start, inc=True):
+                    if dt >= end or found >= limit:
+                        break
+                    dt = dt.astimezone(tz)
+                    if after is not None and (dt, entry.pk, event.pk) <= after:
+                        continue
+                    found += 1
+                    yield (
+                        dt,
+                        entry.pk,
+                        event.pk,
+                        dt + duration,
+                        entry.name,
+                        event.is_full_day,
+                    )
+
+    return heapq.nsmallest(limit, occurrences(), key=lambda occurrence: occurrence[:3])
+
+
+def encode_cursor(occurrence: OccurrenceTuple) -> str:
+    """
+    Returns a cursor for the page of occurrences after an occurrence.
+
+    :param occurrence: The last occurrence of a page
+    :type occurrence: OccurrenceTuple
+    :return: An opaque, URL-safe cursor
+    :rtype: str
+    """
+    start, entry, event = occurrence[:3]
+    data = json.dumps([start.isoformat(), entry, event], separators=(",", ":"))
+    return base64.urlsafe_b64encode(data.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int, int]:
+    """
+    Returns the sort key encoded by :func:`encode_cursor`.
+
+    :param cursor: The cursor
+    :type cursor: str
+    :return: The ``(start, entry, event)`` sort key of the last occurrence of the previous page
+    :rtype: tuple[datetime, int, int]
+    :raises BadRequest: If the cursor is invalid
+    """
+    try:
+        start, entry, event = json.loads(base64.urlsafe_b64decode(cursor))
+        start = datetime.fromisoformat(start)
+    except (binascii.Error, TypeError, ValueError) as e:
+        raise BadRequest("Invalid cursor.") from e
+    if django_timezone.is_naive(start) or not (
+        isinstance(entry, int) and isinstance(event, int)
+    ):
+        raise BadRequest("Invalid cursor.")
+    return start, entry, event
+
+
+class OccurrencesView(PermissionRequiredMixin, View):
+    """
+    Returns the occurrences of calendar entries in a date window as JSON. See
+    :mod:`recurring.views`.
+
+    Requires the ``recurring.view_calendarentry`` permission. Override
+    :attr:`permission_required` or :meth:`has_permission` to change this, and
+    :meth:`get_queryset` to restrict which calendar entries can be seen.
+    """
+
+    permission_required = "recurring.view_calendarentry"
+    raise_exception = True
+
+    def get_queryset(self) -> QuerySet:
+        """
+        Returns the calendar entries whose occurrences can be listed.
+
+        :return: The calendar entries
+        :rtype: QuerySet
+        """
+        return CalendarEntry.objects.all()
+
+    def get(self, request: HttpRequest) -> HttpResponse:
+        try:
+            start, end, entries, limit, after = self.parse_params(request)
+        except BadRequest as e:
+            return JsonResponse({"error": str(e)}, status=400)
+
+        queryset = self.get_queryset()
+        if entries:
+            queryset = queryset.filter(pk__in=entries)
+
+        # every change to a schedule bumps its entry's schedule_version and
+        # updated_at, and creating or deleting an entry changes the count
+        window_start = max(start, after[0]) if after else start
+        state = queryset.candidates_between(window_start, end).aggregate(
+            count=Count("pk"),
+            version=Max("schedule_version"),
+            versions=Sum("schedule_version"),
+            updated_at=Max("updated_at"),
+        )
+        updated_at = state["updated_at"]
+        key = (
+            f"{request.GET.urlencode()}:{state['count']}:{state['version']}:"
+            f"{state['versions']}:{updated_at.isoformat() if updated_at else ''}"
+        )
+        etag = f'"{hashlib.sha1(key.encode("utf-8")).hexdigest()}"'
+
+        # no Last-Modified, as the latest updated_at doesn't change when an entry
+        # is deleted or leaves the window
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            occurrences = expand_occurrences(
+                queryset, start, end, limit + 1, after=after
+            )
+            next_cursor = None
+            if len(occurrences) > limit:
+                occurrences = occurrences[:limit]
+                next_cursor = encode_cursor(occurrences[-1])
+            response = StreamingHttpResponse(
+                self.stream(occurrences, next_cursor),
+                content_type="application/json",
+            )
+
+        response["ETag"] = etag
+        patch_cache_control(
+            response,
+            private=True,
+            max_age=getattr(settings, "RECURRING_OCCURRENCES_MAX_AGE", 0),
+        )
+        return response
+
+    def parse_params(
+        self, request: HttpRequest
+    ) -> tuple[datetime, datetime, list[int], int, tuple[datetime, int, int] | None]:
+        """
+        Parses and validates the query parameters.
+
+        :param request: The request
+        :type request: HttpRequest
+        :return: The start and end of the window, the entry primary keys to filter by, the page size and the cursor's sort key
+        :rtype: tuple
+        :raises BadRequest: If a parameter is missing or invalid
+        """
+        start = self.parse_datetime(request.GET.get("start"), "start")
+        end = self.parse_datetime(request.GET.get("end"), "end")
+        if start >= end:
+            raise BadRequest("start must be before end.")
+        max_days = getattr(settings, "RECURRING_OCCURRENCES_MAX_DAYS", DEFAULT_MAX_DAYS)
+        if end - start > timedelta(days=max_days):
+            raise BadRequest(f"The window can't be longer than {max_days} days.")
+
+        try:
+            entries = [
+                int(pk)
+                for value in request.GET.getlist("entry")
+                for pk in value.split(",")
+                if pk
+            ]
+        except ValueError as e:
+            raise BadRequest("entry must be a list of IDs.") from e
+
+        max_limit = getattr(settings, "RECURRING_OCCURRENCES_LIMIT", DEFAULT_LIMIT)
+        try:
+            limit = int(request.GET.get("limit", max_limit))
+        except ValueError as e:
+            raise BadRequest("limit must be a number.") from e
+        if not 1 <= limit <= max_limit:
+            raise BadRequest(f"limit must be between 1 and {max_limit}.")
+
+        cursor = request.GET.get("cursor")
+        after = decode_cursor(cursor) if cursor else None
+
+        return start, end, entries, limit, after
+
+    def parse_datetime(self, value: str | None, name: str) -> datetime:
+        """
+        Parses an ISO 8601 datetime. Naive datetimes are in the current timezone.
+
+        :param value: The value of the query parameter
+        :type value: str | None
+        :param name: The name of the query parameter
+        :type name: str
+        :return: The timezone aware datetime
+        :rtype: datetime
+        :raises BadRequest: If the value is missing or invalid
+        """
+        if not value:
+            raise BadRequest(f"{name} is required.")
+        try:
+            dt = parse_datetime(value)
+        except ValueError:
+            dt = None
+        if dt is None:
+            raise BadRequest(f"{name} must be an ISO 8601 datetime.")
+        if django_timezone.is_naive(dt):
+            dt = django_timezone.make_aware(dt)
+        return dt
+
+    def stream(
+        self, occurrences: list[OccurrenceTuple], next_cursor: str | None
+    ) -> Iterator[str]:
+        """
+        Yields the JSON response body an occurrence at a time.
+
+        :param occurrences: The page of occurrences
+        :type occurrences: list[OccurrenceTuple]
+        :param next_cursor: The cursor for the next page, if there is one
+        :type next_cursor: str | None
+        :return: An iterator of JSON fragments
+        :rtype: Iterator[str]
+        """
+        yield '{"occurrences":['
+        for i, occurrence in enumerate(occurrences):
+            yield ("," if i else "") + json.dumps(self.serialise(occurrence))
+        yield f'],"next":{json.dumps(next_cursor)}}}'
+
+    def serialise(self, occurrence: OccurrenceTuple) -> dict[str, Any]:
+        """
+        Returns the JSON representation of an occurrence.
+
+        :param occurrence: The occurrence
+        :type occurrence: OccurrenceTuple
+        :return: A JSON serialisable dictionary
+        :rtype: dict[str, Any]
+        """
+        start, entry, event, end, title, full_day = occurrence
+        return {
+            "entry": entry,
+            "event": event,
+            "title": title,
+            "start": start.isoformat(),
+            "end": end.isoformat(),
+            "full_day": full_day,
+        }
@@ -1,11 +1,17 @@
-import json
 import logging
 
 from django import forms
+from django.urls import NoReverseMatch, reverse
 from django.utils.safestring import mark_safe
 
 logger = logging.getLogger(__name__)
 
+#: Schedules with more events and exclusions than this are loaded by the widget in
+#: pages instead of being inlined in the page
+DEFAULT_INLINE_LIMIT = 200
+#: How many events the widget loads per request
+DEFAULT_PAGE_SIZE = 100
+
 
 class CalendarEntryWidget(forms.Widget):
     template_name = "admin/recurring/calendar_entry_widget.html"
@@ -20,23 +26,37 @@ class CalendarEntryWidget(forms.Widget):
     def __init__(self, attrs=None, form=None):
         super().__init__(attrs)
         self.form = form
-        if self.form and self.form.instance and self.form.instance.pk:
-            calendar_entry = self.form.instance
-            calendar_entry_data = calendar_entry.to_dict()
-            calendar_entry_data["id"] = calendar_entry.pk
-            self.initial = json.dumps(calendar_entry_data)
+        # set by the form for schedules too large to inline
+        self.schedule_url = None
 
     def render(self, name, value, attrs=None, renderer=None):
         if attrs is None:
             attrs = {}
         final_attrs = self.build_attrs(self.attrs, attrs)
         context = self.get_context(name, value, final_attrs)
-        if value is None:
-            value = ""
-        context["widget"]["value"] = self.initial if hasattr(self, "initial") else value
+        context["widget"]["value"] = "" if value is None else value
 
-        if hasattr(self, "initial"):
-            context["widget"]["attrs"]["data-initial"] = self.initial
-            logger.info(f"Set initial data to {self.initial}")
+        context["widget"]["preview_url"] = self.get_preview_url()
+        context["widget"]["schedule_url"] = self.schedule_url
 
         return mark_safe(renderer.render(self.template_name, context))
+
+    def get_preview_url(self):
+        """
+        Returns the URL of the admin's occurrence preview endpoint, or None if the
+        CalendarEntry admin isn't registered, in which case there's no preview.
+        """
+        try:
+            return reverse("admin:recurring_calendarentry_preview_occurrences")
+        except NoReverseMatch:
+            return None
+
+    def get_schedule_url(self, object_id):
+        """
+        Returns the URL of the admin endpoint that pages through a calendar entry's
+        events, or None if the CalendarEntry admin isn't registered.
+        """
+        try:
+            return reverse("admin:recurring_calendarentry_schedule", args=[object_id])
+        except NoReverseMatch:
+            return None
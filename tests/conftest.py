@@ -0,0 +1,14 @@
+import pytest
+from django.core.cache import cache
+
+from recurring.cache import ruleset_cache
+
+
+@pytest.fixture(autouse=True)
+def clear_ruleset_cache():
+    # primary keys are reused between tests as each test's transaction is rolled back
+    ruleset_cache.clear()
+    cache.clear()
+    yield
+    ruleset_cache.clear()
+    cache.clear()
@@ -0,0 +1,163 @@
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from django.contrib import admin
+from django.contrib.admin.sites import AdminSite
+from django.contrib.admin.utils import lookup_field
+from django.core.exceptions import PermissionDenied
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from recurring.admin import CalendarEntryAdmin
+from recurring.forms import CalendarEntryForm
+from recurring.models import (
+    CalendarEntry,
+    Event,
+    ExclusionDateRange,
+    RecurrenceRule,
+    Timezone,
+)
+
+
+@pytest.mark.django_db
+class TestCalendarEntryAdmin:
+    @pytest.fixture
+    def create_entries(self):
+        london, _ = Timezone.objects.get_or_create(name="Europe/London")
+
+        def create_entries(count):
+            for i in range(count):
+                entry = CalendarEntry.objects.create(name=f"Entry {i}", timezone=london)
+                Event.objects.create(
+                    calendar_entry=entry,
+                    start_time=datetime(2024, 1, 1, 9, tzinfo=timezone.utc),
+                    end_time=datetime(2024, 1, 1, 10, tzinfo=timezone.utc),
+                    recurrence_rule=RecurrenceRule.objects.create(
+                        frequency=RecurrenceRule.Frequency.WEEKLY, byweekday=["MO"]
+                    ),
+                )
+            CalendarEntry.objects.recalculate_occurrences()
+
+        return create_entries
+
+    def changelist_queries(self, request):
+        modeladmin = CalendarEntryAdmin(CalendarEntry, admin.site)
+        with CaptureQueriesContext(connection) as queries:
+            changelist = modeladmin.get_changelist_instance(request)
+            rows = [
+                [str(entry)]
+                + [
+                    lookup_field(name, entry, modeladmin)[2]
+                    for name in modeladmin.list_display
+                ]
+                for entry in changelist.result_list
+            ]
+        return len(queries), rows
+
+    def test_changelist_queries_are_constant(self, create_entries, rf, admin_user):
+        request = rf.get("/")
+        request.user = admin_user
+
+        create_entries(2)
+        few, _ = self.changelist_queries(request)
+        create_entries(20)
+        many, rows = self.changelist_queries(request)
+
+        assert few == many
+        assert len(rows) == 22
+        assert rows[0][0].endswith(": Every Mon at 09:00-10:00 (Europe/London)")
+        assert rows[0][2] == "Every Mon at 09:00-10:00 (Europe/London)"
+        assert rows[0][3] == "Europe/London"
+
+
+@pytest.mark.django_db
+class TestLazySchedule:
+    @pytest.fixture
+    def entry(self):
+        london, _ = Timezone.objects.get_or_create(name="Europe/London")
+        entry = CalendarEntry.objects.create(name="Large", timezone=london)
+        for day in range(5):
+            start_time = datetime(2024, 1, 1 + day, 9, tzinfo=timezone.utc)
+            event = Event.objects.create(
+                calendar_entry=entry,
+                start_time=start_time,
+                end_time=start_time + timedelta(hours=1),
+                recurrence_rule=RecurrenceRule.objects.create(
+                    frequency=RecurrenceRule.Frequency.WEEKLY
+                ),
+            )
+            ExclusionDateRange.objects.create(
+                event=event,
+                start_date=start_time + timedelta(weeks=1),
+                end_date=start_time + timedelta(weeks=2),
+            )
+        return entry
+
+    @pytest.fixture
+    def schedule(self, rf, admin_user):
+        modeladmin = CalendarEntryAdmin(CalendarEntry, AdminSite())
+
+        def schedule(entry, user=admin_user, **params):
+            request = rf.get(f"/{entry.pk}/schedule/", params)
+            request.user = user
+            return modeladmin.schedule(request, str(entry.pk))
+
+        return schedule
+
+    def test_small_schedules_are_inlined(self, entry, django_assert_max_num_queries):
+        with django_assert_max_num_queries(5):
+            form = CalendarEntryForm(instance=entry)
+
+        assert json.loads(form.initial["calendar_entry"]) == entry.to_dict()
+        html = form["calendar_entry"].as_widget()
+        assert "data-schedule-url" not in html
+
+    def test_large_schedules_are_loaded_in_pages(
+        self, entry, settings, django_assert_num_queries
+    ):
+        settings.RECURRING_WIDGET_INLINE_LIMIT = 9
+
+        with django_assert_num_queries(1):
+            form = CalendarEntryForm(instance=entry)
+            html = form["calendar_entry"].as_widget()
+
+        assert "calendar_entry" not in form.initial
+        assert (
+            f'data-schedule-url="/admin/recurring/calendarentry/{entry.pk}/schedule/"'
+            in html
+        )
+        assert 'value=""' in html
+
+    def test_pages(self, entry, schedule, settings, django_assert_num_queries):
+        settings.RECURRING_WIDGET_PAGE_SIZE = 2
+
+        events = []
+        params = {}
+        while True:
+            # the entry and its timezone, and the events with their rules and
+            # exclusions
+            with django_assert_num_queries(4):
+                response = schedule(entry, **params)
+            assert response.status_code == 200
+            data = json.loads(response.content)
+            assert data["timezone"] == "Europe/London"
+            assert len(data["events"]) <= 2
+            events.extend(data["events"])
+            if data["next"] is None:
+                break
+            params = {"after": data["next"].split("after=")[1]}
+
+        assert events == json.loads(json.dumps(entry.to_dict()["events"]))
+
+    def test_not_found_and_bad_request(self, entry, schedule):
+        response = schedule(entry, after="one")
+        assert response.status_code == 400
+
+        entry.pk += 1000
+        assert schedule(entry).status_code == 404
+
+    def test_permission(self, entry, schedule, django_user_model):
+        user = django_user_model.objects.create_user("staff", is_staff=True)
+        with pytest.raises(PermissionDenied):
+            schedule(entry, user=user)
@@ -0,0 +1,159 @@
+import asyncio
+import threading
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from asgiref.sync import async_to_sync
+
+from recurring import executor
+from recurring.cache import ruleset_cache
+from recurring.models import (
+    CalendarEntry,
+    Event,
+    ExclusionDateRange,
+    RecurrenceRule,
+    Timezone,
+)
+
+
+def without_stamps(ical):
+    # UIDs and DTSTAMPs differ between renders
+    return [
+        line for line in ical.splitlines() if not line.startswith(("UID:", "DTSTAMP:"))
+    ]
+
+
+class TestExecutor:
+    @pytest.fixture(autouse=True)
+    def shutdown(self):
+        yield
+        executor.shutdown_executor()
+
+    def test_runs_in_pool(self):
+        thread = async_to_sync(executor.run_in_executor)(
+            lambda: threading.current_thread().name
+        )
+        assert thread.startswith("recurring")
+
+    def test_bounded_by_setting(self, settings):
+        settings.RECURRING_ASYNC_WORKERS = 2
+        running = peak = 0
+        lock = threading.Lock()
+
+        def work():
+            nonlocal running, peak
+            with lock:
+                running += 1
+                peak = max(peak, running)
+            threading.Event().wait(0.01)
+            with lock:
+                running -= 1
+
+        async def main():
+            await asyncio.gather(*(executor.run_in_executor(work) for _ in range(8)))
+
+        async_to_sync(main)()
+
+        assert executor.get_executor()._max_workers == 2
+        assert peak <= 2
+
+
+@pytest.mark.django_db
+class TestAsyncCalendarEntry:
+    @pytest.fixture
+    def calendar_entry(self):
+        london, _ = Timezone.objects.get_or_create(name="Europe/London")
+        entry = CalendarEntry.objects.create(name="Async", timezone=london)
+        start_time = datetime(2024, 1, 1, 9, tzinfo=timezone.utc)
+        event = Event.objects.create(
+            calendar_entry=entry,
+            start_time=start_time,
+            end_time=start_time + timedelta(hours=1),
+            recurrence_rule=RecurrenceRule.objects.create(
+                frequency=RecurrenceRule.Frequency.WEEKLY,
+                byweekday=["MO", "TH"],
+                count=20,
+            ),
+        )
+        ExclusionDateRange.objects.create(
+            event=event,
+            start_date=datetime(2024, 1, 15, tzinfo=timezone.utc),
+            end_date=datetime(2024, 1, 20, tzinfo=timezone.utc),
+        )
+        return CalendarEntry.objects.get(pk=entry.pk)
+
+    def test_ato_rruleset(self, calendar_entry, django_assert_num_queries):
+        # the timezone, events (with their rules) and exclusions
+        with django_assert_num_queries(3):
+            rset = async_to_sync(calendar_entry.ato_rruleset)()
+
+        expected = list(
+            CalendarEntry.objects.with_schedule()
+            .get(pk=calendar_entry.pk)
+            ._build_rruleset()
+        )
+        assert list(rset) == expected
+
+    def test_ato_rruleset_cached(self, calendar_entry, django_assert_num_queries):
+        rset = async_to_sync(calendar_entry.ato_rruleset)()
+
+        with django_assert_num_queries(0):
+            assert async_to_sync(calendar_entry.ato_rruleset)() is rset
+        assert ruleset_cache.stats()["hits"] == 1
+
+    def test_acalculate_occurrences(self, calendar_entry):
+        now = datetime(2024, 2, 1, tzinfo=timezone.utc)
+        expected = CalendarEntry.objects.with_schedule().get(pk=calendar_entry.pk)
+        expected.calculate_occurrences(commit=False, now=now)
+
+        async_to_sync(calendar_entry.acalculate_occurrences)(now=now)
+
+        calendar_entry.refresh_from_db()
+        for field in CalendarEntry.CALCULATED_FIELDS:
+            assert getattr(calendar_entry, field) == getattr(expected, field)
+        assert calendar_entry.next_occurrence == datetime(
+            2024, 2, 1, 9, tzinfo=timezone.utc
+        )
+        assert not calendar_entry.occurrences_stale
+
+    def test_acalculate_occurrences_without_commit(self, calendar_entry):
+        async_to_sync(calendar_entry.acalculate_occurrences)(commit=False)
+
+        assert calendar_entry.first_occurrence == datetime(
+            2024, 1, 1, 9, tzinfo=timezone.utc
+        )
+        calendar_entry.refresh_from_db()
+        assert calendar_entry.first_occurrence is None
+
+    def test_acalculate_occurrences_materialises(self, calendar_entry, settings):
+        settings.RECURRING_MATERIALISE_OCCURRENCES = True
+        settings.RECURRING_OCCURRENCE_HORIZON_DAYS = 20 * 365
+
+        async_to_sync(calendar_entry.acalculate_occurrences)()
+
+        assert calendar_entry.occurrences.count() > 0
+
+    def test_ato_ical(self, calendar_entry):
+        ical = async_to_sync(calendar_entry.ato_ical)("-//Test//EN")
+
+        expected = CalendarEntry.objects.get(pk=calendar_entry.pk).to_ical(
+            "-//Test//EN"
+        )
+        assert without_stamps(ical) == without_stamps(expected)
+        assert "EXDATE" in ical
+
+    def test_concurrent(self, calendar_entry):
+        async def main():
+            return await asyncio.gather(
+                *(
+                    CalendarEntry(
+                        pk=calendar_entry.pk,
+                        timezone_id=calendar_entry.timezone_id,
+                    ).ato_ical()
+                    for _ in range(5)
+                )
+            )
+
+        icals = async_to_sync(main)()
+
+        assert len({tuple(without_stamps(ical)) for ical in icals}) == 1
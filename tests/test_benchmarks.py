@@ -0,0 +1,57 @@
+import pytest
+
+from benchmarks import schedules
+from benchmarks.runner import compare
+from recurring.models import CalendarEntry, Timezone
+
+
+@pytest.mark.django_db
+class TestSchedules:
+    def test_generated_schedules_are_valid(self):
+        for name in ("Europe/London", "America/New_York"):
+            Timezone.objects.get_or_create(name=name)
+
+        entries = CalendarEntry.objects.bulk_create_from_dicts(
+            schedules.generate(sum(weight for _, weight in schedules.SHAPES))
+        )
+
+        assert {entry.name.split()[0] for entry in entries} == {
+            "Weekly",
+            "Team",
+            "Minutely",
+        }
+        for entry in entries:
+            assert entry.next_occurrence is not None
+
+    def test_reproducible(self):
+        assert list(schedules.generate(5, start=3)) == list(schedules.generate(8))[3:]
+
+    def test_localise(self):
+        data = schedules.localise(next(schedules.generate(1)))
+        event = data["events"][0]
+        assert event["start_time"].tzinfo.key == "Europe/London"
+        assert event["exclusions"][0]["start_date"].tzinfo.key == "Europe/London"
+
+
+class TestCompare:
+    def result(self, seconds=1.0, queries=3):
+        return {
+            "benchmark": "to_dict",
+            "size": 1000,
+            "seconds": seconds,
+            "queries": queries,
+        }
+
+    def test_within_tolerance(self):
+        assert compare([self.result(1.1)], [self.result()], tolerance=0.2) == []
+
+    def test_slower(self):
+        regressions = compare([self.result(1.5)], [self.result()], tolerance=0.2)
+        assert regressions == ["to_dict [1000]: 1.0000s -> 1.5000s (1.50x)"]
+
+    def test_more_queries(self):
+        regressions = compare([self.result(queries=4)], [self.result()], tolerance=0.2)
+        assert regressions == ["to_dict [1000]: 3 -> 4 queries"]
+
+    def test_missing_from_baseline(self):
+        assert compare([self.result(5.0)], [], tolerance=0.2) == []
@@ -0,0 +1,133 @@
+import random
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+import pytest
+from dateutil.rrule import (
+    DAILY,
+    HOURLY,
+    MINUTELY,
+    MONTHLY,
+    SECONDLY,
+    WEEKLY,
+    YEARLY,
+    rrule,
+)
+
+from recurring.bounds import last_occurrence
+
+london = ZoneInfo("Europe/London")
+
+#: Roughly how many days a rule of each frequency is generated over
+SPANS = {
+    YEARLY: 3000,
+    MONTHLY: 800,
+    WEEKLY: 400,
+    DAILY: 200,
+    HOURLY: 10,
+    MINUTELY: 0.2,
+    SECONDLY: 0.01,
+}
+
+
+def expected_last(freq, interval, dtstart, byweekday=None, wkst=None, **kwargs):
+    occurrences = list(
+        rrule(
+            freq,
+            interval=interval,
+            dtstart=dtstart,
+            byweekday=byweekday,
+            wkst=wkst,
+            **kwargs,
+        )
+    )
+    return occurrences[-1] if occurrences else None
+
+
+class TestLastOccurrence:
+    @pytest.mark.parametrize(
+        "kwargs, expected",
+        [
+            ({"freq": DAILY, "count": 10}, datetime(2024, 1, 10, 9, tzinfo=london)),
+            (
+                {"freq": WEEKLY, "interval": 2, "count": 3},
+                datetime(2024, 1, 29, 9, tzinfo=london),
+            ),
+            (
+                {"freq": WEEKLY, "byweekday": [1, 3], "count": 4},
+                datetime(2024, 1, 11, 9, tzinfo=london),
+            ),
+            (
+                {"freq": MONTHLY, "until": datetime(2024, 6, 1, tzinfo=london)},
+                datetime(2024, 5, 1, 9, tzinfo=london),
+            ),
+            (
+                # until is inclusive
+                {
+                    "freq": HOURLY,
+                    "interval": 5,
+                    "until": datetime(2024, 1, 2, 0, tzinfo=london),
+                },
+                datetime(2024, 1, 2, 0, tzinfo=london),
+            ),
+        ],
+    )
+    def test_simple_rules(self, kwargs, expected):
+        kwargs = {"interval": 1, **kwargs}
+        dtstart = datetime(2024, 1, 1, 9, tzinfo=london)
+
+        assert last_occurrence(dtstart=dtstart, **kwargs) == expected
+
+    def test_keeps_wall_clock_time_across_dst(self):
+        dtstart = datetime(2024, 3, 1, 9, tzinfo=london)
+
+        last = last_occurrence(DAILY, 1, dtstart, count=60)
+
+        assert last == datetime(2024, 4, 29, 9, tzinfo=london)
+        assert last.utcoffset() == timedelta(hours=1)
+
+    @pytest.mark.parametrize(
+        "kwargs",
+        [
+            # infinite
+            {"freq": DAILY},
+            # both ends
+            {"freq": DAILY, "count": 2, "until": datetime(2025, 1, 1, tzinfo=london)},
+            # ends before it starts
+            {"freq": DAILY, "until": datetime(2023, 1, 1, tzinfo=london)},
+            # skips months without the start's day
+            {"freq": MONTHLY, "count": 2, "start_day": 31},
+            {"freq": DAILY, "interval": 2, "byweekday": [0], "count": 2},
+            {"freq": MONTHLY, "byweekday": [0], "count": 2},
+        ],
+    )
+    def test_unsupported_rules(self, kwargs):
+        kwargs = {"interval": 1, **kwargs}
+        dtstart = datetime(2024, 1, kwargs.pop("start_day", 1), 9, tzinfo=london)
+
+        assert last_occurrence(dtstart=dtstart, **kwargs) is None
+
+    @pytest.mark.parametrize("seed", range(20))
+    def test_matches_dateutil(self, seed):
+        rng = random.Random(seed)
+        for _ in range(100):
+            tz = ZoneInfo(rng.choice(["UTC", "Europe/London", "America/New_York"]))
+            freq = rng.choice(list(SPANS))
+            interval = rng.randint(1, 4)
+            dtstart = datetime(2020, 1, 1, tzinfo=tz) + timedelta(
+                minutes=rng.randrange(3 * 365 * 24 * 60)
+            )
+            kwargs = {}
+            if freq in (WEEKLY, DAILY) and rng.random() < 0.5:
+                kwargs["byweekday"] = rng.sample(range(7), rng.randint(1, 7))
+            if rng.random() < 0.3:
+                kwargs["wkst"] = rng.randrange(7)
+            if rng.random() < 0.5:
+                kwargs["count"] = rng.randint(1, 40)
+            else:
+                kwargs["until"] = dtstart + timedelta(days=rng.uniform(0, SPANS[freq]))
+
+            last = last_occurrence(freq, interval, dtstart, **kwargs)
+
+            if last is not None:
+                assert last == expected_last(freq, interval, dtstart, **kwargs)
@@ -0,0 +1,252 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from django.core.exceptions import ValidationError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from recurring.bulk import merge_schedule
+from recurring.models import (
+    CalendarEntry,
+    ExclusionDateRange,
+    RecurrenceRule,
+    Timezone,
+)
+
+
+def without_ids(data):
+    return [
+        {
+            **event,
+            "id": None,
+            "recurrence_rule": {**event["recurrence_rule"], "id": None},
+            "exclusions": [
+                {**exclusion, "id": None} for exclusion in event["exclusions"]
+            ],
+        }
+        for event in data["events"]
+    ]
+
+
+def schedule(i):
+    start_time = datetime(2024, 1, 1 + i, 9, tzinfo=timezone.utc)
+    return {
+        "name": f"Schedule {i}",
+        "description": "",
+        "timezone": "Europe/London",
+        "events": [
+            {
+                "start_time": (start_time + timedelta(days=day)).isoformat(),
+                "end_time": (start_time + timedelta(days=day, hours=1)).isoformat(),
+                "is_full_day": False,
+                "recurrence_rule": {
+                    "frequency": "WEEKLY",
+                    "interval": 1,
+                    "count": None,
+                    "byweekday": None,
+                },
+                "exclusions": [
+                    {
+                        "start_date": (start_time + timedelta(weeks=1)).isoformat(),
+                        "end_date": (start_time + timedelta(weeks=2)).isoformat(),
+                    }
+                ],
+            }
+            for day in range(5)
+        ],
+    }
+
+
+@pytest.mark.django_db
+class TestBulkCreateFromDicts:
+    @pytest.fixture(autouse=True)
+    def london(self):
+        return Timezone.objects.get_or_create(name="Europe/London")[0]
+
+    def test_creates_schedules(self):
+        entries = CalendarEntry.objects.bulk_create_from_dicts(
+            [schedule(i) for i in range(3)]
+        )
+
+        assert [entry.name for entry in entries] == [
+            "Schedule 0",
+            "Schedule 1",
+            "Schedule 2",
+        ]
+        assert CalendarEntry.objects.count() == 3
+        assert ExclusionDateRange.objects.count() == 15
+        for entry in entries:
+            assert entry.pk is not None
+            assert entry.first_occurrence is not None
+            assert entry.next_occurrence is not None
+            assert entry.is_infinite
+            assert entry.last_occurrence is None
+
+    def test_matches_from_dict(self):
+        expected = CalendarEntry(name="")
+        expected.from_dict(schedule(0))
+        expected = CalendarEntry.objects.get(pk=expected.pk)
+
+        (entry,) = CalendarEntry.objects.bulk_create_from_dicts([schedule(0)])
+        entry = CalendarEntry.objects.get(pk=entry.pk)
+
+        assert without_ids(entry.to_dict()) == without_ids(expected.to_dict())
+        assert entry.to_rruleset()[:50] == expected.to_rruleset()[:50]
+
+    def test_query_count_is_constant(self):
+        with CaptureQueriesContext(connection) as one:
+            CalendarEntry.objects.bulk_create_from_dicts([schedule(0)])
+        with CaptureQueriesContext(connection) as many:
+            CalendarEntry.objects.bulk_create_from_dicts(
+                [schedule(i) for i in range(10)]
+            )
+        assert len(many.captured_queries) == len(one.captured_queries)
+        assert len(one.captured_queries) <= 12
+
+    def test_invalid_schedules_create_nothing(self):
+        invalid_end = schedule(1)
+        invalid_end["events"][0]["end_time"] = invalid_end["events"][0]["start_time"]
+        invalid_timezone = {**schedule(2), "timezone": "Mars/Olympus_Mons"}
+
+        with pytest.raises(ValidationError) as excinfo:
+            CalendarEntry.objects.bulk_create_from_dicts(
+                [schedule(0), invalid_end, invalid_timezone]
+            )
+
+        assert set(excinfo.value.message_dict) == {"1", "2"}
+        assert "Invalid timezone: Mars/Olympus_Mons" in excinfo.value.message_dict["2"]
+        assert not CalendarEntry.objects.exists()
+
+
+@pytest.mark.django_db
+class TestMergeSchedule:
+    @pytest.fixture
+    def entry(self):
+        Timezone.objects.get_or_create(name="Europe/London")
+        (entry,) = CalendarEntry.objects.bulk_create_from_dicts([schedule(0)])
+        return CalendarEntry.objects.get(pk=entry.pk)
+
+    def pks(self, entry):
+        return (
+            list(entry.events.order_by("pk").values_list("pk", flat=True)),
+            list(entry.events.order_by("pk").values_list("recurrence_rule", flat=True)),
+            list(
+                ExclusionDateRange.objects.filter(event__calendar_entry=entry)
+                .order_by("pk")
+                .values_list("pk", flat=True)
+            ),
+        )
+
+    def test_unchanged_writes_nothing(self, entry):
+        pks = self.pks(entry)
+        version = entry.schedule_version
+
+        with CaptureQueriesContext(connection) as queries:
+            assert not merge_schedule(entry, entry.to_dict()["events"])
+
+        assert [
+            query["sql"]
+            for query in queries.captured_queries
+            if not query["sql"].startswith("SELECT")
+        ] == []
+        assert self.pks(entry) == pks
+        assert entry.schedule_version == version
+
+    def test_updates_in_place(self, entry):
+        event_pks, rule_pks, exclusion_pks = self.pks(entry)
+        data = entry.to_dict()
+        data["events"][0]["end_time"] = "2024-01-01T11:00:00+00:00"
+        data["events"][1]["recurrence_rule"]["interval"] = 2
+        # moving an event moves its exclusions' times with it
+        data["events"][2]["start_time"] = "2024-01-03T08:00:00+00:00"
+        occurrences = entry.to_rruleset()[:3]
+
+        with CaptureQueriesContext(connection) as queries:
+            assert merge_schedule(entry, data["events"])
+
+        writes = [
+            query["sql"]
+            for query in queries.captured_queries
+            if not query["sql"].startswith(("SELECT", "SAVEPOINT", "RELEASE"))
+        ]
+        # one bulk update per model, and the entry's schedule version
+        assert len(writes) == 4
+        assert self.pks(entry) == (event_pks, rule_pks, exclusion_pks)
+        events = list(entry.events.order_by("pk"))
+        assert events[0].end_time == datetime(2024, 1, 1, 11, tzinfo=timezone.utc)
+        assert events[1].recurrence_rule.interval == 2
+        assert events[2].exclusions.get().start_date == datetime(
+            2024, 1, 8, 8, tzinfo=timezone.utc
+        )
+        assert entry.to_rruleset()[:3] != occurrences
+
+    def test_adds_and_removes(self, entry):
+        event_pks, rule_pks, exclusion_pks = self.pks(entry)
+        data = entry.to_dict()
+        events = data["events"]
+        # no rule, so its old rule is deleted
+        events[0]["recurrence_rule"] = {}
+        events[1]["exclusions"] = []
+        del events[2]
+        events.append(
+            {
+                "id": "temp_1",
+                "start_time": "2024-02-01T09:00:00+00:00",
+                "end_time": "2024-02-01T10:00:00+00:00",
+                "is_full_day": False,
+                "recurrence_rule": {"frequency": "DAILY", "count": 3},
+                "exclusions": [],
+            }
+        )
+
+        merge_schedule(entry, events)
+
+        new_event_pks, new_rule_pks, new_exclusion_pks = self.pks(entry)
+        assert new_event_pks[:4] == [event_pks[0], event_pks[1], *event_pks[3:]]
+        assert new_event_pks[4] > event_pks[-1]
+        assert new_rule_pks[0] is None
+        assert new_rule_pks[1:4] == [rule_pks[1], *rule_pks[3:]]
+        assert new_exclusion_pks == [exclusion_pks[0], *exclusion_pks[3:]]
+        assert not ExclusionDateRange.objects.filter(pk=exclusion_pks[2]).exists()
+        assert (
+            CalendarEntry.objects.get(pk=entry.pk).to_dict()["events"][4][
+                "recurrence_rule"
+            ]["count"]
+            == 3
+        )
+        assert not RecurrenceRule.objects.filter(
+            pk__in=[rule_pks[0], rule_pks[2]]
+        ).exists()
+
+    def test_matches_exclusions_by_date(self, entry):
+        exclusion_pks = self.pks(entry)[2]
+        data = entry.to_dict()
+        for event in data["events"]:
+            for exclusion in event["exclusions"]:
+                # as sent by the admin widget
+                del exclusion["id"]
+                exclusion["start_date"] = exclusion["start_date"][:10]
+                exclusion["end_date"] = exclusion["end_date"][:10]
+
+        assert not merge_schedule(entry, data["events"])
+        assert self.pks(entry)[2] == exclusion_pks
+
+    def test_invalid_writes_nothing(self, entry):
+        pks = self.pks(entry)
+        data = entry.to_dict()
+        data["events"][0]["end_time"] = data["events"][0]["start_time"]
+        del data["events"][1]
+
+        with pytest.raises(ValidationError):
+            merge_schedule(entry, data["events"])
+
+        assert self.pks(entry) == pks
+
+    def test_ignores_other_entries_ids(self, entry):
+        (other,) = CalendarEntry.objects.bulk_create_from_dicts([schedule(1)])
+        other_pks = self.pks(other)
+
+        merge_schedule(entry, other.to_dict()["events"])
+
+        assert self.pks(other) == other_pks
+        assert not set(self.pks(entry)[0]) & set(other_pks[0])
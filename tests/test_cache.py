@@ -0,0 +1,135 @@
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+
+import pytest
+from django.db import transaction
+
+from recurring.cache import RulesetCache, ruleset_cache
+from recurring.models import (
+    CalendarEntry,
+    Event,
+    ExclusionDateRange,
+    RecurrenceRule,
+    Timezone,
+)
+
+
+class TestRulesetCache:
+    def test_hit_and_miss(self):
+        cache = RulesetCache(maxsize=2)
+        assert cache.get(1, "v1") is None
+        cache.set(1, "v1", "ruleset")
+        assert cache.get(1, "v1") == "ruleset"
+        # a different stamp is a miss
+        assert cache.get(1, "v2") is None
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["misses"] == 2
+
+    def test_lru_eviction(self):
+        cache = RulesetCache(maxsize=2)
+        cache.set(1, "v", "one")
+        cache.set(2, "v", "two")
+        cache.get(1, "v")
+        cache.set(3, "v", "three")
+        assert cache.get(2, "v") is None
+        assert cache.get(1, "v") == "one"
+        assert cache.get(3, "v") == "three"
+        assert cache.stats()["evictions"] == 1
+        assert len(cache) == 2
+
+    def test_invalidate(self):
+        cache = RulesetCache(maxsize=2)
+        cache.set(1, "v", "one")
+        cache.invalidate(1)
+        assert cache.get(1, "v") is None
+        assert cache.stats()["invalidations"] == 1
+
+    def test_size_from_settings(self, settings):
+        settings.RECURRING_RULESET_CACHE_SIZE = 0
+        cache = RulesetCache()
+        cache.set(1, "v", "one")
+        assert cache.get(1, "v") is None
+        assert len(cache) == 0
+
+
+@pytest.mark.django_db
+class TestCalendarEntryRulesetCache:
+    @pytest.fixture
+    def event(self):
+        utc, _ = Timezone.objects.get_or_create(name="UTC")
+        entry = CalendarEntry.objects.create(name="Cached", timezone=utc)
+        start_time = datetime(2023, 1, 1, 9, tzinfo=timezone.utc)
+        rule = RecurrenceRule.objects.create(
+            frequency=RecurrenceRule.Frequency.DAILY, interval=1, count=5
+        )
+        return Event.objects.create(
+            calendar_entry=entry,
+            start_time=start_time,
+            end_time=start_time + timedelta(hours=1),
+            recurrence_rule=rule,
+        )
+
+    def test_to_rruleset_is_cached(self, event):
+        entry = CalendarEntry.objects.get(pk=event.calendar_entry_id)
+        ruleset_cache.clear()
+        first = entry.to_rruleset()
+        assert entry.to_rruleset() is first
+        assert CalendarEntry.objects.get(pk=entry.pk).to_rruleset() is first
+        assert ruleset_cache.stats()["hits"] == 2
+        assert ruleset_cache.stats()["misses"] == 1
+
+    @pytest.mark.parametrize("change", ["event", "rule", "exclusion"])
+    def test_invalidated_by_schedule_changes(self, event, change):
+        entry = CalendarEntry.objects.get(pk=event.calendar_entry_id)
+        before = list(entry.to_rruleset())
+        version = entry.schedule_version
+
+        if change == "event":
+            event.start_time += timedelta(days=1)
+            event.end_time += timedelta(days=1)
+            event.save()
+        elif change == "rule":
+            event.recurrence_rule.count = 3
+            event.recurrence_rule.save()
+        else:
+            ExclusionDateRange.objects.create(
+                event=event,
+                start_date=datetime(2023, 1, 2, tzinfo=timezone.utc),
+                end_date=datetime(2023, 1, 3, tzinfo=timezone.utc),
+            )
+
+        reloaded = CalendarEntry.objects.get(pk=entry.pk)
+        assert reloaded.schedule_version > version
+        assert list(reloaded.to_rruleset()) != before
+        # even the stale instance no longer sees the old ruleset
+        assert list(entry.to_rruleset()) != before
+
+    def test_save_does_not_clobber_schedule_version(self, event):
+        entry = CalendarEntry.objects.get(pk=event.calendar_entry_id)
+        event.save()
+        entry.name = "Renamed"
+        entry.save()
+        reloaded = CalendarEntry.objects.get(pk=entry.pk)
+        assert reloaded.name == "Renamed"
+        assert reloaded.schedule_version > entry.schedule_version
+
+    def test_repeated_version_after_rollback(self, event):
+        entry = CalendarEntry.objects.get(pk=event.calendar_entry_id)
+        entry.to_rruleset()
+
+        with pytest.raises(RuntimeError), transaction.atomic():
+            event.recurrence_rule.count = 2
+            event.recurrence_rule.save()
+            rolled_back = CalendarEntry.objects.get(pk=entry.pk)
+            assert len(list(rolled_back.to_rruleset())) == 2
+            raise RuntimeError
+
+        # committed by another process, which can't invalidate this one's cache
+        with mock.patch.object(ruleset_cache, "invalidate"):
+            event.recurrence_rule.count = 3
+            event.recurrence_rule.save()
+        reloaded = CalendarEntry.objects.get(pk=entry.pk)
+
+        # the same schedule_version as the rolled back change, but a new stamp
+        assert reloaded.schedule_version == rolled_back.schedule_version
+        assert len(list(reloaded.to_rruleset())) == 3
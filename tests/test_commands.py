@@ -0,0 +1,156 @@
+from datetime import datetime, timedelta, timezone
+from io import StringIO
+
+import pytest
+from django.core.management import CommandError, call_command
+
+from recurring.ical import iter_ical
+from recurring.models import CalendarEntry, Event, RecurrenceRule, Timezone
+
+
+@pytest.fixture
+def calendar_entries():
+    utc, _ = Timezone.objects.get_or_create(name="UTC")
+    start_time = datetime(2023, 1, 1, 9, tzinfo=timezone.utc)
+    entries = []
+    for i in range(5):
+        entry = CalendarEntry.objects.create(name=f"Entry {i}", timezone=utc)
+        rule = RecurrenceRule.objects.create(
+            frequency=RecurrenceRule.Frequency.DAILY, interval=i + 1
+        )
+        Event.objects.create(
+            calendar_entry=entry,
+            start_time=start_time,
+            end_time=start_time + timedelta(hours=1),
+            recurrence_rule=rule,
+        )
+        entries.append(entry)
+    CalendarEntry.objects.update(next_occurrence=None, first_occurrence=None)
+    return entries
+
+
+@pytest.mark.django_db
+class TestCalculateOccurrencesCommand:
+    def test_recalculates_in_chunks(self, calendar_entries):
+        out = StringIO()
+        call_command("calculate_occurrences", chunk_size=2, stdout=out)
+
+        for entry in CalendarEntry.objects.all():
+            assert entry.next_occurrence is not None
+            assert entry.first_occurrence is not None
+
+        output = out.getvalue()
+        assert "Recalculating occurrences for 5 calendar entries" in output
+        assert "Processed 5/5 (100%)" in output
+        assert "Successfully recalculated occurrences for 5 calendar entries" in output
+        # a summary rather than one line per entry
+        assert "Entry 0" not in output
+
+    def test_verbose_progress_per_chunk(self, calendar_entries):
+        out = StringIO()
+        call_command("calculate_occurrences", chunk_size=2, verbosity=2, stdout=out)
+        output = out.getvalue()
+        assert "Processed 2/5" in output
+        assert "Processed 4/5" in output
+        assert "Processed 5/5" in output
+
+    @pytest.mark.django_db(transaction=True)
+    def test_recalculates_in_worker_processes(self, calendar_entries):
+        out = StringIO()
+        call_command(
+            "calculate_occurrences", workers=2, chunk_size=2, verbosity=2, stdout=out
+        )
+
+        assert "Processed 5/5" in out.getvalue()
+        assert not CalendarEntry.objects.filter(next_occurrence__isnull=True).exists()
+
+    def test_no_entries(self):
+        out = StringIO()
+        call_command("calculate_occurrences", stdout=out)
+        assert "Successfully recalculated occurrences for 0" in out.getvalue()
+
+
+@pytest.mark.django_db
+class TestImportIcalCommand:
+    def test_import(self, calendar_entries, tmp_path):
+        path = tmp_path / "feed.ics"
+        path.write_text(
+            "".join(iter_ical(CalendarEntry.objects.all())), encoding="utf-8"
+        )
+        CalendarEntry.objects.all().delete()
+
+        out = StringIO()
+        err = StringIO()
+        call_command("import_ical", str(path), batch_size=2, stdout=out, stderr=err)
+
+        assert CalendarEntry.objects.count() == 5
+        assert not CalendarEntry.objects.filter(next_occurrence=None).exists()
+        assert "Successfully imported 5 calendar entries (5 events)" in out.getvalue()
+        assert err.getvalue() == ""
+
+    def test_reports_skipped(self, tmp_path):
+        path = tmp_path / "feed.ics"
+        path.write_text(
+            "BEGIN:VCALENDAR\r\nBEGIN:VEVENT\r\nUID:no-start\r\nSUMMARY:Broken\r\n"
+            "END:VEVENT\r\nEND:VCALENDAR\r\n",
+            encoding="utf-8",
+        )
+        out = StringIO()
+        err = StringIO()
+        call_command("import_ical", str(path), verbosity=2, stdout=out, stderr=err)
+
+        assert "Successfully imported 0 calendar entries" in out.getvalue()
+        assert "Skipped 1 VEVENTs" in err.getvalue()
+        assert "no-start: DTSTART is required" in err.getvalue()
+
+
+handled = []
+
+
+def record_handled(calendar_entry):
+    handled.append((calendar_entry.name, calendar_entry.due_occurrence))
+
+
+def fail_for_entry_0(calendar_entry):
+    if calendar_entry.name == "Entry 0":
+        raise ValueError("Handler failed")
+
+
+@pytest.mark.django_db
+class TestProcessDueCommand:
+    @pytest.fixture
+    def due_entries(self, calendar_entries):
+        now = datetime.now(timezone.utc)
+        for entry in calendar_entries:
+            entry.calculate_occurrences(now=now - timedelta(days=30))
+        handled.clear()
+        return calendar_entries
+
+    def test_processes_due_entries(self, due_entries, settings):
+        settings.RECURRING_DUE_HANDLER = "tests.test_commands.record_handled"
+        out = StringIO()
+        call_command("process_due", batch_size=2, stdout=out)
+
+        assert sorted(name for name, _ in handled) == [f"Entry {i}" for i in range(5)]
+        assert all(due is not None for _, due in handled)
+        assert "Processed 5 due calendar entries (0 failed)" in out.getvalue()
+
+        # nothing is due any more
+        handled.clear()
+        call_command("process_due", stdout=StringIO())
+        assert handled == []
+
+    def test_handler_failures_are_counted(self, due_entries):
+        out = StringIO()
+        call_command(
+            "process_due", handler="tests.test_commands.fail_for_entry_0", stdout=out
+        )
+        assert "Processed 5 due calendar entries (1 failed)" in out.getvalue()
+
+    def test_handler_required(self):
+        with pytest.raises(CommandError, match="No handler given"):
+            call_command("process_due")
+
+    def test_invalid_handler(self):
+        with pytest.raises(CommandError, match="Couldn't import handler"):
+            call_command("process_due", handler="tests.missing.handler")
@@ -0,0 +1,181 @@
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from recurring import compiled
+from recurring.models import (
+    CalendarEntry,
+    Event,
+    ExclusionDateRange,
+    RecurrenceRule,
+    Timezone,
+)
+
+
+def without_stamps(ical):
+    # UIDs and DTSTAMPs differ between renders
+    return [
+        line for line in ical.splitlines() if not line.startswith(("UID:", "DTSTAMP:"))
+    ]
+
+
+class TestRruleString:
+    @pytest.mark.parametrize(
+        "fields",
+        [
+            {"frequency": RecurrenceRule.Frequency.DAILY},
+            {
+                "frequency": RecurrenceRule.Frequency.WEEKLY,
+                "interval": 2,
+                "wkst": 6,
+                "byweekday": ["MO", "FR"],
+                "until": datetime(2024, 12, 31, 23, 59, 59, tzinfo=timezone.utc),
+            },
+            {
+                "frequency": RecurrenceRule.Frequency.MONTHLY,
+                "count": 12,
+                "bymonthday": [1, -1],
+                "bysetpos": [1],
+                "byhour": [9, 17],
+            },
+        ],
+    )
+    def test_round_trip(self, fields):
+        rule = RecurrenceRule(**fields)
+        value = rule.to_rrule_string()
+
+        parsed = RecurrenceRule.from_rrule_string(value)
+
+        assert parsed.to_dict() == rule.to_dict()
+
+    def test_until_in_utc(self):
+        until = datetime(2024, 6, 1, 13, tzinfo=ZoneInfo("Europe/London"))
+        rule = RecurrenceRule(frequency=RecurrenceRule.Frequency.DAILY, until=until)
+        assert rule.to_rrule_string() == "FREQ=DAILY;UNTIL=20240601T120000Z;INTERVAL=1"
+
+
+@pytest.mark.django_db
+class TestCompiledSchedule:
+    @pytest.fixture
+    def calendar_entry(self):
+        london, _ = Timezone.objects.get_or_create(name="Europe/London")
+        entry = CalendarEntry.objects.create(
+            name="Compiled", description="Schedule", timezone=london
+        )
+        start_time = datetime(2024, 1, 1, 9, tzinfo=timezone.utc)
+        weekly = Event.objects.create(
+            calendar_entry=entry,
+            start_time=start_time,
+            end_time=start_time + timedelta(hours=1),
+            recurrence_rule=RecurrenceRule.objects.create(
+                frequency=RecurrenceRule.Frequency.WEEKLY,
+                byweekday=["MO", "TH"],
+                wkst=6,
+                until=datetime(2024, 6, 1, tzinfo=timezone.utc),
+            ),
+        )
+        ExclusionDateRange.objects.create(
+            event=weekly,
+            start_date=datetime(2024, 2, 5, tzinfo=timezone.utc),
+            end_date=datetime(2024, 2, 12, tzinfo=timezone.utc),
+        )
+        ExclusionDateRange.objects.create(
+            event=weekly,
+            start_date=datetime(2024, 3, 4, tzinfo=timezone.utc),
+            end_date=datetime(2024, 3, 5, tzinfo=timezone.utc),
+        )
+        Event.objects.create(
+            calendar_entry=entry,
+            start_time=datetime(2024, 7, 1, tzinfo=timezone.utc),
+            is_full_day=True,
+        )
+        Event.objects.create(
+            calendar_entry=entry,
+            start_time=datetime(2024, 1, 15, 14, 30, tzinfo=timezone.utc),
+            end_time=datetime(2024, 1, 15, 15, tzinfo=timezone.utc),
+            recurrence_rule=RecurrenceRule.objects.create(
+                frequency=RecurrenceRule.Frequency.MINUTELY, interval=45, count=50
+            ),
+        )
+        entry = CalendarEntry.objects.with_schedule().get(pk=entry.pk)
+        entry.calculate_occurrences()
+        return entry
+
+    def test_compiled(self, calendar_entry):
+        schedule = calendar_entry.compiled_schedule
+
+        assert schedule["version"] == compiled.SCHEDULE_FORMAT_VERSION
+        assert schedule["timezone"] == "Europe/London"
+        assert [event["rrule"] for event in schedule["events"]] == [
+            "FREQ=WEEKLY;UNTIL=20240601T000000Z;INTERVAL=1;BYDAY=MO,TH;WKST=SU",
+            None,
+            "FREQ=MINUTELY;COUNT=50;INTERVAL=45",
+        ]
+        assert len(schedule["events"][0]["exclusions"]) == 2
+
+    def test_reads_without_queries(
+        self, calendar_entry, django_assert_num_queries, settings
+    ):
+        # otherwise the second render would come from the cache
+        settings.RECURRING_ICAL_CACHE = None
+        expected = CalendarEntry.objects.with_schedule().get(pk=calendar_entry.pk)
+        expected_occurrences = list(expected._build_rruleset())
+        expected_ical = expected.to_ical()
+        expected_summary = expected.summarise()
+
+        entry = CalendarEntry.objects.get(pk=calendar_entry.pk)
+        # e.g. after renaming the entry
+        entry.occurrences_stale = True
+
+        with django_assert_num_queries(0):
+            assert list(entry.to_rruleset()) == expected_occurrences
+            assert without_stamps(entry.to_ical()) == without_stamps(expected_ical)
+            assert str(entry) == f"Compiled: {expected_summary}"
+
+    def test_doesnt_change_entry(self, calendar_entry):
+        entry = CalendarEntry.objects.get(pk=calendar_entry.pk)
+
+        loaded = compiled.load_schedule(entry)
+
+        assert len(loaded.events.all()) == 3
+        assert not hasattr(entry, "_prefetched_objects_cache") or not (
+            entry._prefetched_objects_cache
+        )
+
+    @pytest.mark.parametrize(
+        "change",
+        [
+            {"schedule_version": 100},
+            {"compiled_schedule": {"version": 0}},
+            {"compiled_schedule": None},
+        ],
+    )
+    def test_ignored_unless_current(self, calendar_entry, change):
+        entry = CalendarEntry.objects.get(pk=calendar_entry.pk)
+        for field, value in change.items():
+            setattr(entry, field, value)
+
+        assert not compiled.is_current(entry)
+        assert entry._with_compiled_schedule() is entry
+
+    def test_ignored_after_changing_timezone(self, calendar_entry):
+        entry = CalendarEntry.objects.get(pk=calendar_entry.pk)
+        entry.timezone = Timezone.objects.create(name="Asia/Tokyo")
+
+        assert not compiled.is_current(entry)
+        assert "TZID=Asia/Tokyo" in entry.to_ical()
+
+    def test_loaded_instance_kept_in_step(self, calendar_entry):
+        entry = CalendarEntry.objects.get(pk=calendar_entry.pk)
+        version = entry.schedule_version
+
+        Event.objects.create(
+            calendar_entry=entry,
+            start_time=datetime(2025, 1, 1, 12, tzinfo=timezone.utc),
+            end_time=datetime(2025, 1, 1, 13, tzinfo=timezone.utc),
+        )
+
+        assert entry.schedule_version == version + 1
+        assert not compiled.is_current(entry)
+        assert "DTSTART;TZID=Europe/London:20250101T120000" in entry.to_ical()
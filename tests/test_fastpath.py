@@ -0,0 +1,248 @@
+import random
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+import pytest
+from dateutil.rrule import DAILY, HOURLY, MINUTELY, MONTHLY, SECONDLY, WEEKLY, rrule
+
+from recurring.fastpath import FixedIntervalRule
+from recurring.models import CalendarEntry, Event, RecurrenceRule, Timezone
+from recurring.rulesets import ScheduleRuleset
+
+utc = timezone.utc
+
+#: Roughly how many seconds a rule of each frequency is checked over
+SPANS = {
+    WEEKLY: 400 * 86400,
+    DAILY: 60 * 86400,
+    HOURLY: 5 * 86400,
+    MINUTELY: 43200,
+    SECONDLY: 3600,
+}
+
+#: Times when clocks go back, repeating local times
+FALLING_BACK = [
+    (ZoneInfo("Europe/London"), datetime(2024, 10, 27)),
+    (ZoneInfo("America/New_York"), datetime(2024, 11, 3)),
+    (ZoneInfo("Australia/Lord_Howe"), datetime(2024, 4, 7)),
+    (ZoneInfo("UTC"), datetime(2024, 6, 1)),
+]
+
+#: Daylight saving changes, including clocks going forward and the day Samoa skipped
+TRANSITIONS = [
+    *FALLING_BACK,
+    (ZoneInfo("Europe/London"), datetime(2024, 3, 31)),
+    (ZoneInfo("America/New_York"), datetime(2024, 3, 10)),
+    (ZoneInfo("Pacific/Apia"), datetime(2011, 12, 29)),
+]
+
+
+def random_rule(rng, tz=None, transition=None, freq=None):
+    if tz is None:
+        tz, transition = rng.choice(TRANSITIONS)
+    if freq is None:
+        freq = rng.choice(list(SPANS))
+    span = SPANS[freq]
+    dtstart = (transition - timedelta(seconds=rng.randrange(span // 2))).replace(
+        tzinfo=tz
+    )
+    kwargs = {
+        "freq": freq,
+        "interval": rng.choice([1, 2, 3, 7, 15, 45]),
+        "dtstart": dtstart,
+    }
+    if rng.random() < 0.3:
+        kwargs["count"] = rng.randint(1, 300)
+    elif rng.random() < 0.5:
+        kwargs["until"] = dtstart + timedelta(seconds=rng.uniform(-100, span))
+    return kwargs
+
+
+class TestFixedIntervalRule:
+    @pytest.mark.parametrize(
+        "kwargs, supported",
+        [
+            ({"freq": MINUTELY, "interval": 15}, True),
+            ({"freq": WEEKLY, "interval": 2, "count": 3}, True),
+            ({"freq": MONTHLY}, False),
+            ({"freq": WEEKLY, "byweekday": [0, 2]}, False),
+            ({"freq": DAILY, "byhour": [9, 18]}, False),
+        ],
+    )
+    def test_supports(self, kwargs, supported):
+        dtstart = datetime(2024, 1, 1, 9, tzinfo=utc)
+        assert FixedIntervalRule.supports(dtstart=dtstart, **kwargs) is supported
+
+    def test_doesnt_support_microseconds(self):
+        dtstart = datetime(2024, 1, 1, 9, 0, 0, 500, tzinfo=utc)
+        assert not FixedIntervalRule.supports(DAILY, dtstart=dtstart)
+
+    def test_doesnt_iterate(self):
+        rule = FixedIntervalRule(
+            SECONDLY, dtstart=datetime(2000, 1, 1, tzinfo=utc), interval=7
+        )
+        now = datetime(2024, 6, 1, 12, 0, 3, tzinfo=utc)
+
+        # dateutil would generate over 100 million occurrences to answer these
+        assert rule.after(now) == datetime(2024, 6, 1, 12, 0, 4, tzinfo=utc)
+        assert rule.before(now) == datetime(2024, 6, 1, 11, 59, 57, tzinfo=utc)
+        assert rule.between(now, now + timedelta(seconds=20)) == [
+            datetime(2024, 6, 1, 12, 0, 4, tzinfo=utc),
+            datetime(2024, 6, 1, 12, 0, 11, tzinfo=utc),
+            datetime(2024, 6, 1, 12, 0, 18, tzinfo=utc),
+        ]
+
+    def test_keeps_wall_clock_time_across_dst(self):
+        london = ZoneInfo("Europe/London")
+        rule = FixedIntervalRule(DAILY, dtstart=datetime(2024, 3, 1, 9, tzinfo=london))
+
+        after = rule.after(datetime(2024, 4, 1, tzinfo=utc))
+
+        assert after == datetime(2024, 4, 1, 9, tzinfo=london)
+        assert after.astimezone(utc).hour == 8
+
+    @pytest.mark.parametrize("seed", range(10))
+    def test_matches_dateutil(self, seed):
+        rng = random.Random(seed)
+        for _ in range(20):
+            kwargs = random_rule(rng)
+            fast, slow = FixedIntervalRule(**kwargs), rrule(**kwargs)
+            span = SPANS[kwargs["freq"]]
+            for _ in range(5):
+                dt = (
+                    kwargs["dtstart"]
+                    + timedelta(seconds=rng.uniform(-0.2 * span, span))
+                ).astimezone(rng.choice([kwargs["dtstart"].tzinfo, utc]))
+                inc = rng.random() < 0.5
+                until = dt + timedelta(seconds=rng.uniform(0, span / 10))
+
+                # compare reprs, as times that don't exist compare equal to others
+                assert repr(fast.after(dt, inc)) == repr(slow.after(dt, inc))
+                assert repr(fast.before(dt, inc)) == repr(slow.before(dt, inc))
+                assert repr(fast.between(dt, until, inc)) == repr(
+                    slow.between(dt, until, inc)
+                )
+
+
+class TestScheduleRulesetFastPath:
+    def rulesets(self, rule_kwargs, rdates=(), exclusions=()):
+        rulesets = []
+        for rule_class in (FixedIntervalRule, rrule):
+            rset = ScheduleRuleset()
+            for kwargs in rule_kwargs:
+                rset.rrule(rule_class(**kwargs))
+            for rdate in rdates:
+                rset.rdate(rdate)
+            for start, end in exclusions:
+                rset.exclude(start, end)
+            rulesets.append(rset)
+        return rulesets
+
+    def test_fast_path(self):
+        fast, slow = self.rulesets(
+            [{"freq": DAILY, "dtstart": datetime(2024, 1, 1, tzinfo=utc)}]
+        )
+        assert fast.fast_path
+        assert not slow.fast_path
+
+        nested = ScheduleRuleset()
+        nested.rrule(fast)
+        assert nested.fast_path
+        nested.rrule(slow)
+        assert not nested.fast_path
+
+    def test_jumps_over_exclusions(self):
+        start = datetime(2024, 1, 1, tzinfo=utc)
+        fast, _ = self.rulesets(
+            [{"freq": MINUTELY, "dtstart": start}],
+            exclusions=[(start + timedelta(days=1), start + timedelta(days=30))],
+        )
+        dt = start + timedelta(days=2)
+
+        assert fast.after(dt) == start + timedelta(days=30)
+        assert fast.before(dt) == start + timedelta(days=1, minutes=-1)
+
+    @pytest.mark.parametrize("seed", range(10))
+    def test_matches_iterating(self, seed):
+        rng = random.Random(seed)
+        for _ in range(10):
+            # occurrences at local times that don't exist go out of order, so
+            # iterating merges the rules differently, hence only clocks going back
+            tz, transition = rng.choice(FALLING_BACK)
+            freq = rng.choice(list(SPANS))
+            rule_kwargs = [
+                random_rule(rng, tz, transition, freq) for _ in range(rng.randint(1, 3))
+            ]
+            start = min(kwargs["dtstart"] for kwargs in rule_kwargs)
+            span = SPANS[freq]
+
+            def random_time(low=0.0, start=start, span=span):
+                return start + timedelta(seconds=rng.uniform(low * span, span))
+
+            exclusions = []
+            for _ in range(rng.randint(0, 3)):
+                excluded = random_time()
+                exclusions.append(
+                    (excluded, excluded + timedelta(seconds=rng.uniform(0, span / 5)))
+                )
+            fast, slow = self.rulesets(
+                rule_kwargs,
+                rdates=[kwargs["dtstart"] for kwargs in rule_kwargs],
+                exclusions=exclusions,
+            )
+
+            for _ in range(5):
+                dt = random_time(-0.2).astimezone(rng.choice([tz, utc]))
+                inc = rng.random() < 0.5
+                until = dt + timedelta(seconds=rng.uniform(0, span / 10))
+
+                assert fast.after(dt, inc) == slow.after(dt, inc)
+                assert fast.before(dt, inc) == slow.before(dt, inc)
+                assert fast.between(dt, until, inc) == slow.between(dt, until, inc)
+
+
+@pytest.mark.django_db
+class TestRecurrenceRuleFastPath:
+    @pytest.fixture
+    def calendar_entry(self):
+        return CalendarEntry.objects.create(
+            name="Test", timezone=Timezone.objects.get_or_create(name="UTC")[0]
+        )
+
+    def test_to_rrule(self):
+        start_time = datetime(2024, 1, 1, 9, tzinfo=utc)
+        fixed = RecurrenceRule.objects.create(
+            frequency=RecurrenceRule.Frequency.MINUTELY, interval=15
+        )
+        by_weekday = RecurrenceRule.objects.create(
+            frequency=RecurrenceRule.Frequency.WEEKLY, byweekday=["MO", "FR"]
+        )
+
+        assert isinstance(fixed.to_rrule(start_time, tz=utc), FixedIntervalRule)
+        assert not isinstance(
+            by_weekday.to_rrule(start_time, tz=utc), FixedIntervalRule
+        )
+
+    def test_calculate_occurrences(self, calendar_entry):
+        start_time = datetime(2000, 1, 1, 9, tzinfo=utc)
+        Event.objects.create(
+            calendar_entry=calendar_entry,
+            start_time=start_time,
+            end_time=start_time + timedelta(minutes=1),
+            recurrence_rule=RecurrenceRule.objects.create(
+                frequency=RecurrenceRule.Frequency.SECONDLY, interval=30
+            ),
+        )
+        calendar_entry = CalendarEntry.objects.with_schedule().get(pk=calendar_entry.pk)
+        now = datetime(2024, 6, 1, 12, 0, 10, tzinfo=utc)
+
+        calendar_entry.calculate_occurrences(commit=False, now=now)
+
+        assert calendar_entry.to_rruleset().fast_path
+        assert calendar_entry.first_occurrence == start_time
+        assert calendar_entry.previous_occurrence == datetime(
+            2024, 6, 1, 12, tzinfo=utc
+        )
+        assert calendar_entry.next_occurrence == datetime(
+            2024, 6, 1, 12, 0, 30, tzinfo=utc
+        )
@@ -87,6 +87,19 @@ class TestCalendarEntryForm:
         assert instance.timezone.id == valid_calendar_entry_data["timezone"]
         assert instance.events.count() == 1
 
+    def test_form_save_recalculates_once(
+        self, valid_calendar_entry_data, django_capture_on_commit_callbacks
+    ):
+        """Test that saving the form recalculates occurrences once, on commit."""
+        form = CalendarEntryForm(data=valid_calendar_entry_data)
+        assert form.is_valid(), form.errors
+        with django_capture_on_commit_callbacks(execute=True) as callbacks:
+            instance = form.save()
+            assert instance.next_occurrence is None
+        assert len(callbacks) == 1
+        assert instance.next_occurrence is not None
+        assert not instance.occurrences_stale
+
     def test_form_update_existing_instance(
         self, valid_calendar_entry_data, timezone_obj
     ):
@@ -193,6 +206,79 @@ class TestCalendarEntryForm:
         updated_event = updated_entry.events.first()
         assert updated_event.recurrence_rule is None
 
+    def test_update_keeps_unchanged_rows(self, timezone_obj):
+        """Test that saving the form only replaces the events that changed."""
+        entry = CalendarEntry.objects.create(name="Entry", timezone=timezone_obj)
+        entry.from_dict(
+            {
+                "events": [
+                    {
+                        "start_time": datetime(2023, 1, 1, tzinfo=timezone.utc),
+                        "end_time": datetime(2023, 1, 1, 1, tzinfo=timezone.utc),
+                        "is_full_day": False,
+                        "recurrence_rule": {"frequency": "DAILY", "interval": 1},
+                        "exclusions": [
+                            {
+                                "start_date": datetime(2023, 1, 5, tzinfo=timezone.utc),
+                                "end_date": datetime(2023, 1, 7, tzinfo=timezone.utc),
+                            }
+                        ],
+                    },
+                    {
+                        "start_time": datetime(2023, 2, 1, tzinfo=timezone.utc),
+                        "is_full_day": True,
+                        "end_time": None,
+                    },
+                ]
+            }
+        )
+        kept, removed = entry.events.order_by("pk")
+        rule = kept.recurrence_rule
+        exclusion = kept.exclusions.get()
+
+        # as the admin widget sends it
+        data = {
+            "name": "Entry",
+            "description": "",
+            "timezone": timezone_obj.id,
+            "calendar_entry": json.dumps(
+                {
+                    "events": [
+                        {
+                            "id": kept.pk,
+                            "start_time": "2023-01-01T00:00:00",
+                            "end_time": "2023-01-01T02:00:00",
+                            "is_full_day": False,
+                            "recurrence_rule": {"frequency": "DAILY", "interval": 1},
+                            "exclusions": [
+                                {
+                                    "start_date": "2023-01-05T00:00:00",
+                                    "end_date": "2023-01-07T00:00:00",
+                                }
+                            ],
+                        },
+                        {
+                            "id": "temp_1",
+                            "start_time": "2023-03-01T00:00:00",
+                            "end_time": "2023-03-01T01:00:00",
+                            "is_full_day": False,
+                        },
+                    ]
+                }
+            ),
+        }
+        form = CalendarEntryForm(data=data, instance=entry)
+        assert form.is_valid(), form.errors
+        form.save()
+
+        events = list(entry.events.order_by("pk"))
+        assert events[0].pk == kept.pk
+        assert events[1].pk not in (kept.pk, removed.pk)
+        assert events[0].end_time == datetime(2023, 1, 1, 2, tzinfo=timezone.utc)
+        assert events[0].recurrence_rule.pk == rule.pk
+        assert list(events[0].exclusions.values_list("pk", flat=True)) == [exclusion.pk]
+        assert events[1].start_time == datetime(2023, 3, 1, tzinfo=timezone.utc)
+
     @pytest.mark.parametrize(
         "invalid_field,invalid_value",
         [
@@ -0,0 +1,431 @@
+import json
+import uuid
+from datetime import datetime, timedelta, timezone
+from io import StringIO
+from zoneinfo import ZoneInfo
+
+import pytest
+from dateutil.rrule import rrulestr
+from django.contrib.admin.sites import AdminSite
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from icalendar import Calendar
+
+from recurring.admin import CalendarEntryAdmin, export_ical
+from recurring.forms import CalendarEntryForm
+from recurring.ical import (
+    build_vtimezone,
+    import_ical,
+    iter_ical,
+    streaming_ical_response,
+)
+from recurring.models import (
+    ICAL_UID_NAMESPACE,
+    CalendarEntry,
+    Event,
+    ExclusionDateRange,
+    RecurrenceRule,
+    Timezone,
+)
+
+
+@pytest.fixture
+def entries():
+    london, _ = Timezone.objects.get_or_create(name="Europe/London")
+    new_york, _ = Timezone.objects.get_or_create(name="America/New_York")
+    entries = []
+    for i in range(6):
+        entry = CalendarEntry.objects.create(
+            name=f"Entry {i}", timezone=london if i % 2 else new_york
+        )
+        start_time = datetime(2024, 1, 1 + i, 9, tzinfo=timezone.utc)
+        rule = RecurrenceRule.objects.create(
+            frequency=RecurrenceRule.Frequency.WEEKLY, interval=1, count=10
+        )
+        event = Event.objects.create(
+            calendar_entry=entry,
+            start_time=start_time,
+            end_time=start_time + timedelta(hours=1),
+            recurrence_rule=rule,
+        )
+        ExclusionDateRange.objects.create(
+            event=event,
+            start_date=start_time + timedelta(weeks=1),
+            end_date=start_time + timedelta(weeks=1, hours=1),
+        )
+        entries.append(entry)
+    return entries
+
+
+@pytest.mark.django_db
+class TestDeterministicIcal:
+    def test_repeatable(self, entries, settings):
+        settings.RECURRING_ICAL_CACHE = None
+        entry = CalendarEntry.objects.get(pk=entries[0].pk)
+
+        ical = entry.to_ical()
+
+        assert CalendarEntry.objects.get(pk=entry.pk).to_ical() == ical
+        vevent = Calendar.from_ical(ical).walk("VEVENT")[0]
+        assert vevent["DTSTAMP"].dt == entry.updated_at.replace(microsecond=0)
+        assert str(vevent["UID"]) == str(
+            uuid.uuid5(ICAL_UID_NAMESPACE, f"{entry.pk}.{entry.events.get().pk}")
+        )
+
+    def test_unique_uids(self, entries):
+        cal = Calendar.from_ical("".join(iter_ical(CalendarEntry.objects.all())))
+        assert len({str(vevent["UID"]) for vevent in cal.walk("VEVENT")}) == 6
+
+    def test_cached(self, entries, django_assert_num_queries):
+        ical = entries[0].to_ical()
+
+        entry = CalendarEntry.objects.get(pk=entries[0].pk)
+        with django_assert_num_queries(0):
+            assert entry.to_ical() == ical
+        assert entry.to_ical("-//Other//EN") != ical
+
+    def test_etag_changes_with_schedule(self, entries):
+        entry = CalendarEntry.objects.get(pk=entries[0].pk)
+        etag, updated_at = entry.ical_etag(), entry.updated_at
+        entry.to_ical()
+
+        event = entry.events.get()
+        event.end_time += timedelta(hours=1)
+        event.save()
+
+        entry.refresh_from_db()
+        assert entry.ical_etag() != etag
+        assert entry.updated_at > updated_at
+        assert "DTEND;TZID=America/New_York:20240101T060000" in entry.to_ical()
+
+    def test_exdates_match_ruleset(self):
+        utc, _ = Timezone.objects.get_or_create(name="UTC")
+        entry = CalendarEntry.objects.create(name="Mondays", timezone=utc)
+        event = Event.objects.create(
+            calendar_entry=entry,
+            start_time=datetime(2024, 1, 1, 9, tzinfo=timezone.utc),
+            end_time=datetime(2024, 1, 1, 10, tzinfo=timezone.utc),
+            recurrence_rule=RecurrenceRule.objects.create(
+                frequency=RecurrenceRule.Frequency.WEEKLY, byweekday=["MO"], count=6
+            ),
+        )
+        # doesn't start on an occurrence
+        ExclusionDateRange.objects.create(
+            event=event,
+            start_date=datetime(2024, 1, 9, tzinfo=timezone.utc),
+            end_date=datetime(2024, 1, 17, tzinfo=timezone.utc),
+        )
+        entry = CalendarEntry.objects.get(pk=entry.pk)
+
+        vevent = Calendar.from_ical(entry.to_ical()).walk("VEVENT")[0]
+        exdates = [value.dt for value in vevent["EXDATE"].dts]
+        rule = rrulestr(
+            vevent["RRULE"].to_ical().decode(), dtstart=vevent["DTSTART"].dt
+        )
+
+        assert exdates == [datetime(2024, 1, 15, 9, tzinfo=ZoneInfo("UTC"))]
+        assert [dt for dt in rule if dt not in exdates] == list(entry.to_rruleset())
+
+    def test_unsaved_entry_has_no_etag(self):
+        assert CalendarEntry(name="Unsaved").ical_etag() is None
+
+    def test_download(self, entries, rf, admin_user):
+        modeladmin = CalendarEntryAdmin(CalendarEntry, AdminSite())
+        entry = entries[0]
+
+        def download(**headers):
+            request = rf.get("/", headers=headers)
+            request.user = admin_user
+            return modeladmin.download_ical(request, str(entry.pk))
+
+        response = download()
+        assert response.status_code == 200
+        assert response.content.decode("utf-8") == entry.to_ical()
+        assert download(if_none_match=response["ETag"]).status_code == 304
+        assert download(if_modified_since=response["Last-Modified"]).status_code == 304
+        assert download(if_none_match='"stale"').status_code == 200
+
+
+@pytest.mark.django_db
+class TestIterIcal:
+    def test_single_calendar(self, entries):
+        ical = "".join(iter_ical(CalendarEntry.objects.all()))
+        assert ical.startswith("BEGIN:VCALENDAR\r\n")
+        assert ical.endswith("END:VCALENDAR\r\n")
+        assert ical.count("BEGIN:VCALENDAR") == 1
+
+        cal = Calendar.from_ical(ical)
+        assert len(cal.walk("VEVENT")) == 6
+        assert sorted(str(vtz["TZID"]) for vtz in cal.walk("VTIMEZONE")) == [
+            "America/New_York",
+            "Europe/London",
+        ]
+
+    def test_events_match_to_ical(self, entries):
+        ical = "".join(iter_ical(CalendarEntry.objects.filter(pk=entries[1].pk)))
+        expected = Calendar.from_ical(entries[1].to_ical()).walk("VEVENT")[0]
+        vevent = Calendar.from_ical(ical).walk("VEVENT")[0]
+        for prop in ("SUMMARY", "DTSTART", "DTEND", "RRULE", "EXDATE"):
+            assert vevent[prop].to_ical() == expected[prop].to_ical()
+
+    def test_streams_in_batches(self, entries):
+        with CaptureQueriesContext(connection) as ctx:
+            chunks = list(iter_ical(CalendarEntry.objects.all(), batch_size=2))
+        # header, two timezones, six entries and the footer
+        assert len(chunks) == 10
+        # the timezone and entry queries, then events and exclusions per batch
+        assert len(ctx.captured_queries) == 2 + 2 * 3
+
+    def test_skips_entries_without_events(self, entries):
+        utc, _ = Timezone.objects.get_or_create(name="UTC")
+        CalendarEntry.objects.create(name="Empty", timezone=utc)
+        cal = Calendar.from_ical("".join(iter_ical(CalendarEntry.objects.all())))
+        assert len(cal.walk("VEVENT")) == 6
+        assert "UTC" not in [str(vtz["TZID"]) for vtz in cal.walk("VTIMEZONE")]
+
+    def test_streaming_response(self, entries):
+        response = streaming_ical_response(CalendarEntry.objects.all())
+        assert response["Content-Type"] == "text/calendar"
+        assert response["Content-Disposition"] == 'attachment; filename="calendar.ics"'
+        ical = b"".join(response.streaming_content).decode("utf-8")
+        assert len(Calendar.from_ical(ical).walk("VEVENT")) == 6
+
+    def test_admin_action(self, entries, rf):
+        modeladmin = CalendarEntryAdmin(CalendarEntry, AdminSite())
+        response = export_ical(modeladmin, rf.post("/"), CalendarEntry.objects.all())
+        ical = b"".join(response.streaming_content).decode("utf-8")
+        assert len(Calendar.from_ical(ical).walk("VEVENT")) == 6
+
+
+class TestBuildVtimezone:
+    def test_transitions(self):
+        vtimezone = build_vtimezone("Europe/London", 2024, 2024)
+        observances = [
+            (
+                component.name,
+                component["DTSTART"].dt,
+                component["TZOFFSETFROM"].td,
+                component["TZOFFSETTO"].td,
+                str(component["TZNAME"]),
+            )
+            for component in vtimezone.subcomponents
+        ]
+        assert observances == [
+            ("STANDARD", datetime(2024, 1, 1), timedelta(0), timedelta(0), "GMT"),
+            (
+                "DAYLIGHT",
+                datetime(2024, 3, 31, 1),
+                timedelta(0),
+                timedelta(hours=1),
+                "BST",
+            ),
+            (
+                "STANDARD",
+                datetime(2024, 10, 27, 2),
+                timedelta(hours=1),
+                timedelta(0),
+                "GMT",
+            ),
+        ]
+
+    def test_utc_is_not_needed(self):
+        assert build_vtimezone("UTC", 2024, 2024) is None
+
+
+FEED = """BEGIN:VCALENDAR\r
+VERSION:2.0\r
+PRODID:-//Legacy//EN\r
+BEGIN:VEVENT\r
+UID:standup\r
+SUMMARY:Daily Stand\r
+ up\r
+DTSTART;TZID=Europe/London:20240101T093000\r
+DTEND;TZID=Europe/London:20240101T094500\r
+RRULE:FREQ=DAILY;COUNT=10\r
+EXDATE;TZID=Europe/London:20240103T093000,20240105T093000\r
+BEGIN:VALARM\r
+ACTION:DISPLAY\r
+TRIGGER:-PT10M\r
+END:VALARM\r
+END:VEVENT\r
+BEGIN:VEVENT\r
+UID:standup\r
+SUMMARY:Daily Standup (Friday)\r
+DTSTART;TZID=Europe/London:20240105T160000\r
+DURATION:PT30M\r
+RRULE:FREQ=WEEKLY;BYDAY=FR;WKST=SU;UNTIL=20240301\r
+END:VEVENT\r
+BEGIN:VEVENT\r
+UID:holiday\r
+SUMMARY:Holiday\r
+DTSTART;VALUE=DATE:20241225\r
+RRULE:FREQ=YEARLY;BYMONTH=12;BYMONTHDAY=25\r
+END:VEVENT\r
+BEGIN:VEVENT\r
+UID:floating\r
+SUMMARY:Floating\r
+DTSTART:20240101T120000\r
+DTEND:20240101T130000\r
+END:VEVENT\r
+BEGIN:VEVENT\r
+UID:ordinal\r
+SUMMARY:First Monday\r
+DTSTART:20240101T120000Z\r
+DTEND:20240101T130000Z\r
+RRULE:FREQ=MONTHLY;BYDAY=1MO\r
+END:VEVENT\r
+BEGIN:VEVENT\r
+UID:standup\r
+RECURRENCE-ID;TZID=Europe/London:20240102T093000\r
+DTSTART;TZID=Europe/London:20240102T100000\r
+DTEND;TZID=Europe/London:20240102T101500\r
+END:VEVENT\r
+END:VCALENDAR\r
+"""
+
+
+@pytest.mark.django_db
+class TestImportIcal:
+    def test_import(self):
+        result = import_ical(StringIO(FEED), default_timezone="America/New_York")
+
+        assert result["entries"] == 3
+        assert result["events"] == 4
+        assert [reason.split(":")[0] for reason in result["skipped"]] == [
+            "ordinal",
+            "standup",
+        ]
+
+        standup = CalendarEntry.objects.get(name="Daily Standup")
+        assert standup.timezone.name == "Europe/London"
+        daily, weekly = standup.events.order_by("start_time")
+        assert daily.recurrence_rule.count == 10
+        assert daily.exclusions.count() == 2
+        assert weekly.end_time - weekly.start_time == timedelta(minutes=30)
+        assert weekly.recurrence_rule.byweekday == ["FR"]
+        assert weekly.recurrence_rule.wkst == 6
+
+        london = standup.timezone.as_tz
+        occurrences = standup.to_rruleset().between(
+            datetime(2024, 1, 1, tzinfo=london),
+            datetime(2024, 1, 6, tzinfo=london),
+            inc=True,
+        )
+        assert occurrences == [
+            datetime(2024, 1, 1, 9, 30, tzinfo=london),
+            datetime(2024, 1, 2, 9, 30, tzinfo=london),
+            datetime(2024, 1, 4, 9, 30, tzinfo=london),
+            datetime(2024, 1, 5, 16, 0, tzinfo=london),
+        ]
+
+        holiday = CalendarEntry.objects.get(name="Holiday")
+        event = holiday.events.get()
+        assert event.is_full_day
+        assert event.recurrence_rule.bymonth == [12]
+        assert event.recurrence_rule.bymonthday == [25]
+
+        floating = CalendarEntry.objects.get(name="Floating")
+        assert floating.timezone.name == "America/New_York"
+
+        # occurrence fields are recalculated
+        assert standup.first_occurrence is not None
+        assert holiday.next_occurrence is not None
+
+    def test_without_summary(self):
+        feed = (
+            "BEGIN:VCALENDAR\r\nVERSION:2.0\r\n"
+            "BEGIN:VEVENT\r\nUID:no-summary\r\n"
+            "DTSTART:20240101T120000Z\r\nDTEND:20240101T130000Z\r\nEND:VEVENT\r\n"
+            "BEGIN:VEVENT\r\n"
+            "DTSTART:20240102T120000Z\r\nDTEND:20240102T130000Z\r\nEND:VEVENT\r\n"
+            "END:VCALENDAR\r\n"
+        )
+
+        result = import_ical(StringIO(feed))
+
+        assert result["skipped"] == []
+        assert sorted(CalendarEntry.objects.values_list("name", flat=True)) == [
+            "Imported event",
+            "no-summary",
+        ]
+
+    def test_edit_imported(self, admin_user):
+        import_ical(StringIO(FEED))
+        standup = CalendarEntry.objects.get(name="Daily Standup")
+        expected = standup.to_rruleset()[:10]
+        exclusion = ExclusionDateRange.objects.filter(
+            event__calendar_entry=standup
+        ).first()
+        exclusion.save()
+
+        # as the admin widget submits it, in local time with dates for exclusions
+        london = standup.timezone.as_tz
+
+        def local(value):
+            return datetime.fromisoformat(value).astimezone(london).isoformat()[:19]
+
+        events = json.loads(
+            CalendarEntryForm(instance=standup).initial["calendar_entry"]
+        )["events"]
+        for event in events:
+            event["start_time"] = local(event["start_time"])
+            event["end_time"] = local(event["end_time"]) if event["end_time"] else None
+            event["recurrence_rule"] = {
+                key: local(value) if key == "until" else value
+                for key, value in event["recurrence_rule"].items()
+                if value is not None
+            }
+            event["exclusions"] = [
+                {
+                    "start_date": local(exclusion["start_date"])[:10] + "T00:00:00",
+                    "end_date": local(exclusion["end_date"])[:10] + "T00:00:00",
+                }
+                for exclusion in event["exclusions"]
+            ]
+        form = CalendarEntryForm(
+            data={
+                "name": "Renamed",
+                "description": "",
+                "timezone": standup.timezone.pk,
+                "calendar_entry": json.dumps({"events": events}),
+            },
+            instance=standup,
+        )
+        assert form.is_valid(), form.errors
+        form.save()
+
+        standup = CalendarEntry.objects.get(pk=standup.pk)
+        assert standup.name == "Renamed"
+        assert standup.to_rruleset()[:10] == expected
+        assert (
+            ExclusionDateRange.objects.filter(event__calendar_entry=standup).count()
+            == 2
+        )
+
+    def test_round_trip(self, entries):
+        feed = "".join(iter_ical(CalendarEntry.objects.all()))
+        expected = {
+            entry.name: entry.to_rruleset()[:10]
+            for entry in CalendarEntry.objects.all()
+        }
+        CalendarEntry.objects.all().delete()
+
+        result = import_ical(StringIO(feed))
+
+        assert result == {"entries": 6, "events": 6, "skipped": []}
+        for entry in CalendarEntry.objects.all():
+            assert entry.to_rruleset()[:10] == expected[entry.name]
+
+    def test_batches(self, entries):
+        feed = "".join(iter_ical(CalendarEntry.objects.all()))
+        CalendarEntry.objects.all().delete()
+
+        with CaptureQueriesContext(connection) as ctx:
+            result = import_ical(StringIO(feed), batch_size=3)
+
+        assert result["entries"] == 6
+        # the query count depends on the batches, not the number of entries
+        with CaptureQueriesContext(connection) as ctx_single:
+            import_ical(StringIO(feed), batch_size=6)
+        assert len(ctx.captured_queries) < 2 * len(ctx_single.captured_queries)
+        assert len(ctx_single.captured_queries) < 25
@@ -0,0 +1,140 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from django.test import override_settings
+
+from recurring import instrumentation
+from recurring.forms import CalendarEntryForm
+from recurring.instrumentation import InMemoryCollector, collect_metrics
+from recurring.models import (
+    CalendarEntry,
+    Event,
+    ExclusionDateRange,
+    RecurrenceRule,
+    Timezone,
+)
+
+recorded = []
+
+
+def record(kind, name, value, tags):
+    recorded.append((kind, name, value, tags))
+
+
+def fail(kind, name, value, tags):
+    raise RuntimeError("Metrics backend is down")
+
+
+@pytest.fixture
+def calendar_entry():
+    timezone_obj = Timezone.objects.get_or_create(name="UTC")[0]
+    entry = CalendarEntry.objects.create(name="Weekly", timezone=timezone_obj)
+    start_time = datetime(2024, 1, 1, 9, tzinfo=timezone.utc)
+    event = Event.objects.create(
+        calendar_entry=entry,
+        start_time=start_time,
+        end_time=start_time + timedelta(hours=1),
+        recurrence_rule=RecurrenceRule.objects.create(
+            frequency=RecurrenceRule.Frequency.DAILY
+        ),
+    )
+    ExclusionDateRange.objects.create(
+        event=event,
+        start_date=datetime(2024, 1, 10, tzinfo=timezone.utc),
+        end_date=datetime(2024, 1, 14, tzinfo=timezone.utc),
+    )
+    return CalendarEntry.objects.get(pk=entry.pk)
+
+
+class TestHandler:
+    @pytest.fixture(autouse=True)
+    def clear_recorded(self):
+        recorded.clear()
+
+    def test_disabled_by_default(self):
+        assert instrumentation.get_handler() is None
+        with instrumentation.timer("recurring.test"):
+            instrumentation.incr("recurring.test")
+        assert recorded == []
+
+    @override_settings(RECURRING_METRICS_HANDLER="tests.test_instrumentation.record")
+    def test_setting(self):
+        with instrumentation.timer("recurring.test", calendar_entry=1):
+            instrumentation.incr("recurring.test.count", 3, calendar_entry=1)
+
+        assert [entry[:2] for entry in recorded] == [
+            ("counter", "recurring.test.count"),
+            ("timing", "recurring.test"),
+        ]
+        assert recorded[0][2:] == (3, {"calendar_entry": 1})
+        assert recorded[1][2] >= 0
+
+    @override_settings(RECURRING_METRICS_HANDLER=fail)
+    def test_handler_errors_are_logged(self, caplog):
+        with instrumentation.timer("recurring.test"):
+            result = "done"
+
+        assert result == "done"
+        assert "Metrics handler failed to record recurring.test" in caplog.text
+
+    def test_collect_metrics_restores_handler(self):
+        with collect_metrics() as metrics:
+            instrumentation.incr("recurring.test")
+        instrumentation.incr("recurring.test")
+
+        assert metrics.total("recurring.test") == 1
+        assert instrumentation.get_handler() is None
+
+
+@pytest.mark.django_db
+class TestInstrumentedOperations:
+    def test_calculate_occurrences(self, calendar_entry):
+        with collect_metrics() as metrics:
+            calendar_entry.calculate_occurrences(commit=False)
+
+        assert metrics.count("recurring.occurrences.calculate") == 1
+        assert metrics.count("recurring.rruleset.compile") == 1
+
+    def test_to_ical(self, calendar_entry):
+        with collect_metrics() as metrics:
+            calendar_entry.to_ical()
+
+        assert metrics.count("recurring.ical.render") == 1
+        # the timezone, events, recurrence rule and exclusions
+        assert metrics.total("recurring.ical.render.queries") == 4
+        assert metrics.count("recurring.exclusions.expand") == 1
+        assert metrics.total("recurring.exclusions.dates") == 5
+
+    def test_form_save(self):
+        Timezone.objects.get_or_create(name="UTC")
+        form = CalendarEntryForm(
+            data={
+                "name": "Form",
+                "timezone": 1,
+                "calendar_entry": '{"events": [{"start_time": "2024-01-01T09:00:00",'
+                ' "end_time": "2024-01-01T10:00:00"}]}',
+            }
+        )
+        assert form.is_valid(), form.errors
+
+        with collect_metrics() as metrics:
+            form.save()
+
+        assert metrics.count("recurring.form.save") == 1
+        assert metrics.total("recurring.form.save.queries") > 0
+
+
+class TestInMemoryCollector:
+    def test_summary(self):
+        collector = InMemoryCollector()
+        collector("timing", "recurring.test", 0.5, {})
+        collector("timing", "recurring.test", 0.25, {})
+        collector("counter", "recurring.test.count", 2, {})
+
+        assert collector.summary() == {
+            "recurring.test": {"count": 2, "seconds": 0.75},
+            "recurring.test.count": {"total": 2},
+        }
+
+        collector.clear()
+        assert collector.summary() == {}
@@ -1,4 +1,4 @@
-from datetime import datetime, timezone, timedelta
+from datetime import datetime, timedelta, timezone
 from unittest.mock import patch
 from zoneinfo import ZoneInfo
 
@@ -6,12 +6,14 @@ import pytest
 from django.utils import timezone as django_timezone
 
 from recurring.models import (
-    Timezone,
     CalendarEntry,
     Event,
-    RecurrenceRule,
     ExclusionDateRange,
+    Occurrence,
+    RecurrenceRule,
+    Timezone,
 )
+from recurring.rulesets import ScheduleRuleset
 
 
 @pytest.fixture
@@ -150,6 +152,9 @@ class TestCalendarEntry:
         utc = timezone.utc
         event.start_time = django_timezone.datetime(2023, 1, 1, tzinfo=utc)
         event.end_time = django_timezone.datetime(2023, 1, 1, 1, tzinfo=utc)
+        # EXDATEs are only written for occurrences the exclusion removes
+        recurrence_rule.count = 12
+        recurrence_rule.save()
         event.recurrence_rule = recurrence_rule
         event.save()
 
@@ -170,7 +175,7 @@ class TestCalendarEntry:
         assert "DTEND:20230101T010000Z" in ical_string
         assert "DTSTAMP:" in ical_string
         assert "UID:" in ical_string
-        assert "RRULE:FREQ=DAILY;COUNT=3;INTERVAL=1" in ical_string
+        assert "RRULE:FREQ=DAILY;COUNT=12;INTERVAL=1" in ical_string
         assert (
             "EXDATE:20230107T000000Z,20230108T000000Z,20230109T000000Z,20230110T000000Z"
             in ical_string
@@ -221,6 +226,19 @@ class TestCalendarEntryStr:
             "14:00" not in result
         ), f"Time '14:00' (UTC) should not appear in '{result}'"
 
+    def test_str_sub_daily_interval(self, timezone_obj):
+        entry = CalendarEntry.objects.create(name="Poll", timezone=timezone_obj)
+        start = datetime(2024, 1, 15, 14, 0, tzinfo=timezone.utc)
+        Event.objects.create(
+            calendar_entry=entry,
+            start_time=start,
+            end_time=start + timedelta(minutes=1),
+            recurrence_rule=RecurrenceRule.objects.create(
+                frequency=RecurrenceRule.Frequency.MINUTELY, interval=15
+            ),
+        )
+        assert str(entry) == "Poll: Every 15 minute at 14:00-14:01 (UTC)"
+
     def test_str_non_utc_with_end_time(self):
         """Both start and end times should be converted to entry timezone."""
         ny_tz, _ = Timezone.objects.get_or_create(name="America/New_York")
@@ -279,6 +297,41 @@ class TestCalendarEntryStr:
             "at " not in result
         ), f"Full-day event should not show 'at <time>' in '{result}'"
 
+    def test_str_uses_summary(self, timezone_obj, django_assert_num_queries):
+        entry = CalendarEntry.objects.create(name="Poll", timezone=timezone_obj)
+        start = datetime(2024, 1, 15, 14, 0, tzinfo=timezone.utc)
+        Event.objects.create(
+            calendar_entry=entry,
+            start_time=start,
+            end_time=start + timedelta(hours=1),
+            recurrence_rule=RecurrenceRule.objects.create(
+                frequency=RecurrenceRule.Frequency.DAILY, count=3
+            ),
+        )
+        entry.calculate_occurrences()
+        entry = CalendarEntry.objects.get(pk=entry.pk)
+
+        assert entry.summary_text == "Every day at 14:00-15:00 (UTC) for 3 occurrences"
+        assert entry.timezone_name == "UTC"
+        with django_assert_num_queries(0):
+            assert str(entry) == "Poll: Every day at 14:00-15:00 (UTC) for 3 occurrences"
+            assert entry.__str__("{occurrences}") == entry.summary_text
+
+    def test_str_ignores_stale_summary(self, timezone_obj):
+        entry = CalendarEntry.objects.create(name="Stale", timezone=timezone_obj)
+        entry.calculate_occurrences()
+        assert str(entry) == "Stale: No events"
+
+        Event.objects.create(
+            calendar_entry=entry,
+            start_time=datetime(2024, 1, 15, 14, 0, tzinfo=timezone.utc),
+            end_time=datetime(2024, 1, 15, 15, 0, tzinfo=timezone.utc),
+        )
+        entry.refresh_from_db()
+
+        assert entry.occurrences_stale
+        assert str(entry) == "Stale: Once at 14:00-15:00 (UTC)"
+
 
 @pytest.mark.django_db
 class TestCalendarEntryOccurrences:
@@ -335,7 +388,7 @@ class TestCalendarEntryOccurrences:
         assert calendar_entry.next_occurrence.time().hour == 12 - summer_offset
         # assert calendar_entry.previous_occurrence is None
         assert calendar_entry.first_occurrence.time().hour == 12 - summer_offset
-        assert calendar_entry.last_occurrence.time().hour == 12 - summer_offset
+        assert calendar_entry.last_occurrence is None
 
         # Calculate occurrences in December (winter time)
         mock_datetime.now.return_value = winter_time
@@ -349,7 +402,7 @@ class TestCalendarEntryOccurrences:
         assert calendar_entry.previous_occurrence.time().hour == 12 - winter_offset
         # first event is in summer
         assert calendar_entry.first_occurrence.time().hour == 12 - summer_offset
-        assert calendar_entry.last_occurrence.time().hour == 12 - winter_offset
+        assert calendar_entry.last_occurrence is None
 
     @pytest.mark.parametrize(
         "timezone_name, summer_offset, winter_offset",
@@ -404,7 +457,7 @@ class TestCalendarEntryOccurrences:
         assert calendar_entry.next_occurrence.time().hour == 12 - summer_offset
         # assert calendar_entry.previous_occurrence is None
         assert calendar_entry.first_occurrence.time().hour == 12 - summer_offset
-        assert calendar_entry.last_occurrence.time().hour == 12 - summer_offset
+        assert calendar_entry.last_occurrence is None
 
         # Calculate occurrences in December (winter time)
         mock_datetime.now.return_value = winter_time
@@ -418,46 +471,139 @@ class TestCalendarEntryOccurrences:
         assert calendar_entry.previous_occurrence.time().hour == 12 - winter_offset
         # first event is in summer
         assert calendar_entry.first_occurrence.time().hour == 12 - summer_offset
-        assert calendar_entry.last_occurrence.time().hour == 12 - winter_offset
+        assert calendar_entry.last_occurrence is None
 
-    def test_calculate_occurrences_window(self):
-        timezone_obj, _ = Timezone.objects.get_or_create(name="UTC")
+    @pytest.mark.parametrize(
+        "start_offset, rule_kwargs",
+        [
+            (timedelta(days=-5 * 365), {"frequency": RecurrenceRule.Frequency.WEEKLY}),
+            (timedelta(days=-30), {"frequency": RecurrenceRule.Frequency.HOURLY}),
+            (
+                timedelta(days=-400),
+                {"frequency": RecurrenceRule.Frequency.DAILY, "count": 10},
+            ),
+            (
+                timedelta(days=-400),
+                {
+                    "frequency": RecurrenceRule.Frequency.WEEKLY,
+                    "interval": 2,
+                    "byweekday": ["MO", "TH"],
+                    "count": 100,
+                },
+            ),
+            (
+                timedelta(days=-30),
+                {
+                    "frequency": RecurrenceRule.Frequency.MINUTELY,
+                    "interval": 15,
+                    "until": datetime(2030, 1, 1, tzinfo=timezone.utc),
+                },
+            ),
+            (
+                timedelta(days=-100),
+                {
+                    "frequency": RecurrenceRule.Frequency.MONTHLY,
+                    "bymonthday": [1, 15],
+                    "count": 30,
+                },
+            ),
+            (timedelta(days=10), {"frequency": RecurrenceRule.Frequency.MONTHLY}),
+            (timedelta(days=20 * 365), {"frequency": RecurrenceRule.Frequency.YEARLY}),
+            (timedelta(days=-3), None),
+        ],
+    )
+    def test_calculate_occurrences_matches_ruleset(
+        self, calendar_entry, start_offset, rule_kwargs
+    ):
+        now = django_timezone.now()
+        start_time = now.replace(microsecond=0) + start_offset
+        Event.objects.create(
+            calendar_entry=calendar_entry,
+            start_time=start_time,
+            end_time=start_time + timedelta(hours=1),
+            recurrence_rule=RecurrenceRule.objects.create(**rule_kwargs)
+            if rule_kwargs
+            else None,
+        )
+        calendar_entry.refresh_from_db()
+
+        calendar_entry.calculate_occurrences(commit=False, now=now)
+
+        rruleset = calendar_entry.to_rruleset()
+        is_infinite = bool(
+            rule_kwargs and "count" not in rule_kwargs and "until" not in rule_kwargs
+        )
+
+        def utc(dt):
+            return dt and dt.astimezone(timezone.utc)
+
+        assert calendar_entry.first_occurrence == utc(next(iter(rruleset)))
+        assert calendar_entry.previous_occurrence == utc(rruleset.before(now))
+        assert calendar_entry.next_occurrence == utc(rruleset.after(now))
+        assert calendar_entry.is_infinite == is_infinite
+        assert calendar_entry.last_occurrence == (
+            None if is_infinite else utc(list(rruleset)[-1])
+        )
+
+    def test_calculate_occurrences_exact_bounds(self):
+        timezone_obj, _ = Timezone.objects.get_or_create(name="Europe/London")
         calendar_entry = CalendarEntry.objects.create(
             name="Test Entry",
             timezone=timezone_obj,
         )
-        start_time = django_timezone.now().replace(
-            hour=12, minute=0, second=0, microsecond=0
-        )
-        end_time = start_time + timedelta(hours=2)
-        event = Event.objects.create(
+        start_time = datetime(2000, 1, 3, 9, 0, tzinfo=ZoneInfo("Europe/London"))
+        Event.objects.create(
             calendar_entry=calendar_entry,
             start_time=start_time,
-            end_time=end_time,
-            is_full_day=False,
+            end_time=start_time + timedelta(hours=1),
+            recurrence_rule=RecurrenceRule.objects.create(
+                frequency=RecurrenceRule.Frequency.DAILY,
+                until=datetime(2060, 1, 1, tzinfo=timezone.utc),
+            ),
         )
-        recurrence_rule = RecurrenceRule.objects.create(
-            frequency=RecurrenceRule.Frequency.DAILY,
-            interval=1,
+        calendar_entry.refresh_from_db()
+
+        # far beyond any window around now, in both directions
+        calendar_entry.calculate_occurrences()
+
+        assert calendar_entry.first_occurrence == start_time
+        assert calendar_entry.last_occurrence == datetime(
+            2059, 12, 31, 9, 0, tzinfo=ZoneInfo("Europe/London")
         )
-        event.recurrence_rule = recurrence_rule
-        event.save()
+        assert not calendar_entry.is_infinite
+
+    def test_calculate_occurrences_infinite(self, calendar_entry):
+        start_time = django_timezone.now().replace(microsecond=0)
+        for rule_kwargs in ({"count": 5}, {}):
+            Event.objects.create(
+                calendar_entry=calendar_entry,
+                start_time=start_time,
+                end_time=start_time + timedelta(hours=1),
+                recurrence_rule=RecurrenceRule.objects.create(
+                    frequency=RecurrenceRule.Frequency.DAILY, **rule_kwargs
+                ),
+            )
+        calendar_entry.refresh_from_db()
 
-        # Calculate occurrences with default window
         calendar_entry.calculate_occurrences()
-        assert calendar_entry.first_occurrence is not None
-        assert calendar_entry.last_occurrence is not None
-        assert (
-            calendar_entry.last_occurrence - calendar_entry.first_occurrence
-        ).days <= 365 * 5
+        calendar_entry.refresh_from_db()
 
-        # Calculate occurrences with custom window
-        calendar_entry.calculate_occurrences(window_days=30, window_multiple=2)
-        assert calendar_entry.first_occurrence is not None
-        assert calendar_entry.last_occurrence is not None
-        assert (
-            calendar_entry.last_occurrence - calendar_entry.first_occurrence
-        ).days <= 30 * 2
+        assert calendar_entry.is_infinite
+        assert calendar_entry.last_occurrence is None
+        assert calendar_entry.first_occurrence == start_time
+        assert list(CalendarEntry.objects.filter(is_infinite=True)) == [calendar_entry]
+
+    def test_calculate_occurrences_error_is_logged(
+        self, calendar_entry, event, caplog, capsys
+    ):
+        with patch.object(
+            CalendarEntry, "to_rruleset", side_effect=ValueError("Broken schedule")
+        ):
+            calendar_entry.calculate_occurrences()
+
+        assert "Error recalculating occurrences" in caplog.text
+        assert "Broken schedule" in caplog.text
+        assert capsys.readouterr().out == ""
 
 
 @pytest.mark.django_db
@@ -475,6 +621,62 @@ class TestEvent:
         assert event.recurrence_rule.interval == 1
 
 
+    @pytest.mark.parametrize(
+        "rule_kwargs, expected",
+        [
+            ({"count": 10}, datetime(2024, 1, 10, 9, tzinfo=timezone.utc)),
+            (
+                {"until": datetime(2024, 1, 31, tzinfo=timezone.utc)},
+                datetime(2024, 1, 30, 9, tzinfo=timezone.utc),
+            ),
+            # not simple enough to calculate, so found by iterating
+            (
+                {"count": 10, "byhour": [9, 18]},
+                datetime(2024, 1, 5, 18, tzinfo=timezone.utc),
+            ),
+            ({}, None),
+        ],
+    )
+    def test_last_occurrence(self, calendar_entry, rule_kwargs, expected):
+        event = Event.objects.create(
+            calendar_entry=calendar_entry,
+            start_time=datetime(2024, 1, 1, 9, tzinfo=timezone.utc),
+            end_time=datetime(2024, 1, 1, 10, tzinfo=timezone.utc),
+            recurrence_rule=RecurrenceRule.objects.create(
+                frequency=RecurrenceRule.Frequency.DAILY, **rule_kwargs
+            ),
+        )
+
+        assert event.last_occurrence() == expected
+
+    def test_last_occurrence_excluded(self, calendar_entry):
+        event = Event.objects.create(
+            calendar_entry=calendar_entry,
+            start_time=datetime(2024, 1, 1, 9, tzinfo=timezone.utc),
+            end_time=datetime(2024, 1, 1, 10, tzinfo=timezone.utc),
+            recurrence_rule=RecurrenceRule.objects.create(
+                frequency=RecurrenceRule.Frequency.DAILY, count=10
+            ),
+        )
+        ExclusionDateRange.objects.create(
+            event=event,
+            start_date=datetime(2024, 1, 8, tzinfo=timezone.utc),
+            end_date=datetime(2024, 1, 12, tzinfo=timezone.utc),
+        )
+
+        assert event.last_occurrence() == datetime(2024, 1, 7, 9, tzinfo=timezone.utc)
+
+    def test_last_occurrence_one_off(self, calendar_entry):
+        start_time = datetime(2024, 1, 1, 9, tzinfo=timezone.utc)
+        event = Event.objects.create(
+            calendar_entry=calendar_entry,
+            start_time=start_time,
+            end_time=start_time + timedelta(hours=1),
+        )
+
+        assert event.last_occurrence() == start_time
+
+
 @pytest.mark.django_db
 class TestRecurrenceRule:
     def test_recurrence_rule_creation(self, recurrence_rule):
@@ -592,3 +794,363 @@ class TestExclusionDateRange:
         assert all_dates[0].date() == start_date.date()
         assert all_dates[-1].date() == end_date.date()
         assert (all_dates[-1] - all_dates[0]).days == 2
+
+    def test_time_synced_in_local_timezone(self, calendar_entry, event):
+        calendar_entry.timezone = Timezone.objects.get_or_create(
+            name="Europe/London"
+        )[0]
+        calendar_entry.save()
+        london = ZoneInfo("Europe/London")
+        # 09:00 in London is 08:00 UTC during the summer
+        event.start_time = datetime(2023, 7, 1, 9, tzinfo=london)
+        event.end_time = datetime(2023, 7, 1, 10, tzinfo=london)
+        event.save()
+
+        ExclusionDateRange.objects.create(
+            event=event,
+            start_date=datetime(2023, 7, 2, tzinfo=london),
+            end_date=datetime(2023, 7, 2, 23, tzinfo=london),
+        )
+        event = Event.objects.get(pk=event.pk)
+        exclusion = event.exclusions.get()
+        assert exclusion.start_date == datetime(2023, 7, 2, 9, tzinfo=london)
+        # a single day ends a second after it starts, so it's a valid range
+        assert exclusion.end_date == datetime(2023, 7, 2, 9, 0, 1, tzinfo=london)
+
+        # re-saving the event (loaded in UTC) keeps the local time
+        event.save()
+        exclusion.refresh_from_db()
+        assert exclusion.start_date == datetime(2023, 7, 2, 9, tzinfo=london)
+        assert list(event.to_rruleset()) == [
+            datetime(2023, 7, 1, 9, tzinfo=london),
+            datetime(2023, 7, 3, 9, tzinfo=london),
+        ]
+
+
+@pytest.mark.django_db
+class TestOccurrence:
+    def test_not_materialised_by_default(self, calendar_entry, event):
+        calendar_entry.calculate_occurrences()
+        assert not Occurrence.objects.exists()
+
+    def test_materialise_occurrences(self, settings, calendar_entry, event):
+        settings.RECURRING_MATERIALISE_OCCURRENCES = True
+        event.start_time = django_timezone.now().replace(microsecond=0)
+        event.end_time = event.start_time + timedelta(hours=1)
+        event.save()
+        calendar_entry.calculate_occurrences()
+
+        occurrences = list(calendar_entry.occurrences.order_by("start_utc"))
+        assert len(occurrences) == 3
+        for occurrence in occurrences:
+            assert occurrence.event == event
+            assert occurrence.end_utc - occurrence.start_utc == event.duration
+
+        # recalculating replaces rather than duplicates rows
+        calendar_entry.calculate_occurrences()
+        assert calendar_entry.occurrences.count() == 3
+
+    def test_materialise_occurrences_horizon(self, calendar_entry):
+        start_time = datetime(2023, 1, 1, 9, tzinfo=timezone.utc)
+        rule = RecurrenceRule.objects.create(
+            frequency=RecurrenceRule.Frequency.DAILY, interval=1
+        )
+        Event.objects.create(
+            calendar_entry=calendar_entry,
+            start_time=start_time,
+            end_time=start_time + timedelta(hours=1),
+            recurrence_rule=rule,
+        )
+
+        count = calendar_entry.materialise_occurrences(
+            horizon_days=10, now=datetime(2023, 6, 1, tzinfo=timezone.utc)
+        )
+        assert count == 20
+        assert calendar_entry.occurrences.count() == 20
+
+    def test_between(self, calendar_entry):
+        start_time = datetime(2023, 1, 1, 9, tzinfo=timezone.utc)
+        rule = RecurrenceRule.objects.create(
+            frequency=RecurrenceRule.Frequency.DAILY, interval=1, count=10
+        )
+        Event.objects.create(
+            calendar_entry=calendar_entry,
+            start_time=start_time,
+            end_time=start_time + timedelta(hours=1),
+            recurrence_rule=rule,
+        )
+        calendar_entry.materialise_occurrences(
+            now=datetime(2023, 1, 1, tzinfo=timezone.utc)
+        )
+
+        window = Occurrence.objects.between(
+            datetime(2023, 1, 3, 9, 30, tzinfo=timezone.utc),
+            datetime(2023, 1, 5, 9, tzinfo=timezone.utc),
+        )
+        assert [o.start_utc.day for o in window.order_by("start_utc")] == [3, 4]
+
+
+@pytest.mark.django_db
+class TestWithSchedule:
+    @pytest.fixture
+    def entries(self):
+        london, _ = Timezone.objects.get_or_create(name="Europe/London")
+        start_time = datetime(2023, 1, 2, 9, tzinfo=timezone.utc)
+        entries = []
+        for i in range(3):
+            entry = CalendarEntry.objects.create(name=f"Entry {i}", timezone=london)
+            for j in range(2):
+                rule = RecurrenceRule.objects.create(
+                    frequency=RecurrenceRule.Frequency.WEEKLY,
+                    interval=1,
+                    byweekday=["MO", "WE"],
+                )
+                event = Event.objects.create(
+                    calendar_entry=entry,
+                    start_time=start_time + timedelta(hours=j),
+                    end_time=start_time + timedelta(hours=j + 1),
+                    recurrence_rule=rule,
+                )
+                ExclusionDateRange.objects.create(
+                    event=event,
+                    start_date=datetime(2023, 2, 1, tzinfo=timezone.utc),
+                    end_date=datetime(2023, 2, 14, tzinfo=timezone.utc),
+                )
+            entries.append(entry)
+        return entries
+
+    def test_constant_queries(self, entries, django_assert_num_queries):
+        with django_assert_num_queries(3):
+            for entry in CalendarEntry.objects.with_schedule():
+                entry.to_rruleset()
+                entry.to_ical()
+                entry.to_dict()
+                str(entry)
+                entry.calculate_occurrences(commit=False)
+
+    def test_matches_unprefetched(self, entries):
+        for prefetched in CalendarEntry.objects.with_schedule():
+            entry = CalendarEntry.objects.get(pk=prefetched.pk)
+            assert str(prefetched) == str(entry)
+            assert prefetched.to_dict() == entry.to_dict()
+            assert list(prefetched.to_rruleset()[:10]) == list(
+                entry.to_rruleset()[:10]
+            )
+
+
+@pytest.mark.django_db
+class TestClaimDue:
+    @pytest.fixture
+    def now(self):
+        return django_timezone.now().replace(microsecond=0)
+
+    @pytest.fixture
+    def entries(self, timezone_obj, now):
+        entries = []
+        for i in range(5):
+            entry = CalendarEntry.objects.create(name=f"Due {i}", timezone=timezone_obj)
+            start_time = now - timedelta(days=10, hours=i)
+            Event.objects.create(
+                calendar_entry=entry,
+                start_time=start_time,
+                end_time=start_time + timedelta(minutes=30),
+                recurrence_rule=RecurrenceRule.objects.create(
+                    frequency=RecurrenceRule.Frequency.DAILY, interval=1
+                ),
+            )
+            # last calculated three days ago, so the next occurrence is overdue
+            entry.calculate_occurrences(now=now - timedelta(days=3))
+            entries.append(entry)
+
+        not_due = CalendarEntry.objects.create(name="Not due", timezone=timezone_obj)
+        Event.objects.create(
+            calendar_entry=not_due,
+            start_time=now + timedelta(days=1),
+            end_time=now + timedelta(days=1, minutes=30),
+        )
+        not_due.calculate_occurrences(now=now)
+        return entries
+
+    def test_claims_and_advances(self, entries, now):
+        claimed = CalendarEntry.objects.claim_due(now=now, limit=3)
+
+        # in the order they were due
+        assert [entry.name for entry in claimed] == ["Due 4", "Due 3", "Due 2"]
+        for entry in claimed:
+            assert entry.due_occurrence <= now - timedelta(days=2)
+            assert entry.next_occurrence > now
+            assert entry.previous_occurrence <= now
+            entry.refresh_from_db()
+            assert entry.next_occurrence > now
+
+        remaining = CalendarEntry.objects.claim_due(now=now, limit=3)
+        assert [entry.name for entry in remaining] == ["Due 1", "Due 0"]
+        assert CalendarEntry.objects.claim_due(now=now) == []
+
+    def test_respects_queryset_filters(self, entries, now):
+        claimed = CalendarEntry.objects.filter(name="Due 0").claim_due(now=now)
+        assert [entry.name for entry in claimed] == ["Due 0"]
+
+    @pytest.mark.parametrize("failure", ["error", "no_advance"])
+    def test_not_reclaimed_if_not_advanced(self, entries, now, failure, caplog):
+        def calculate(self, now=None):
+            if failure == "error":
+                raise ValueError("Broken schedule")
+
+        with patch.object(CalendarEntry, "_calculate_occurrence_fields", calculate):
+            claimed = CalendarEntry.objects.claim_due(now=now)
+            assert len(claimed) == 5
+            assert CalendarEntry.objects.claim_due(now=now) == []
+
+        for entry in claimed:
+            assert entry.due_occurrence <= now
+            entry.refresh_from_db()
+            assert entry.next_occurrence is None
+            assert entry.occurrences_stale
+        assert "didn't advance" in caplog.text
+        if failure == "error":
+            assert "Broken schedule" in caplog.text
+
+    def test_constant_queries(self, entries, now, django_assert_num_queries):
+        # lock, load the schedules (3) and write back, in a savepoint
+        with django_assert_num_queries(7):
+            CalendarEntry.objects.claim_due(now=now)
+
+
+@pytest.mark.django_db
+class TestOccurringBetween:
+    @pytest.fixture
+    def entries(self, timezone_obj):
+        def create(name, start_time, **rule_kwargs):
+            entry = CalendarEntry.objects.create(name=name, timezone=timezone_obj)
+            Event.objects.create(
+                calendar_entry=entry,
+                start_time=start_time,
+                end_time=start_time + timedelta(hours=1),
+                recurrence_rule=RecurrenceRule.objects.create(**rule_kwargs)
+                if rule_kwargs
+                else None,
+            )
+            return entry
+
+        start = datetime(2024, 1, 1, 9, tzinfo=timezone.utc)
+        return {
+            "weekly": create(
+                "Weekly", start, frequency=RecurrenceRule.Frequency.WEEKLY
+            ),
+            "monthly": create(
+                "Monthly", start, frequency=RecurrenceRule.Frequency.MONTHLY
+            ),
+            "ended": create(
+                "Ended",
+                start,
+                frequency=RecurrenceRule.Frequency.DAILY,
+                until=datetime(2024, 1, 31, tzinfo=timezone.utc),
+            ),
+            "one_off": create("One off", datetime(2024, 3, 5, 12, tzinfo=timezone.utc)),
+            "future": create(
+                "Future",
+                datetime(2025, 1, 1, tzinfo=timezone.utc),
+                frequency=RecurrenceRule.Frequency.DAILY,
+            ),
+        }
+
+    def test_entries(self, entries):
+        # a week in March 2024, long after the weekly rule's next occurrence
+        start = datetime(2024, 3, 4, tzinfo=timezone.utc)
+        end = datetime(2024, 3, 10, 23, 59, tzinfo=timezone.utc)
+
+        found = CalendarEntry.objects.occurring_between(start, end)
+
+        assert sorted(entry.name for entry in found) == ["One off", "Weekly"]
+
+    def test_entries_stop_at_first_occurrence(self, entries):
+        start = datetime(2024, 3, 4, tzinfo=timezone.utc)
+        end = datetime(2024, 3, 10, 23, 59, tzinfo=timezone.utc)
+
+        with patch.object(ScheduleRuleset, "between", side_effect=AssertionError):
+            found = CalendarEntry.objects.occurring_between(start, end)
+            assert sorted(entry.name for entry in found) == ["One off", "Weekly"]
+
+    def test_occurrences(self, entries):
+        start = datetime(2024, 2, 1, tzinfo=timezone.utc)
+        end = datetime(2024, 2, 29, tzinfo=timezone.utc)
+
+        pairs = list(
+            CalendarEntry.objects.occurring_between(start, end, with_occurrences=True)
+        )
+
+        monthly = [dt for entry, dt in pairs if entry.name == "Monthly"]
+        weekly = [dt for entry, dt in pairs if entry.name == "Weekly"]
+        assert monthly == [datetime(2024, 2, 1, 9, tzinfo=timezone.utc)]
+        assert [dt.day for dt in weekly] == [5, 12, 19, 26]
+        assert {entry.name for entry, _ in pairs} == {"Monthly", "Weekly"}
+
+    def test_exclusions(self, entries):
+        event = entries["weekly"].events.get()
+        ExclusionDateRange.objects.create(
+            event=event,
+            start_date=datetime(2024, 3, 1, tzinfo=timezone.utc),
+            end_date=datetime(2024, 3, 31, tzinfo=timezone.utc),
+        )
+        start = datetime(2024, 3, 4, tzinfo=timezone.utc)
+        end = datetime(2024, 3, 10, 23, 59, tzinfo=timezone.utc)
+
+        found = CalendarEntry.objects.occurring_between(start, end)
+
+        assert [entry.name for entry in found] == ["One off"]
+
+    def test_prunes_in_sql(self, entries):
+        start = datetime(2024, 3, 4, tzinfo=timezone.utc)
+        end = datetime(2024, 3, 10, 23, 59, tzinfo=timezone.utc)
+
+        # the ended and future entries are never loaded
+        with patch.object(
+            CalendarEntry,
+            "to_rruleset",
+            autospec=True,
+            side_effect=CalendarEntry.to_rruleset,
+        ) as to_rruleset:
+            found = list(CalendarEntry.objects.occurring_between(start, end))
+        checked = {call.args[0].name for call in to_rruleset.call_args_list}
+        assert checked == {"Weekly", "Monthly", "One off"}
+        assert len(found) == 2
+
+    def test_prunes_with_calculated_bounds(self, entries, timezone_obj):
+        counted = CalendarEntry.objects.create(name="Counted", timezone=timezone_obj)
+        Event.objects.create(
+            calendar_entry=counted,
+            start_time=datetime(2024, 1, 1, 9, tzinfo=timezone.utc),
+            end_time=datetime(2024, 1, 1, 10, tzinfo=timezone.utc),
+            recurrence_rule=RecurrenceRule.objects.create(
+                frequency=RecurrenceRule.Frequency.DAILY, count=10
+            ),
+        )
+        for entry in CalendarEntry.objects.with_schedule():
+            entry.calculate_occurrences()
+        start = datetime(2024, 3, 4, tzinfo=timezone.utc)
+        end = datetime(2024, 3, 10, 23, 59, tzinfo=timezone.utc)
+
+        # the counted entry has no until, but its last occurrence is in January
+        with patch.object(
+            CalendarEntry,
+            "to_rruleset",
+            autospec=True,
+            side_effect=CalendarEntry.to_rruleset,
+        ) as to_rruleset:
+            found = list(CalendarEntry.objects.occurring_between(start, end))
+        checked = {call.args[0].name for call in to_rruleset.call_args_list}
+        assert checked == {"Weekly", "Monthly", "One off"}
+        assert len(found) == 2
+
+    def test_constant_queries(self, entries, django_assert_num_queries):
+        start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        end = datetime(2024, 12, 31, tzinfo=timezone.utc)
+
+        # the candidates, then their events and exclusions per batch
+        with django_assert_num_queries(3):
+            found = list(CalendarEntry.objects.occurring_between(start, end))
+        assert len(found) == 4
+
+        with django_assert_num_queries(5):
+            list(CalendarEntry.objects.occurring_between(start, end, batch_size=2))
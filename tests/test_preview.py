@@ -0,0 +1,205 @@
+import json
+import time
+from datetime import datetime, timezone
+
+import pytest
+from django.contrib.admin.sites import AdminSite
+from django.core.exceptions import PermissionDenied, ValidationError
+from django.forms.renderers import get_default_renderer
+
+from recurring import executor
+from recurring.admin import CalendarEntryAdmin
+from recurring.models import CalendarEntry, Event, Timezone
+from recurring.preview import preview_occurrences
+from recurring.widgets import CalendarEntryWidget
+
+
+@pytest.fixture
+def london():
+    return Timezone.objects.get_or_create(name="Europe/London")[0]
+
+
+def weekly(**rule):
+    return {
+        "events": [
+            {
+                "start_time": "2024-01-01T09:00:00",
+                "end_time": "2024-01-01T10:30:00",
+                "recurrence_rule": {
+                    "frequency": "WEEKLY",
+                    "interval": 1,
+                    "byweekday": ["MO", "WE"],
+                    **rule,
+                },
+                "exclusions": [
+                    {
+                        "start_date": "2024-01-08T00:00:00",
+                        "end_date": "2024-01-08T00:00:00",
+                    }
+                ],
+            }
+        ]
+    }
+
+
+@pytest.mark.django_db
+class TestPreviewOccurrences:
+    def test_preview(self, london, django_assert_num_queries):
+        with django_assert_num_queries(0):
+            preview = preview_occurrences(
+                weekly(),
+                london,
+                count=4,
+                after=datetime(2024, 1, 1, tzinfo=timezone.utc),
+            )
+
+        assert preview == {
+            "occurrences": [
+                {
+                    "event": 0,
+                    "start": f"2024-01-{day:02}T09:00:00+00:00",
+                    "end": f"2024-01-{day:02}T10:30:00+00:00",
+                }
+                for day in (1, 3, 10, 15)
+            ],
+            "complete": True,
+        }
+        assert not Event.objects.exists()
+
+    def test_merges_events(self, london):
+        data = weekly(count=2)
+        data["events"].append(
+            {"start_time": "2024-01-02T00:00:00", "end_time": None, "is_full_day": True}
+        )
+
+        preview = preview_occurrences(
+            data, london, after=datetime(2024, 1, 1, tzinfo=timezone.utc)
+        )
+
+        assert [
+            (occurrence["event"], occurrence["start"])
+            for occurrence in preview["occurrences"]
+        ] == [
+            (0, "2024-01-01T09:00:00+00:00"),
+            (1, "2024-01-02T00:00:00+00:00"),
+            (0, "2024-01-03T09:00:00+00:00"),
+        ]
+        assert preview["occurrences"][1]["end"] == "2024-01-03T00:00:00+00:00"
+
+    @pytest.fixture
+    def shutdown(self):
+        yield
+        # wait for dateutil to give up rather than slowing down other tests
+        executor.shutdown_executor()
+
+    def test_time_budget(self, london, shutdown):
+        data = weekly()
+        # the 30th of February never happens
+        data["events"].append(
+            {
+                "start_time": "2024-01-01T12:00:00",
+                "end_time": "2024-01-01T13:00:00",
+                "recurrence_rule": {
+                    "frequency": "YEARLY",
+                    "bymonth": [2],
+                    "bymonthday": [30],
+                },
+            }
+        )
+
+        started = time.monotonic()
+        preview = preview_occurrences(
+            data, london, after=datetime(2024, 1, 2, tzinfo=timezone.utc), timeout=0.05
+        )
+
+        assert time.monotonic() - started < 0.3
+        assert not preview["complete"]
+        # the impossible rule holds up everything after its start
+        assert preview["occurrences"] == []
+
+    def test_time_budget_spares_shared_executor(self, london, settings, shutdown):
+        settings.RECURRING_ASYNC_WORKERS = 1
+        data = weekly()
+        data["events"][0]["recurrence_rule"] = {
+            "frequency": "YEARLY",
+            "bymonth": [2],
+            "bymonthday": [30],
+        }
+        preview = preview_occurrences(data, london, timeout=0.05)
+        assert not preview["complete"]
+
+        # the expansion that outlived its budget doesn't hold up the async methods
+        started = time.monotonic()
+        executor.get_executor().submit(lambda: None).result(timeout=1)
+        assert time.monotonic() - started < 0.3
+
+    def test_invalid(self, london):
+        with pytest.raises(ValidationError):
+            preview_occurrences(weekly(frequency="FORTNIGHTLY"), london)
+
+
+@pytest.mark.django_db
+class TestPreviewEndpoint:
+    @pytest.fixture
+    def preview(self, rf, admin_user):
+        modeladmin = CalendarEntryAdmin(CalendarEntry, AdminSite())
+
+        def preview(body, user=admin_user):
+            request = rf.post("/", json.dumps(body), content_type="application/json")
+            request.user = user
+            return modeladmin.preview_occurrences(request)
+
+        return preview
+
+    def test_preview(self, preview, london):
+        response = preview(
+            {
+                "calendar_entry": json.dumps(weekly()),
+                "timezone": london.pk,
+                "count": 2,
+            }
+        )
+
+        assert response.status_code == 200
+        data = json.loads(response.content)
+        assert len(data["occurrences"]) == 2
+        assert data["complete"]
+        assert not CalendarEntry.objects.exists()
+
+    @pytest.mark.parametrize(
+        "body",
+        [
+            {},
+            {"calendar_entry": "[]", "timezone": 1},
+            {"calendar_entry": "{", "timezone": 1},
+            {"calendar_entry": weekly(), "timezone": 0},
+            {"calendar_entry": weekly(frequency="FORTNIGHTLY"), "timezone": 1},
+        ],
+    )
+    def test_bad_request(self, preview, london, body):
+        if body.get("timezone") == 1:
+            body["timezone"] = london.pk
+        response = preview(body)
+        assert response.status_code == 400
+        assert json.loads(response.content)["error"]
+
+    def test_permission(self, preview, london, django_user_model):
+        user = django_user_model.objects.create_user("staff", is_staff=True)
+        with pytest.raises(PermissionDenied):
+            preview({"calendar_entry": weekly(), "timezone": london.pk}, user=user)
+
+    def test_post_only(self, rf, admin_user):
+        request = rf.get("/")
+        request.user = admin_user
+        modeladmin = CalendarEntryAdmin(CalendarEntry, AdminSite())
+        assert modeladmin.preview_occurrences(request).status_code == 405
+
+    def test_widget_links_to_preview(self):
+        html = CalendarEntryWidget().render(
+            "calendar_entry", "", renderer=get_default_renderer()
+        )
+        assert (
+            'data-preview-url="/admin/recurring/calendarentry/preview-occurrences/"'
+            in html
+        )
+        assert "calendar-entry-preview-calendar_entry" in html
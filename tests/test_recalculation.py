@@ -0,0 +1,177 @@
+from datetime import timedelta
+from unittest.mock import patch
+
+import pytest
+from django.db import transaction
+from django.utils import timezone as django_timezone
+
+from recurring import deferred_recalculation
+from recurring.models import (
+    CalendarEntry,
+    CalendarEntryQuerySet,
+    Event,
+    ExclusionDateRange,
+    RecurrenceRule,
+    Timezone,
+)
+
+
+@pytest.fixture
+def count_recalculations():
+    original = CalendarEntryQuerySet.recalculate_occurrences
+    with patch.object(
+        CalendarEntryQuerySet,
+        "recalculate_occurrences",
+        autospec=True,
+        side_effect=original,
+    ) as mock:
+        yield mock
+
+
+@pytest.fixture
+def on_commit(db, django_capture_on_commit_callbacks):
+    return django_capture_on_commit_callbacks
+
+
+@pytest.fixture
+def calendar_entry(on_commit):
+    # run the callbacks registered while setting up, so that those registered by the
+    # test itself are captured
+    with on_commit(execute=True):
+        utc, _ = Timezone.objects.get_or_create(name="UTC")
+        return CalendarEntry.objects.create(name="Stale", timezone=utc)
+
+
+def create_event(calendar_entry):
+    start_time = django_timezone.now().replace(microsecond=0) - timedelta(days=3)
+    return Event.objects.create(
+        calendar_entry=calendar_entry,
+        start_time=start_time,
+        end_time=start_time + timedelta(hours=1),
+        recurrence_rule=RecurrenceRule.objects.create(
+            frequency=RecurrenceRule.Frequency.DAILY, interval=1
+        ),
+    )
+
+
+@pytest.mark.django_db
+class TestDeferredRecalculation:
+    def test_recalculated_on_commit(self, calendar_entry, on_commit):
+        with on_commit(execute=True) as callbacks:
+            create_event(calendar_entry)
+            calendar_entry.refresh_from_db()
+            assert calendar_entry.occurrences_stale
+            assert calendar_entry.next_occurrence is None
+
+        assert len(callbacks) == 1
+        calendar_entry.refresh_from_db()
+        assert not calendar_entry.occurrences_stale
+        assert calendar_entry.next_occurrence is not None
+
+    def test_changes_coalesced_per_transaction(
+        self, calendar_entry, count_recalculations, on_commit
+    ):
+        with on_commit(execute=True):
+            other = CalendarEntry.objects.create(name="Other", timezone_id=1)
+        count_recalculations.reset_mock()
+        with on_commit(execute=True) as callbacks:
+            event = create_event(calendar_entry)
+            create_event(other)
+            for day in range(20):
+                ExclusionDateRange.objects.create(
+                    event=event,
+                    start_date=event.start_time + timedelta(days=day),
+                    end_date=event.start_time + timedelta(days=day, hours=1),
+                )
+            event.recurrence_rule.interval = 2
+            event.recurrence_rule.save()
+
+        assert len(callbacks) == 1
+        assert count_recalculations.call_count == 1
+        (queryset,) = count_recalculations.call_args.args
+        assert set(queryset.values_list("pk", flat=True)) == {
+            calendar_entry.pk,
+            other.pk,
+        }
+
+    def test_save_updates_instance(self, calendar_entry, on_commit):
+        with on_commit(execute=True):
+            create_event(calendar_entry)
+        with on_commit(execute=True):
+            calendar_entry.name = "Renamed"
+            calendar_entry.save()
+            assert calendar_entry.occurrences_stale
+
+        assert not calendar_entry.occurrences_stale
+        assert calendar_entry.next_occurrence is not None
+
+    def test_rolled_back_savepoint(
+        self, calendar_entry, count_recalculations, on_commit
+    ):
+        with on_commit(execute=True) as callbacks:
+            try:
+                with transaction.atomic():
+                    create_event(calendar_entry)
+                    raise ValueError
+            except ValueError:
+                pass
+            create_event(calendar_entry)
+
+        # the callback registered in the savepoint was discarded with it
+        assert len(callbacks) == 1
+        assert count_recalculations.call_count == 1
+
+    def test_exclusion_delete_is_deferred(
+        self, calendar_entry, count_recalculations, on_commit
+    ):
+        with on_commit(execute=True):
+            event = create_event(calendar_entry)
+            exclusion = ExclusionDateRange.objects.create(
+                event=event,
+                start_date=event.start_time + timedelta(days=1),
+                end_date=event.start_time + timedelta(days=1, hours=1),
+            )
+        calls = count_recalculations.call_count
+        with on_commit(execute=True):
+            exclusion.delete()
+            assert count_recalculations.call_count == calls
+        assert count_recalculations.call_count == calls + 1
+
+
+@pytest.mark.django_db(transaction=True)
+class TestDeferredRecalculationAutocommit:
+    def test_immediate_outside_transaction(self, calendar_entry, count_recalculations):
+        event = create_event(calendar_entry)
+        calls = count_recalculations.call_count
+        for day in range(5):
+            ExclusionDateRange.objects.create(
+                event=event,
+                start_date=event.start_time + timedelta(days=day),
+                end_date=event.start_time + timedelta(days=day, hours=1),
+            )
+        assert count_recalculations.call_count == calls + 5
+
+    def test_context_manager_coalesces(self, calendar_entry, count_recalculations):
+        with deferred_recalculation():
+            event = create_event(calendar_entry)
+            with deferred_recalculation():
+                for day in range(5):
+                    ExclusionDateRange.objects.create(
+                        event=event,
+                        start_date=event.start_time + timedelta(days=day),
+                        end_date=event.start_time + timedelta(days=day, hours=1),
+                    )
+            assert count_recalculations.call_count == 0
+
+        assert count_recalculations.call_count == 1
+        calendar_entry.refresh_from_db()
+        assert calendar_entry.next_occurrence is not None
+        assert not calendar_entry.occurrences_stale
+
+    def test_delete_entry(self, calendar_entry, count_recalculations):
+        create_event(calendar_entry)
+        create_event(calendar_entry)
+        calls = count_recalculations.call_count
+        calendar_entry.delete()
+        assert count_recalculations.call_count == calls + 1
+        assert not CalendarEntry.objects.exists()
@@ -0,0 +1,118 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from dateutil.rrule import DAILY, MINUTELY, rrule
+from django.utils import timezone as django_timezone
+
+from recurring.fastpath import FixedIntervalRule
+from recurring.models import (
+    CalendarEntry,
+    Event,
+    ExclusionDateRange,
+    RecurrenceRule,
+    Timezone,
+)
+from recurring.rulesets import ScheduleRuleset
+
+utc = timezone.utc
+
+
+class TestScheduleRuleset:
+    def test_exclusions_are_half_open(self):
+        rset = ScheduleRuleset()
+        rset.rrule(rrule(DAILY, dtstart=datetime(2023, 1, 1, tzinfo=utc), count=10))
+        rset.exclude(datetime(2023, 1, 3, tzinfo=utc), datetime(2023, 1, 5, tzinfo=utc))
+        assert [dt.day for dt in rset] == [1, 2, 5, 6, 7, 8, 9, 10]
+
+    def test_exclusions_are_merged(self):
+        rset = ScheduleRuleset()
+        rset.exclude(datetime(2023, 1, 5, tzinfo=utc), datetime(2023, 1, 8, tzinfo=utc))
+        rset.exclude(datetime(2023, 1, 1, tzinfo=utc), datetime(2023, 1, 3, tzinfo=utc))
+        rset.exclude(datetime(2023, 1, 2, tzinfo=utc), datetime(2023, 1, 6, tzinfo=utc))
+        assert rset.exclusions == [
+            (datetime(2023, 1, 1, tzinfo=utc), datetime(2023, 1, 8, tzinfo=utc))
+        ]
+        assert rset.is_excluded(datetime(2023, 1, 7, 23, tzinfo=utc))
+        assert not rset.is_excluded(datetime(2023, 1, 8, tzinfo=utc))
+        assert not rset.is_excluded(datetime(2022, 12, 31, tzinfo=utc))
+
+    def test_after_and_before_skip_exclusions(self):
+        rset = ScheduleRuleset()
+        rset.rrule(rrule(MINUTELY, dtstart=datetime(2023, 1, 1, tzinfo=utc)))
+        rset.exclude(datetime(2023, 1, 2, tzinfo=utc), datetime(2023, 2, 2, tzinfo=utc))
+        assert rset.after(datetime(2023, 1, 1, 23, 59, tzinfo=utc)) == datetime(
+            2023, 2, 2, tzinfo=utc
+        )
+        assert rset.before(datetime(2023, 2, 2, tzinfo=utc)) == datetime(
+            2023, 1, 1, 23, 59, tzinfo=utc
+        )
+
+    @pytest.mark.parametrize("fast", [True, False])
+    def test_xafter_is_lazy(self, fast):
+        rset = ScheduleRuleset()
+        rule = FixedIntervalRule if fast else rrule
+        rset.rrule(rule(MINUTELY, dtstart=datetime(2023, 1, 1, tzinfo=utc)))
+        rset.exclude(
+            datetime(2023, 1, 1, 0, 2, tzinfo=utc),
+            datetime(2023, 1, 1, 0, 4, tzinfo=utc),
+        )
+        assert rset.fast_path == fast
+
+        occurrences = rset.xafter(datetime(2023, 1, 1, 0, 1, tzinfo=utc), inc=True)
+        assert [next(occurrences).minute for _ in range(3)] == [1, 4, 5]
+        assert [
+            dt.minute for dt in rset.xafter(datetime(2023, 1, 1, tzinfo=utc), count=3)
+        ] == [1, 4, 5]
+
+
+@pytest.mark.django_db
+class TestExclusionIntervals:
+    @pytest.fixture
+    def event(self):
+        utc_tz, _ = Timezone.objects.get_or_create(name="UTC")
+        entry = CalendarEntry.objects.create(name="Entry", timezone=utc_tz)
+        rule = RecurrenceRule.objects.create(
+            frequency=RecurrenceRule.Frequency.MINUTELY, interval=1
+        )
+        start_time = django_timezone.datetime(2023, 1, 1, 9, tzinfo=utc)
+        return Event.objects.create(
+            calendar_entry=entry,
+            start_time=start_time,
+            end_time=start_time + timedelta(minutes=1),
+            recurrence_rule=rule,
+        )
+
+    def test_no_exdates_for_long_exclusions(self, event):
+        ExclusionDateRange.objects.create(
+            event=event,
+            start_date=datetime(2023, 1, 2, tzinfo=utc),
+            end_date=datetime(2023, 2, 2, tzinfo=utc),
+        )
+        entry = CalendarEntry.objects.get(pk=event.calendar_entry_id)
+        rset = entry.to_rruleset()
+        assert rset._exdate == []
+        assert rset._rrule[0]._exdate == []
+
+        # the exclusion runs from 09:00 on the 2nd to 09:00 on 2nd Feb inclusive
+        assert rset.after(datetime(2023, 1, 2, 8, 59, tzinfo=utc)) == datetime(
+            2023, 2, 2, 9, 1, tzinfo=utc
+        )
+
+    def test_exclusions_only_apply_to_their_event(self, event):
+        entry = event.calendar_entry
+        Event.objects.create(
+            calendar_entry=entry,
+            start_time=datetime(2023, 1, 5, 9, tzinfo=utc),
+            end_time=datetime(2023, 1, 5, 10, tzinfo=utc),
+        )
+        ExclusionDateRange.objects.create(
+            event=event,
+            start_date=datetime(2023, 1, 2, tzinfo=utc),
+            end_date=datetime(2023, 1, 10, tzinfo=utc),
+        )
+        entry = CalendarEntry.objects.get(pk=entry.pk)
+        # exclusions are synced to the event's 09:00 start time
+        occurrences = entry.to_rruleset().between(
+            datetime(2023, 1, 2, 9, tzinfo=utc), datetime(2023, 1, 10, 9, tzinfo=utc)
+        )
+        assert occurrences == [datetime(2023, 1, 5, 9, tzinfo=utc)]
@@ -0,0 +1,192 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from recurring.models import (
+    CalendarEntry,
+    Event,
+    ExclusionDateRange,
+    RecurrenceRule,
+    Timezone,
+)
+
+np = pytest.importorskip("numpy")
+vectorised = pytest.importorskip("recurring.vectorised")
+
+utc = timezone.utc
+Frequency = RecurrenceRule.Frequency
+
+WINDOW_START = datetime(2024, 1, 1, tzinfo=utc)
+WINDOW_END = datetime(2026, 1, 1, tzinfo=utc)
+
+RULES = [
+    {"frequency": Frequency.DAILY, "interval": 1},
+    {"frequency": Frequency.DAILY, "interval": 3},
+    {"frequency": Frequency.DAILY, "interval": 1, "count": 40},
+    {"frequency": Frequency.DAILY, "interval": 2, "byweekday": ["MO", "FR"]},
+    {
+        "frequency": Frequency.DAILY,
+        "interval": 1,
+        "until": datetime(2024, 3, 31, tzinfo=utc),
+    },
+    {"frequency": Frequency.WEEKLY, "interval": 1},
+    {"frequency": Frequency.WEEKLY, "interval": 2, "byweekday": ["MO", "WE", "SU"]},
+    {
+        "frequency": Frequency.WEEKLY,
+        "interval": 3,
+        "byweekday": ["TU", "SA"],
+        "wkst": 6,
+    },
+    {"frequency": Frequency.WEEKLY, "interval": 1, "byweekday": ["TH"], "count": 10},
+    {"frequency": Frequency.MONTHLY, "interval": 1},
+    {"frequency": Frequency.MONTHLY, "interval": 2, "bymonthday": [1, 15, -1]},
+    {"frequency": Frequency.MONTHLY, "interval": 1, "bymonthday": [31], "count": 12},
+    {"frequency": Frequency.MONTHLY, "interval": 1, "bymonthday": [30, -2]},
+    # unsupported shapes fall back to dateutil
+    {
+        "frequency": Frequency.MONTHLY,
+        "interval": 1,
+        "byweekday": ["FR"],
+        "bysetpos": [-1],
+    },
+    {"frequency": Frequency.YEARLY, "interval": 1},
+    {"frequency": Frequency.HOURLY, "interval": 7, "count": 500},
+]
+
+TIMEZONES = ["UTC", "Europe/London", "America/New_York", "Australia/Sydney"]
+
+START_TIMES = [
+    datetime(2023, 11, 30, 14, 30, tzinfo=utc),
+    # 01:30 local in London/New York, inside a DST transition hour in some years
+    datetime(2023, 3, 31, 1, 30, tzinfo=utc),
+    datetime(2024, 10, 27, 5, 30, tzinfo=utc),
+]
+
+
+def make_entry(tz_name, rule_kwargs, start_time, exclusions=()):
+    tz, _ = Timezone.objects.get_or_create(name=tz_name)
+    entry = CalendarEntry.objects.create(name="Entry", timezone=tz)
+    rule = RecurrenceRule.objects.create(**rule_kwargs)
+    event = Event.objects.create(
+        calendar_entry=entry,
+        start_time=start_time,
+        end_time=start_time + timedelta(minutes=30),
+        recurrence_rule=rule,
+    )
+    for start_date, end_date in exclusions:
+        ExclusionDateRange.objects.create(
+            event=event, start_date=start_date, end_date=end_date
+        )
+    return entry
+
+
+def expected(entry):
+    occurrences = entry.to_rruleset().between(WINDOW_START, WINDOW_END, inc=True)
+    return np.array(
+        [dt.astimezone(utc).replace(tzinfo=None) for dt in occurrences],
+        dtype="datetime64[s]",
+    )
+
+
+def expand(entry):
+    ((expanded_entry, occurrences),) = vectorised.expand_between(
+        CalendarEntry.objects.filter(pk=entry.pk), WINDOW_START, WINDOW_END
+    )
+    assert expanded_entry.pk == entry.pk
+    return occurrences
+
+
+@pytest.mark.django_db
+class TestEquivalence:
+    @pytest.mark.parametrize("rule_kwargs", RULES)
+    @pytest.mark.parametrize("tz_name", TIMEZONES)
+    @pytest.mark.parametrize("start_time", START_TIMES)
+    def test_matches_to_rruleset(self, rule_kwargs, tz_name, start_time):
+        entry = make_entry(tz_name, rule_kwargs, start_time)
+        np.testing.assert_array_equal(expand(entry), expected(entry))
+
+    @pytest.mark.parametrize("rule_kwargs", RULES[:13])
+    @pytest.mark.parametrize("tz_name", TIMEZONES)
+    def test_matches_to_rruleset_with_exclusions(self, rule_kwargs, tz_name):
+        entry = make_entry(
+            tz_name,
+            rule_kwargs,
+            START_TIMES[0],
+            exclusions=[
+                (datetime(2024, 2, 1, tzinfo=utc), datetime(2024, 2, 20, tzinfo=utc)),
+                (datetime(2024, 2, 10, tzinfo=utc), datetime(2024, 3, 5, tzinfo=utc)),
+                (datetime(2025, 7, 4, tzinfo=utc), datetime(2025, 7, 5, tzinfo=utc)),
+            ],
+        )
+        np.testing.assert_array_equal(expand(entry), expected(entry))
+
+    def test_multiple_events(self):
+        entry = make_entry("Europe/London", RULES[6], START_TIMES[0])
+        Event.objects.create(
+            calendar_entry=entry,
+            start_time=datetime(2024, 6, 1, 9, tzinfo=utc),
+            end_time=datetime(2024, 6, 1, 10, tzinfo=utc),
+        )
+        entry = CalendarEntry.objects.get(pk=entry.pk)
+        np.testing.assert_array_equal(expand(entry), expected(entry))
+
+    def test_batch(self):
+        entries = [
+            make_entry(tz_name, rule_kwargs, start_time)
+            for rule_kwargs in RULES
+            for tz_name, start_time in zip(TIMEZONES, START_TIMES * 2)
+        ]
+        entries.append(
+            make_entry(
+                "Australia/Sydney",
+                RULES[10],
+                START_TIMES[1],
+                exclusions=[
+                    (
+                        datetime(2024, 2, 1, tzinfo=utc),
+                        datetime(2024, 6, 1, tzinfo=utc),
+                    )
+                ],
+            )
+        )
+        Event.objects.create(
+            calendar_entry=entries[0],
+            start_time=datetime(2024, 6, 1, 9, tzinfo=utc),
+            end_time=datetime(2024, 6, 1, 10, tzinfo=utc),
+            recurrence_rule=RecurrenceRule.objects.create(**RULES[0]),
+        )
+
+        expanded = list(
+            vectorised.expand_between(
+                CalendarEntry.objects.order_by("pk"),
+                WINDOW_START,
+                WINDOW_END,
+                batch_size=7,
+            )
+        )
+
+        assert [entry.pk for entry, _ in expanded] == [entry.pk for entry in entries]
+        for entry, occurrences in expanded:
+            np.testing.assert_array_equal(occurrences, expected(entry))
+
+    def test_no_events(self):
+        utc_tz, _ = Timezone.objects.get_or_create(name="UTC")
+        entry = CalendarEntry.objects.create(name="Empty", timezone=utc_tz)
+        assert expand(entry).size == 0
+
+
+class TestSupports:
+    def test_supported(self):
+        assert vectorised.supports(None)
+        assert vectorised.supports(
+            RecurrenceRule(frequency=Frequency.WEEKLY, byweekday=["MO"])
+        )
+
+    def test_unsupported(self):
+        assert not vectorised.supports(RecurrenceRule(frequency=Frequency.YEARLY))
+        assert not vectorised.supports(
+            RecurrenceRule(frequency=Frequency.DAILY, byhour=[9, 17])
+        )
+        assert not vectorised.supports(
+            RecurrenceRule(frequency=Frequency.MONTHLY, byweekday=["MO"])
+        )
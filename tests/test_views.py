@@ -0,0 +1,245 @@
+import itertools
+import json
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+
+import pytest
+from django.contrib.auth.models import Permission
+from django.core.exceptions import PermissionDenied
+from django.test import Client
+from django.urls import reverse
+
+from recurring.models import CalendarEntry, Event, RecurrenceRule, Timezone
+from recurring.rulesets import ScheduleRuleset
+from recurring.views import (
+    OccurrencesView,
+    decode_cursor,
+    encode_cursor,
+    expand_occurrences,
+)
+
+
+@pytest.fixture
+def entries():
+    london, _ = Timezone.objects.get_or_create(name="Europe/London")
+    new_york, _ = Timezone.objects.get_or_create(name="America/New_York")
+    daily = CalendarEntry.objects.create(name="Daily", timezone=london)
+    Event.objects.create(
+        calendar_entry=daily,
+        start_time=datetime(2024, 1, 1, 9, tzinfo=timezone.utc),
+        end_time=datetime(2024, 1, 1, 9, 30, tzinfo=timezone.utc),
+        recurrence_rule=RecurrenceRule.objects.create(
+            frequency=RecurrenceRule.Frequency.DAILY
+        ),
+    )
+    weekly = CalendarEntry.objects.create(name="Weekly", timezone=new_york)
+    Event.objects.create(
+        calendar_entry=weekly,
+        start_time=datetime(2024, 1, 1, 9, tzinfo=timezone.utc),
+        end_time=datetime(2024, 1, 1, 11, tzinfo=timezone.utc),
+        recurrence_rule=RecurrenceRule.objects.create(
+            frequency=RecurrenceRule.Frequency.WEEKLY, byweekday=["MO"]
+        ),
+    )
+    Event.objects.create(
+        calendar_entry=weekly,
+        start_time=datetime(2024, 1, 3, tzinfo=timezone.utc),
+        is_full_day=True,
+    )
+    # outside the window
+    CalendarEntry.objects.create(name="Old", timezone=london).events.create(
+        start_time=datetime(2023, 1, 1, 9, tzinfo=timezone.utc),
+        end_time=datetime(2023, 1, 1, 10, tzinfo=timezone.utc),
+    )
+    return daily, weekly
+
+
+@pytest.fixture
+def client(client, admin_user):
+    client.force_login(admin_user)
+    return client
+
+
+WINDOW = {"start": "2024-01-01T00:00:00Z", "end": "2024-01-08T00:00:00Z"}
+
+
+def occurrences(client, **params):
+    response = client.get(reverse("recurring:occurrences"), params)
+    assert response.status_code == 200
+    return response, json.loads(b"".join(response.streaming_content))
+
+
+@pytest.mark.django_db
+class TestOccurrencesView:
+    def test_occurrences(self, client, entries):
+        daily, weekly = entries
+
+        _, data = occurrences(client, **WINDOW)
+
+        assert data["next"] is None
+        assert [
+            (occurrence["entry"], occurrence["start"])
+            for occurrence in data["occurrences"]
+        ] == [
+            (daily.pk, "2024-01-01T09:00:00+00:00"),
+            (weekly.pk, "2024-01-01T04:00:00-05:00"),
+        ] + [(daily.pk, f"2024-01-0{day}T09:00:00+00:00") for day in (2,)] + [
+            (weekly.pk, "2024-01-02T19:00:00-05:00")
+        ] + [(daily.pk, f"2024-01-0{day}T09:00:00+00:00") for day in range(3, 8)]
+        assert data["occurrences"][1] == {
+            "entry": weekly.pk,
+            "event": weekly.events.order_by("pk")[0].pk,
+            "title": "Weekly",
+            "start": "2024-01-01T04:00:00-05:00",
+            "end": "2024-01-01T06:00:00-05:00",
+            "full_day": False,
+        }
+        assert data["occurrences"][3]["end"] == "2024-01-03T19:00:00-05:00"
+        assert data["occurrences"][3]["full_day"]
+
+    def test_entry_filter(self, client, entries):
+        _, weekly = entries
+
+        _, data = occurrences(client, entry=str(weekly.pk), **WINDOW)
+
+        assert {occurrence["entry"] for occurrence in data["occurrences"]} == {
+            weekly.pk
+        }
+        assert len(data["occurrences"]) == 2
+
+    def test_pages(self, client, entries):
+        _, expected = occurrences(client, **WINDOW)
+
+        pages = []
+        cursor = None
+        while True:
+            params = {**WINDOW, "limit": 3}
+            if cursor:
+                params["cursor"] = cursor
+            _, data = occurrences(client, **params)
+            pages.append(data["occurrences"])
+            cursor = data["next"]
+            if cursor is None:
+                break
+
+        assert [len(page) for page in pages] == [3, 3, 3]
+        assert list(itertools.chain(*pages)) == expected["occurrences"]
+
+    def test_capped(self, client, entries, settings):
+        settings.RECURRING_OCCURRENCES_LIMIT = 4
+
+        _, data = occurrences(client, **WINDOW)
+
+        assert len(data["occurrences"]) == 4
+        assert data["next"] is not None
+
+    @pytest.mark.parametrize(
+        "params",
+        [
+            {},
+            {"start": "2024-01-01", "end": "tomorrow"},
+            {"start": "2024-01-08T00:00:00Z", "end": "2024-01-01T00:00:00Z"},
+            {"start": "2024-01-01T00:00:00Z", "end": "2026-01-01T00:00:00Z"},
+            {**WINDOW, "entry": "one"},
+            {**WINDOW, "limit": "0"},
+            {**WINDOW, "limit": "100000"},
+            {**WINDOW, "cursor": "nonsense"},
+        ],
+    )
+    def test_bad_request(self, client, params):
+        response = client.get(reverse("recurring:occurrences"), params)
+        assert response.status_code == 400
+        assert "error" in response.json()
+
+    def test_conditional(self, client, entries, django_assert_max_num_queries):
+        response, _ = occurrences(client, **WINDOW)
+        assert response["Cache-Control"] == "private, max-age=0"
+
+        # the logged in user, then the candidates' state
+        with django_assert_max_num_queries(2):
+            not_modified = client.get(
+                reverse("recurring:occurrences"),
+                WINDOW,
+                headers={"if-none-match": response["ETag"]},
+            )
+        assert not_modified.status_code == 304
+        assert not_modified["ETag"] == response["ETag"]
+        assert not response.has_header("Last-Modified")
+
+    def test_etag_changes_when_entry_deleted(self, client, entries):
+        _, weekly = entries
+        response, _ = occurrences(client, **WINDOW)
+
+        weekly.delete()
+
+        changed = client.get(
+            reverse("recurring:occurrences"),
+            WINDOW,
+            headers={"if-none-match": response["ETag"]},
+        )
+        assert changed.status_code == 200
+        assert changed["ETag"] != response["ETag"]
+
+    def test_requires_permission(self, rf, django_user_model, entries):
+        user = django_user_model.objects.create_user("viewer")
+        request = rf.get(reverse("recurring:occurrences"), WINDOW)
+        request.user = user
+        with pytest.raises(PermissionDenied):
+            OccurrencesView.as_view()(request)
+
+        user.user_permissions.add(Permission.objects.get(codename="view_calendarentry"))
+        request.user = django_user_model.objects.get(pk=user.pk)
+        assert OccurrencesView.as_view()(request).status_code == 200
+
+    def test_anonymous(self, entries):
+        response = Client().get(reverse("recurring:occurrences"), WINDOW)
+        assert response.status_code == 403
+
+    def test_etag_changes_with_schedule(self, client, entries):
+        daily, _ = entries
+        response, _ = occurrences(client, **WINDOW)
+
+        event = daily.events.get()
+        event.end_time += timedelta(minutes=30)
+        event.save()
+
+        changed, data = occurrences(client, **WINDOW)
+        assert changed["ETag"] != response["ETag"]
+        assert data["occurrences"][0]["end"] == "2024-01-01T10:00:00+00:00"
+
+
+@pytest.mark.django_db
+class TestExpandOccurrences:
+    def test_limit_and_after(self, entries):
+        start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        end = datetime(2024, 2, 1, tzinfo=timezone.utc)
+        queryset = CalendarEntry.objects.all()
+        everything = expand_occurrences(queryset, start, end, 1000)
+
+        first = expand_occurrences(queryset, start, end, 10)
+        rest = expand_occurrences(
+            queryset, start, end, 1000, after=decode_cursor(encode_cursor(first[-1]))
+        )
+
+        assert first + rest == everything
+        assert [occurrence[:3] for occurrence in everything] == sorted(
+            occurrence[:3] for occurrence in everything
+        )
+        assert all(start <= occurrence[0] < end for occurrence in everything)
+
+    def test_frequent_rule_stops_at_limit(self, entries):
+        daily, _ = entries
+        rule = daily.events.get().recurrence_rule
+        rule.frequency = RecurrenceRule.Frequency.MINUTELY
+        rule.save()
+        start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        end = start + timedelta(days=366)
+
+        # the window holds over half a million occurrences, but only the first few
+        # are expanded
+        with mock.patch.object(ScheduleRuleset, "between", side_effect=AssertionError):
+            occurrences = expand_occurrences(
+                CalendarEntry.objects.filter(pk=daily.pk), start, end, 5
+            )
+
+        assert [occurrence[0].minute for occurrence in occurrences] == [0, 1, 2, 3, 4]